@@ -1,23 +1,110 @@
 import argparse
+import asyncio
+import re
+import time
+from contextlib import aclosing
 from tempfile import TemporaryDirectory
+from typing import Optional
 
 import uvicorn
-from fastapi import FastAPI, File, Form, UploadFile
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from fastapi.responses import StreamingResponse
 
 
 from minutes_maker import MinutesMaker
+from minutes_maker._segments import ms_to_srt_time
 from fastapi import Request
-import openai
 
 
-timeline_path = ''
+_QUERY_SYSTEM_PROMPT = (
+    "You’re a precise assistant who answers questions based only on a provided summary and timeline of an audio/video recording.\n\n"
+    "Summary+Timeline excerpts:\n"
+    "{context}\n\n"
+    "Guidelines:\n"
+    "- The timeline may only contain parts of the recording; “...” marks omitted parts.\n"
+    "- Timestamps are in MM:SS or HH:MM:SS format (e.g., “00:02:01” means 2 minutes and 1 second after the start).\n"
+    "- If a user asks “What was said at XX:XX:XX?”, respond with a short factual quote or accurate paraphrase from that timestamp.\n"
+    "- For general questions (e.g., “What happened two minutes after the start?”), give a concise 1–2 sentence answer referencing the timeline.\n"
+    "- Always base answers strictly on the summary/timeline. Do not hallucinate or invent details.\n"
+    "- Keep answers factual, clear, and brief."
+)
+
+
+async def _replay(answer: str):
+    """
+    Stream a ready answer word by word, like answers streamed from OpenAI.
+    """
+    for word in re.findall(r"\s*\S+\s*", answer) or [answer]:
+        yield word
+
 
 class OutputData(BaseModel):
+    recording_id: str
+    language: str
+    detected_language: Optional[str]
     timeline: str
     summary: str
+    summaries: dict[str, str]
+
+
+class SummaryData(BaseModel):
+    recording_id: str
+    summary: str
+    summaries: dict[str, str]
+
+
+class SummaryNodeData(BaseModel):
+    id: int
+    level: int
+    start: int
+    stop: int
+    start_ms: int
+    end_ms: int
+    summary: str
+    children: list[int]
+
+
+class SummaryTreeData(BaseModel):
+    recording_id: str
+    language: str
+    category: str
+    nodes: list[SummaryNodeData]
+
+
+class SearchHitData(BaseModel):
+    recording_id: str
+    filename: Optional[str]
+    segment: int
+    start_ms: int
+    end_ms: int
+    timestamp: str
+    snippet: str
+    score: float
+
+
+class SearchData(BaseModel):
+    query: str
+    hits: list[SearchHitData]
+
+
+def _split_languages(language: str) -> list[str]:
+    """
+    Split a comma-separated list of summary languages, e.g. "en,ja".
+    """
+    return [lang.strip() for lang in language.split(",") if lang.strip()] or [language]
+
+
+def _parse_tiers(tiers: str) -> dict[str, str]:
+    """
+    Parse the models of query routes, e.g. "synthesis=gpt-4".
+    """
+    return dict(
+        tuple(part.strip() for part in tier.split("=", 1))
+        for tier in tiers.split(",")
+        if tier.strip()
+    )
 
 
 class MinutesMakerAPI:
@@ -35,9 +122,38 @@ class MinutesMakerAPI:
     -------
     minutes_maker
         Minutes Maker API endpoint.
+    summarize_recording
+        Re-summarize an already transcribed recording.
+    summarize_recording_stream
+        Re-summarize a recording and stream the summary as it is generated.
+    summary_tree
+        Intermediate summaries of the latest summary of a recording.
     """
 
-    def __init__(self, model: str, cpu_threads: int = 0, num_workers: int = 1):
+    def __init__(
+        self,
+        model: str,
+        cpu_threads: int = 0,
+        num_workers: int = 1,
+        data_dir: str = "recordings",
+        language_detection_seconds: float = 30.0,
+        summarize_strategy: str = "map_reduce",
+        max_concurrency: int = 4,
+        llm_max_concurrency: int = 16,
+        llm_max_streams: int = 256,
+        llm_rpm: Optional[int] = None,
+        llm_tpm: Optional[int] = None,
+        model_registry: Optional[str] = None,
+        extractive_ratio: Optional[float] = None,
+        query_context_tokens: int = 3000,
+        embedding_model: Optional[str] = "hashing",
+        query_cache_mb: int = 256,
+        query_history_tokens: int = 1000,
+        answer_cache_ttl: float = 24 * 60 * 60,
+        answer_similarity: Optional[float] = 0.9,
+        query_model: str = "gpt-3.5-turbo",
+        query_model_tiers: Optional[dict[str, str]] = None,
+    ):
         """
         Initialize MinutesMakerAPI.
 
@@ -51,13 +167,84 @@ class MinutesMakerAPI:
         num_workers : int, optional
             number of workers for whisper inference,
             by default 1 for non-parallel.
+        data_dir : str, optional
+            directory to store transcribed recordings in,
+            by default "recordings".
+        language_detection_seconds : float, optional
+            length of the opening audio window used for language
+            identification, by default 30.0. 0 disables it.
+        summarize_strategy : str, optional
+            how long transcripts are shortened, "map_reduce" or "rolling",
+            by default "map_reduce".
+        max_concurrency : int, optional
+            number of concurrent requests per summary, by default 4.
+        llm_max_concurrency : int, optional
+            number of in-flight OpenAI requests overall, by default 16.
+        llm_max_streams : int, optional
+            number of answers streamed from OpenAI at once, by default 256.
+        llm_rpm : int, optional
+            OpenAI requests per minute limit, by default None.
+        llm_tpm : int, optional
+            OpenAI tokens per minute limit, by default None.
+        model_registry : str, optional
+            JSON file overriding model context windows and output limits,
+            by default None.
+        extractive_ratio : float, optional
+            fraction of the tokens of long transcripts kept by the local
+            extractive filter, by default None for disabled.
+        query_context_tokens : int, optional
+            number of timeline tokens sent with a question to "/query",
+            by default 3000.
+        embedding_model : str, optional
+            local embedding of timeline segments for "/query", "hashing",
+            a sentence-transformers model or "none", by default "hashing".
+        query_cache_mb : int, optional
+            memory in MiB for recordings parsed for "/query", by default 256.
+        query_history_tokens : int, optional
+            tokens of earlier turns sent verbatim with a follow-up question,
+            by default 1000.
+        answer_cache_ttl : float, optional
+            seconds an answer is reused for the same question, by default
+            1 day. 0 disables the answer cache.
+        answer_similarity : float, optional
+            similarity of two questions for one to reuse the answer to the
+            other, by default 0.9. None only reuses identical questions,
+            and so does an `embedding_model` other than a
+            sentence-transformers model.
+        query_model : str, optional
+            model name for questions to "/query", by default "gpt-3.5-turbo".
+        query_model_tiers : dict[str, str], optional
+            model name for the questions of a route that are not answered
+            locally, e.g. {"synthesis": "gpt-4"}, by default None.
         """
         self.app = FastAPI()
         self.mm = MinutesMaker(
-            model=model, cpu_threads=cpu_threads, num_workers=num_workers
+            model=model,
+            cpu_threads=cpu_threads,
+            num_workers=num_workers,
+            data_dir=data_dir,
+            language_detection_seconds=language_detection_seconds,
+            summarize_strategy=summarize_strategy,
+            max_concurrency=max_concurrency,
+            llm_max_concurrency=llm_max_concurrency,
+            llm_max_streams=llm_max_streams,
+            llm_rpm=llm_rpm,
+            llm_tpm=llm_tpm,
+            model_registry=model_registry,
+            extractive_ratio=extractive_ratio,
+            query_context_tokens=query_context_tokens,
+            embedding_model=embedding_model,
+            query_cache_bytes=query_cache_mb << 20,
+            query_history_tokens=query_history_tokens,
+            answer_cache_ttl=answer_cache_ttl,
+            answer_similarity=answer_similarity,
+            query_model=query_model,
+            query_model_tiers=query_model_tiers,
         )
-        self.timeline_path: str 
-          
+        # the most recently processed recording, used by `/query`
+        # when the client does not send a recording ID
+        self.recording_id: str = ""
+
         self.app.add_api_route(
             "/query",
             self.query_handler,
@@ -70,54 +257,154 @@ class MinutesMakerAPI:
             methods=["POST"],
             response_model=OutputData,
         )
+        self.app.add_api_route(
+            "/recordings/{recording_id}/summarize",
+            self.summarize_recording,
+            methods=["POST"],
+            response_model=SummaryData,
+        )
+        self.app.add_api_route(
+            "/recordings/{recording_id}/summarize/stream",
+            self.summarize_recording_stream,
+            methods=["POST"],
+        )
+        self.app.add_api_route(
+            "/recordings/{recording_id}/summary_tree",
+            self.summary_tree,
+            methods=["GET"],
+            response_model=SummaryTreeData,
+        )
+        self.app.add_api_route(
+            "/recordings/{recording_id}/answers",
+            self.clear_answers,
+            methods=["DELETE"],
+        )
+        self.app.add_api_route(
+            "/search",
+            self.search,
+            methods=["GET"],
+            response_model=SearchData,
+        )
+        self.app.add_api_route(
+            "/metrics",
+            self.metrics,
+            methods=["GET"],
+        )
         self.app.add_middleware(
             CORSMiddleware,
             allow_origins=["*"],
             allow_credentials=True,
             allow_methods=["*"],
             allow_headers=["*"],
+            expose_headers=["X-Session-Id", "X-Query-Route", "X-Context-Truncation"],
         )
+        self.app.add_event_handler("shutdown", self.mm.llm.aclose)
         
     
     async def query_handler(self, request: Request):
+        """
+        Answer a question about a recording, called when a POST request is
+        sent to "/query".
+
+        The answer is streamed by an async generator, so open answers hold
+        sockets but no worker threads, and a client disconnecting closes
+        the request to OpenAI.
+
+        The ID of the conversation is returned in the "X-Session-Id"
+        header; sending it back as `session_id` asks a follow-up question
+        with the earlier turns as history.
+
+        Questions are routed by kind, returned in the "X-Query-Route"
+        header: timestamp lookups, keyword finds and summary recalls are
+        answered without OpenAI when possible, and the rest by the model of
+        their route.
+
+        Prompts are measured with the tokenizer of the model and fitted to
+        its context window; the "X-Context-Truncation" header tells how,
+        see `QueryPrompt.truncation`.
+        """
         form_data = await request.form()
         question = form_data.get("question", "")
-        with open(self.timeline_path, "r", encoding="utf-8") as f:
-            summary = f.read()
-
-        def event_stream():
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages = [
-                {
-                    "role": "system",
-                    "content": (
-                    "You’re a precise assistant who answers questions based only on a provided summary and timeline of an audio/video recording.\n\n"
-                    "Summary+Timeline:\n"
-                    f"{summary}\n\n"
-                    "Guidelines:\n"
-                    "- Timestamps are in MM:SS or HH:MM:SS format (e.g., “00:02:01” means 2 minutes and 1 second after the start).\n"
-                    "- If a user asks “What was said at XX:XX:XX?”, respond with a short factual quote or accurate paraphrase from that timestamp.\n"
-                    "- For general questions (e.g., “What happened two minutes after the start?”), give a concise 1–2 sentence answer referencing the timeline.\n"
-                    "- Always base answers strictly on the summary/timeline. Do not hallucinate or invent details.\n"
-                    "- Keep answers factual, clear, and brief."
-                    )
-                },
-                { 
-                    "role": "user",
-                    "content": question
-                },
-                ]
-,
-                stream=True,
+        session_id = form_data.get("session_id")
+        session = self.mm.chat_sessions.get(session_id) if session_id else None
+        recording_id = (
+            form_data.get("recording_id")
+            or (session.recording_id if session else "")
+            or self.recording_id
+        )
+        if not self.mm.recordings.exists(recording_id):
+            raise HTTPException(status_code=404, detail="Recording not found.")
+        if session is None or session.recording_id != recording_id:
+            session = self.mm.chat_sessions.create(recording_id)
+        headers = {"X-Session-Id": session.id}
+
+        # timestamp lookups, keyword finds and summary recalls are answered
+        # from the timeline and the summary directly
+        started = time.perf_counter()
+        follow_up = bool(session.turns or session.summary)
+        route, answer = await asyncio.to_thread(
+            self.mm.route_question, recording_id, question, follow_up=follow_up
+        )
+        path = "local"
+        if answer is None and not follow_up:
+            # the same first question about a recording gets the same answer
+            answer = await asyncio.to_thread(
+                self.mm.answers.get, recording_id, question
+            )
+            path = "cache"
+        headers["X-Query-Route"] = route
+        if answer is not None:
+            self.mm.chat_sessions.record(session, question, answer)
+            self.mm.query_routes.record(route, path, time.perf_counter() - started)
+            return StreamingResponse(
+                _replay(answer), media_type="text/plain", headers=headers
             )
+        # the summary and the timeline, or the segments relevant to the
+        # question, fitted to the context window of the model, with the
+        # segments of the previous question for follow-ups
+        model = self.mm.model_for(route)
+        conversation_summary, history = await self.mm.chat_sessions.history(session)
+        try:
+            prompt = await asyncio.to_thread(
+                self.mm.query_prompt,
+                recording_id,
+                question,
+                _QUERY_SYSTEM_PROMPT,
+                model=model,
+                history=history,
+                history_summary=conversation_summary,
+                keep=session.context,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        session.context = prompt.context
+        headers["X-Context-Truncation"] = ",".join(prompt.truncation)
+        messages = prompt.messages
 
-            for chunk in response:
-                if "choices" in chunk and chunk["choices"][0].get("delta", {}).get("content"):
-                    yield chunk["choices"][0]["delta"]["content"]
+        async def event_stream():
+            deltas = []
+            # Starlette cancels the response when the client disconnects;
+            # closing the upstream stream then stops the generation
+            async with aclosing(
+                self.mm.llm.stream(model, messages, max_tokens=prompt.max_tokens)
+            ) as stream:
+                async for delta in stream:
+                    deltas.append(delta)
+                    yield delta
+            # interrupted answers are not part of the conversation
+            answer = "".join(deltas)
+            self.mm.query_routes.record(
+                route, "llm", time.perf_counter() - started, model
+            )
+            self.mm.chat_sessions.record(session, question, answer)
+            if not follow_up:
+                await asyncio.to_thread(
+                    self.mm.answers.put, recording_id, question, answer
+                )
 
-        return StreamingResponse(event_stream(), media_type="text/plain")    
-    
+        return StreamingResponse(
+            event_stream(), media_type="text/plain", headers=headers
+        )
 
     async def minutes_maker(
         self,
@@ -126,6 +413,7 @@ class MinutesMakerAPI:
         language: str = Form(...),
         category: str = Form(...),
         content: str = Form(...),
+        use_cache: bool = Form(True),
     ) -> OutputData:
         """
         Minutes Maker API endpoint called when a POST request is sent to
@@ -135,7 +423,7 @@ class MinutesMakerAPI:
 
         1. Save the file to a temporary directory.
         2. Make timeline and summary of the meeting or lecture.
-        3. Return timeline and summary.
+        3. Return the recording ID, timeline and summary.
 
         Parameters
         ----------
@@ -144,16 +432,21 @@ class MinutesMakerAPI:
         filename : str
             filename of the uploaded file.
         language : str
-            language of the uploaded file, "en" or "ja" etc..
+            language of the summary, "en" or "ja" etc.,
+            or "auto" to follow the language detected in the file.
+            Comma-separated languages, e.g. "en,ja,hi", are summarized
+            from one shortened transcript; `summary` is in the first one.
         category : str
             category of the uploaded file, "meeting" or "lecture".
         content : str
             topic of the meeting or lecture in the uploaded file.
+        use_cache : bool, optional
+            whether to reuse cached LLM responses, by default True.
 
         Returns
         -------
         OutputData
-            timeline and summary of the uploaded file.
+            recording ID, timeline and summary of the uploaded file.
         """
         # 0. await file.read() to get bytes
         file = await file.read()
@@ -164,21 +457,256 @@ class MinutesMakerAPI:
                 f.write(file)
 
             # 2. make timeline and summary of the meeting or lecture
-            timeline, summary, chatbot_timeline = self.mm(
-                audio_or_video_file_path=f"{tempdir}/{filename}",
-                language=language,
+            language, *languages = _split_languages(language)
+            try:
+                recording_id, timeline, summary = await self.mm(
+                    audio_or_video_file_path=f"{tempdir}/{filename}",
+                    language=language,
+                    category=category,
+                    content=content,
+                    use_cache=use_cache,
+                    languages=languages,
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+        self.recording_id = recording_id
+        metadata = self.mm.recordings.load_metadata(recording_id)
+
+        # 3. return recording ID, timeline and summary
+        return OutputData(
+            recording_id=recording_id,
+            language=metadata["language"],
+            detected_language=metadata["detected_language"],
+            timeline=timeline,
+            summary=summary,
+            summaries=metadata["summaries"],
+        )
+
+    async def summarize_recording(
+        self,
+        recording_id: str,
+        language: str = Form(...),
+        category: str = Form(...),
+        use_cache: bool = Form(True),
+    ) -> SummaryData:
+        """
+        Re-summarize an already transcribed recording, called when a POST
+        request is sent to "/recordings/{recording_id}/summarize".
+
+        Only the summarization step runs, so changing the summary language
+        or category does not transcribe the recording again.
+
+        Parameters
+        ----------
+        recording_id : str
+            ID of the recording returned by "/minutes_maker".
+        language : str
+            language of the summary, "en" or "ja" etc., or comma-separated
+            languages, e.g. "en,ja,hi", summarized from one shortened
+            transcript.
+        category : str
+            category of the recording, "meeting" or "lecture".
+        use_cache : bool, optional
+            whether to reuse cached LLM responses, by default True.
+
+        Returns
+        -------
+        SummaryData
+            recording ID, the summary in the first language and the
+            summaries in every language.
+        """
+        if not self.mm.recordings.exists(recording_id):
+            raise HTTPException(status_code=404, detail="Recording not found.")
+
+        try:
+            summaries = await self.mm.summarize_languages(
+                recording_id,
+                _split_languages(language),
                 category=category,
-                content=content,
+                use_cache=use_cache,
             )
-            
-        self.timeline_path = f"{filename.split('.')[0]}.txt"  # Or use ".text" extension if needed
-        print(f"MinutesMakerApi-->summary_path-->{self.timeline_path}")
-        # Open for writing **text**, not bytes
-        with open(self.timeline_path, "w", encoding="utf-8") as f:
-            num_chars_written = f.write(chatbot_timeline)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-        # 3. return timeline and summary
-        return OutputData(timeline=timeline, summary=summary)
+        return SummaryData(
+            recording_id=recording_id,
+            summary=next(iter(summaries.values())),
+            summaries=summaries,
+        )
+
+    async def summarize_recording_stream(
+        self,
+        recording_id: str,
+        language: str = Form(...),
+        category: str = Form(...),
+        use_cache: bool = Form(True),
+    ) -> StreamingResponse:
+        """
+        Re-summarize an already transcribed recording and stream the summary,
+        called when a POST request is sent to
+        "/recordings/{recording_id}/summarize/stream".
+
+        The deltas of the final summary are forwarded as they are generated,
+        the same way "/query" streams its answers.
+
+        Parameters
+        ----------
+        recording_id : str
+            ID of the recording returned by "/minutes_maker".
+        language : str
+            language of the summary, "en" or "ja" etc..
+        category : str
+            category of the recording, "meeting" or "lecture".
+        use_cache : bool, optional
+            whether to reuse cached LLM responses, by default True.
+
+        Returns
+        -------
+        StreamingResponse
+            the summary as plain text.
+        """
+        if not self.mm.recordings.exists(recording_id):
+            raise HTTPException(status_code=404, detail="Recording not found.")
+        try:
+            stream = self.mm.summarize_stream(
+                recording_id, language=language, category=category, use_cache=use_cache
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        return StreamingResponse(stream, media_type="text/plain")
+
+    async def summary_tree(
+        self,
+        recording_id: str,
+        start_ms: Optional[int] = None,
+        end_ms: Optional[int] = None,
+        level: Optional[int] = None,
+    ) -> SummaryTreeData:
+        """
+        Return the intermediate summaries of the latest summary of a
+        recording, called when a GET request is sent to
+        "/recordings/{recording_id}/summary_tree".
+
+        Long recordings are summarized chunk by chunk and the chunk
+        summaries are summarized again, so any part of a recording can be
+        looked up from the stored nodes without requests to OpenAI.
+
+        Parameters
+        ----------
+        recording_id : str
+            ID of the recording returned by "/minutes_maker".
+        start_ms : int, optional
+            only return nodes ending after this time, by default None.
+        end_ms : int, optional
+            only return nodes starting before this time, by default None.
+        level : int, optional
+            only return nodes of this level, 0 for the chunk summaries,
+            by default None.
+
+        Returns
+        -------
+        SummaryTreeData
+            recording ID, language and category of the summary and the
+            nodes of the tree, the root last.
+        """
+        try:
+            tree = self.mm.summary_tree(recording_id)
+        except KeyError:
+            raise HTTPException(status_code=404, detail="Summary not found.")
+
+        nodes = [
+            node
+            for node in tree["nodes"]
+            if (start_ms is None or node["end_ms"] > start_ms)
+            and (end_ms is None or node["start_ms"] < end_ms)
+            and (level is None or node["level"] == level)
+        ]
+        return SummaryTreeData(
+            recording_id=recording_id,
+            language=tree["language"],
+            category=tree["category"],
+            nodes=nodes,
+        )
+
+    async def clear_answers(self, recording_id: str) -> dict:
+        """
+        Forget the cached answers to questions about a recording, called
+        when a DELETE request is sent to "/recordings/{recording_id}/answers".
+
+        Parameters
+        ----------
+        recording_id : str
+            ID of the recording returned by "/minutes_maker".
+
+        Returns
+        -------
+        dict
+            recording ID.
+        """
+        if not self.mm.recordings.exists(recording_id):
+            raise HTTPException(status_code=404, detail="Recording not found.")
+        await asyncio.to_thread(self.mm.answers.invalidate, recording_id)
+        return {"recording_id": recording_id}
+
+    async def search(self, q: str, k: int = 10) -> SearchData:
+        """
+        Search the transcripts of all the recordings, called when a GET
+        request is sent to "/search".
+
+        Parameters
+        ----------
+        q : str
+            the query, e.g. "vendor decision".
+        k : int, optional
+            the maximum number of results, by default 10.
+
+        Returns
+        -------
+        SearchData
+            the query and the matching segments, best first, with their
+            recording ID and file name, timestamp and text.
+        """
+        hits = await asyncio.to_thread(self.mm.search_recordings, q, k)
+        filenames = {
+            recording_id: self.mm.recordings.load_metadata(recording_id).get(
+                "filename"
+            )
+            for recording_id in {hit.recording_id for hit in hits}
+        }
+        return SearchData(
+            query=q,
+            hits=[
+                SearchHitData(
+                    recording_id=hit.recording_id,
+                    filename=filenames[hit.recording_id],
+                    segment=hit.segment,
+                    start_ms=hit.start_ms,
+                    end_ms=hit.end_ms,
+                    timestamp=ms_to_srt_time(hit.start_ms),
+                    snippet=hit.text,
+                    score=hit.score,
+                )
+                for hit in hits
+            ],
+        )
+
+    async def metrics(self) -> dict:
+        """
+        Return the hit rates and memory use of the caches, called when a
+        GET request is sent to "/metrics".
+
+        Returns
+        -------
+        dict
+            statistics of the cache of recordings parsed for "/query", of
+            the answer cache and of the LLM response cache, and the size of
+            the corpus index of "/search", and the number and latency of
+            the questions to "/query" of each route.
+        """
+        # the caches count their entries in SQLite
+        return await asyncio.to_thread(self.mm.metrics)
 
 
 if __name__ == "__main__":
@@ -211,9 +739,153 @@ if __name__ == "__main__":
         default=10355,
         help="port number for API (default: 10355)",
     )
+    argparser.add_argument(
+        "-d",
+        "--data_dir",
+        type=str,
+        default="recordings",
+        help="directory to store transcribed recordings in (default: recordings)",
+    )
+    argparser.add_argument(
+        "-l",
+        "--language_detection_seconds",
+        type=float,
+        default=30.0,
+        help="seconds of opening audio used for language detection (default: 30.0, 0 to disable)",
+    )
+    argparser.add_argument(
+        "-s",
+        "--summarize_strategy",
+        type=str,
+        default="map_reduce",
+        choices=["map_reduce", "rolling"],
+        help="how long transcripts are shortened (default: map_reduce)",
+    )
+    argparser.add_argument(
+        "-c",
+        "--max_concurrency",
+        type=int,
+        default=4,
+        help="number of concurrent summarization requests (default: 4)",
+    )
+    argparser.add_argument(
+        "--llm_max_concurrency",
+        type=int,
+        default=16,
+        help="number of in-flight OpenAI requests overall (default: 16)",
+    )
+    argparser.add_argument(
+        "--llm_max_streams",
+        type=int,
+        default=256,
+        help="number of answers streamed from OpenAI at once; streams only "
+        "count against --llm_max_concurrency until opened (default: 256)",
+    )
+    argparser.add_argument(
+        "--llm_rpm",
+        type=int,
+        default=None,
+        help="OpenAI requests per minute limit (default: unlimited)",
+    )
+    argparser.add_argument(
+        "--llm_tpm",
+        type=int,
+        default=None,
+        help="OpenAI tokens per minute limit (default: unlimited)",
+    )
+    argparser.add_argument(
+        "--model_registry",
+        type=str,
+        default=None,
+        help="JSON file overriding model context windows and output limits",
+    )
+    argparser.add_argument(
+        "-e",
+        "--extractive_ratio",
+        type=float,
+        default=None,
+        help="fraction of transcript tokens kept by the local extractive filter "
+        "before summarization (default: disabled)",
+    )
+    argparser.add_argument(
+        "--query_context_tokens",
+        type=int,
+        default=3000,
+        help="number of timeline tokens sent with a question (default: 3000)",
+    )
+    argparser.add_argument(
+        "--embedding_model",
+        type=str,
+        default="hashing",
+        help="local embedding of timeline segments for questions: 'hashing', "
+        "a sentence-transformers model or 'none' (default: hashing)",
+    )
+    argparser.add_argument(
+        "--query_cache_mb",
+        type=int,
+        default=256,
+        help="memory in MiB for recordings parsed for questions (default: 256)",
+    )
+    argparser.add_argument(
+        "--query_history_tokens",
+        type=int,
+        default=1000,
+        help="tokens of earlier turns sent verbatim with a follow-up question; "
+        "older turns are summarized (default: 1000)",
+    )
+    argparser.add_argument(
+        "--answer_cache_ttl",
+        type=float,
+        default=24 * 60 * 60,
+        help="seconds an answer is reused for the same question, 0 to disable "
+        "(default: 86400)",
+    )
+    argparser.add_argument(
+        "--answer_similarity",
+        type=lambda value: None if value.lower() == "none" else float(value),
+        default=0.9,
+        help="similarity of two questions for one to reuse the answer to the "
+        "other with a sentence-transformers --embedding_model; 'none' only "
+        "reuses identical questions (default: 0.9)",
+    )
+    argparser.add_argument(
+        "--query_model",
+        type=str,
+        default="gpt-3.5-turbo",
+        help="model name for questions (default: gpt-3.5-turbo)",
+    )
+    argparser.add_argument(
+        "--query_model_tiers",
+        type=str,
+        default="",
+        help="model names for the questions of routes not answered locally, "
+        "e.g. 'synthesis=gpt-4,keyword_find=gpt-3.5-turbo'; routes are "
+        "timestamp_lookup, keyword_find, summary_recall and synthesis "
+        "(default: --query_model for all)",
+    )
     args = argparser.parse_args()
 
     mm_api = MinutesMakerAPI(
-        model=args.model, cpu_threads=args.cpu_threads, num_workers=args.num_workers
+        model=args.model,
+        cpu_threads=args.cpu_threads,
+        num_workers=args.num_workers,
+        data_dir=args.data_dir,
+        language_detection_seconds=args.language_detection_seconds,
+        summarize_strategy=args.summarize_strategy,
+        max_concurrency=args.max_concurrency,
+        llm_max_concurrency=args.llm_max_concurrency,
+        llm_max_streams=args.llm_max_streams,
+        llm_rpm=args.llm_rpm,
+        llm_tpm=args.llm_tpm,
+        model_registry=args.model_registry,
+        extractive_ratio=args.extractive_ratio,
+        query_context_tokens=args.query_context_tokens,
+        embedding_model=args.embedding_model,
+        query_cache_mb=args.query_cache_mb,
+        query_history_tokens=args.query_history_tokens,
+        answer_cache_ttl=args.answer_cache_ttl,
+        answer_similarity=args.answer_similarity,
+        query_model=args.query_model,
+        query_model_tiers=_parse_tiers(args.query_model_tiers),
     )
     uvicorn.run(mm_api.app, host="0.0.0.0", port=args.port)
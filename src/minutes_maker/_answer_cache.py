@@ -0,0 +1,216 @@
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from contextlib import closing
+from typing import Any, Optional
+
+import numpy as np
+
+from ._embeddings import Embedder
+from ._timestamps import time_terms
+
+
+def normalize_question(question: str) -> str:
+    """
+    Normalize a question for exact matching: Unicode compatibility forms,
+    case, punctuation and whitespace are ignored.
+
+    Parameters
+    ----------
+    question : str
+        The question.
+
+    Returns
+    -------
+    str
+        The normalized question, e.g. "when is the exam" for
+        "When is the exam?".
+    """
+    question = unicodedata.normalize("NFKC", question).casefold()
+    return " ".join(re.findall(r"\w+", question))
+
+
+class AnswerCache:
+    """
+    SQLite-backed cache of answers to questions about recordings.
+
+    Answers are keyed by the recording ID and the normalized question.
+    With an embedder, a question missing from the cache is also answered
+    by the cached question of the same recording most similar to it, if
+    their cosine similarity reaches `min_similarity` and they mention the
+    same numbers and times, see `time_terms`. Entries older than `max_age` are dropped.
+
+    Attributes
+    ----------
+    hits : int
+        The number of questions answered by an identical question.
+    similar_hits : int
+        The number of questions answered by a similar question.
+    misses : int
+        The number of questions not found in the cache.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        embedder: Optional[Embedder] = None,
+        *,
+        min_similarity: Optional[float] = 0.9,
+        max_age: float = 24 * 60 * 60,
+    ) -> None:
+        """
+        Initialize the cache.
+
+        Parameters
+        ----------
+        path : str
+            The path to the SQLite database file.
+        embedder : Embedder, optional
+            The embedder of questions for similarity matches,
+            by default None.
+        min_similarity : float, optional
+            The cosine similarity a cached question needs to answer
+            another one, by default 0.9. None disables similarity matches.
+        max_age : float, optional
+            Seconds an answer stays cached, by default 1 day.
+            0 disables the cache.
+        """
+        self.__path = path
+        self.__embedder = embedder if min_similarity is not None else None
+        self.__min_similarity = min_similarity
+        self.__max_age = max_age
+        self.__lock = threading.Lock()
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+        with closing(sqlite3.connect(self.__path)) as conn, conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS answers (
+                    recording_id TEXT NOT NULL,
+                    question TEXT NOT NULL,
+                    answer TEXT NOT NULL,
+                    embedder TEXT,
+                    embedding BLOB,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (recording_id, question)
+                )
+                """)
+
+    def get(self, recording_id: str, question: str) -> Optional[str]:
+        """
+        Look up the answer to a question.
+
+        Parameters
+        ----------
+        recording_id : str
+            The ID of the recording.
+        question : str
+            The question.
+
+        Returns
+        -------
+        str, optional
+            The cached answer, or None on a miss.
+        """
+        if self.__max_age <= 0:
+            return None
+        key = normalize_question(question)
+        oldest = time.time() - self.__max_age
+        with closing(sqlite3.connect(self.__path)) as conn:
+            row = conn.execute(
+                "SELECT answer FROM answers "
+                "WHERE recording_id = ? AND question = ? AND created_at >= ?",
+                (recording_id, key, oldest),
+            ).fetchone()
+            if row is not None:
+                with self.__lock:
+                    self.hits += 1
+                return row[0]
+
+            if self.__embedder is not None:
+                # questions about other amounts or times have other answers,
+                # e.g. "for 2024" and "for 2023", "the last ten minutes" and
+                # "the first 10 minutes"
+                terms = time_terms(key)
+                rows = [
+                    (answer, embedding)
+                    for question, answer, embedding in conn.execute(
+                        "SELECT question, answer, embedding FROM answers "
+                        "WHERE recording_id = ? AND embedder = ? AND created_at >= ?",
+                        (recording_id, self.__embedder.name, oldest),
+                    )
+                    if time_terms(question) == terms
+                ]
+                if rows:
+                    embeddings = np.frombuffer(
+                        b"".join(embedding for _, embedding in rows), dtype=np.float32
+                    ).reshape(len(rows), -1)
+                    similarities = embeddings @ self.__embedder.embed([key])[0]
+                    best = int(np.argmax(similarities))
+                    if similarities[best] >= self.__min_similarity:
+                        with self.__lock:
+                            self.similar_hits += 1
+                        return rows[best][0]
+
+        with self.__lock:
+            self.misses += 1
+        return None
+
+    def put(self, recording_id: str, question: str, answer: str) -> None:
+        """
+        Cache the answer to a question and drop expired answers.
+
+        Parameters
+        ----------
+        recording_id : str
+            The ID of the recording.
+        question : str
+            The question.
+        answer : str
+            The answer.
+        """
+        if self.__max_age <= 0:
+            return
+        key = normalize_question(question)
+        embedder, embedding = None, None
+        if self.__embedder is not None:
+            embedder = self.__embedder.name
+            embedding = self.__embedder.embed([key])[0].tobytes()
+        now = time.time()
+        with closing(sqlite3.connect(self.__path)) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?)",
+                (recording_id, key, answer, embedder, embedding, now),
+            )
+            conn.execute(
+                "DELETE FROM answers WHERE created_at < ?", (now - self.__max_age,)
+            )
+
+    def invalidate(self, recording_id: str) -> None:
+        """
+        Drop the answers about a recording.
+
+        Parameters
+        ----------
+        recording_id : str
+            The ID of the recording.
+        """
+        with closing(sqlite3.connect(self.__path)) as conn, conn:
+            conn.execute("DELETE FROM answers WHERE recording_id = ?", (recording_id,))
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        """
+        The hit/miss counters and the number of cached answers.
+        """
+        with closing(sqlite3.connect(self.__path)) as conn:
+            (entries,) = conn.execute("SELECT COUNT(*) FROM answers").fetchone()
+        return {
+            "hits": self.hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "entries": entries,
+        }
@@ -0,0 +1,287 @@
+import json
+import os
+import sys
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+
+from ._extractive import terms
+
+
+class BM25Index:
+    """
+    Okapi BM25 inverted index over the segments of a recording.
+
+    Postings are stored term by term in flat arrays (compressed sparse
+    rows), so a query only touches the postings of its own terms.
+    `BM25Index.load` memory-maps the arrays, so opening the index of a
+    long recording does not read it entirely.
+
+    Attributes
+    ----------
+    language : str, optional
+        The language the segments were tokenized for.
+    """
+
+    def __init__(
+        self,
+        vocabulary: dict[str, int],
+        offsets: np.ndarray,
+        doc_ids: np.ndarray,
+        term_freqs: np.ndarray,
+        doc_lengths: np.ndarray,
+        language: Optional[str] = None,
+    ) -> None:
+        """
+        Initialize the index from its arrays, see `BM25Index.build`.
+        """
+        self.language = language
+        self.__vocabulary = vocabulary
+        self.__offsets = offsets
+        self.__doc_ids = doc_ids
+        self.__term_freqs = term_freqs
+        self.__doc_lengths = doc_lengths
+        self.__avg_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+
+    def __len__(self) -> int:
+        return len(self.__doc_lengths)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The approximate memory used by the vocabulary and the postings.
+        """
+        return (
+            sys.getsizeof(self.__vocabulary)
+            + sum(sys.getsizeof(term) for term in self.__vocabulary)
+            + self.__offsets.nbytes
+            + self.__doc_ids.nbytes
+            + self.__term_freqs.nbytes
+            + self.__doc_lengths.nbytes
+        )
+
+    @classmethod
+    def build(cls, texts: Sequence[str], language: Optional[str] = None) -> "BM25Index":
+        """
+        Tokenize the segments and build their postings.
+
+        Parameters
+        ----------
+        texts : Sequence[str]
+            The text of each segment.
+        language : str, optional
+            The language of the segments, by default None.
+
+        Returns
+        -------
+        BM25Index
+            The index.
+        """
+        return cls.from_terms((terms(text, language) for text in texts), language)
+
+    @classmethod
+    def from_terms(
+        cls, documents: Iterable[Sequence[str]], language: Optional[str] = None
+    ) -> "BM25Index":
+        """
+        Build the postings of tokenized segments.
+
+        Parameters
+        ----------
+        documents : Iterable[Sequence[str]]
+            The terms of each segment.
+        language : str, optional
+            The language `BM25Index.search` tokenizes queries for,
+            by default None.
+
+        Returns
+        -------
+        BM25Index
+            The index.
+        """
+        vocabulary: dict[str, int] = {}
+        rows: list[int] = []
+        cols: list[int] = []
+        num_documents = 0
+        for row, document in enumerate(documents):
+            num_documents += 1
+            for term in document:
+                rows.append(row)
+                cols.append(vocabulary.setdefault(term, len(vocabulary)))
+
+        num_terms = max(len(vocabulary), 1)
+        rows_a = np.asarray(rows, dtype=np.int64)
+        keys, term_freqs = np.unique(
+            rows_a * num_terms + np.asarray(cols, dtype=np.int64), return_counts=True
+        )
+        doc_ids, term_ids = np.divmod(keys, num_terms)
+        # group the postings by term, documents ascending within a term
+        order = np.lexsort((doc_ids, term_ids))
+        offsets = np.searchsorted(term_ids[order], np.arange(len(vocabulary) + 1))
+        doc_lengths = np.bincount(rows_a, minlength=num_documents)
+        return cls(
+            vocabulary,
+            offsets.astype(np.int64),
+            doc_ids[order].astype(np.int32),
+            term_freqs[order].astype(np.int32),
+            doc_lengths.astype(np.int32),
+            language,
+        )
+
+    def search(
+        self, query: str, k: int = 8, *, k1: float = 1.5, b: float = 0.75
+    ) -> list[tuple[int, float]]:
+        """
+        Find the segments that best match a query.
+
+        Parameters
+        ----------
+        query : str
+            The query.
+        k : int, optional
+            The maximum number of results, by default 8.
+        k1 : float, optional
+            The term frequency saturation of BM25, by default 1.5.
+        b : float, optional
+            The length normalization of BM25, by default 0.75.
+
+        Returns
+        -------
+        list[tuple[int, float]]
+            The indices and scores of the matching segments,
+            best first. Segments sharing no term with the query are omitted.
+        """
+        return self.search_terms(set(terms(query, self.language)), k, k1=k1, b=b)
+
+    def doc_freq(self, term: str) -> int:
+        """
+        The number of segments containing a term.
+        """
+        term_id = self.__vocabulary.get(term)
+        if term_id is None:
+            return 0
+        return int(self.__offsets[term_id + 1] - self.__offsets[term_id])
+
+    @property
+    def total_length(self) -> int:
+        """
+        The number of terms of all the segments.
+        """
+        return int(self.__doc_lengths.sum())
+
+    def search_terms(
+        self,
+        query_terms: Iterable[str],
+        k: int = 8,
+        *,
+        k1: float = 1.5,
+        b: float = 0.75,
+        num_docs: Optional[int] = None,
+        doc_freqs: Optional[dict[str, int]] = None,
+        avg_length: Optional[float] = None,
+        mask: Optional[np.ndarray] = None,
+    ) -> list[tuple[int, float]]:
+        """
+        Find the segments that best match tokenized query terms.
+
+        The corpus statistics default to those of this index, and are
+        given by indexes that are one shard of a larger corpus.
+
+        Parameters
+        ----------
+        query_terms : Iterable[str]
+            The distinct terms of the query.
+        k : int, optional
+            The maximum number of results, by default 8.
+        k1 : float, optional
+            The term frequency saturation of BM25, by default 1.5.
+        b : float, optional
+            The length normalization of BM25, by default 0.75.
+        num_docs : int, optional
+            The number of segments of the corpus, by default None.
+        doc_freqs : dict[str, int], optional
+            The number of segments of the corpus containing each query
+            term, by default None.
+        avg_length : float, optional
+            The average number of terms of the segments of the corpus,
+            by default None.
+        mask : np.ndarray, optional
+            Whether each segment may be returned, by default None.
+
+        Returns
+        -------
+        list[tuple[int, float]]
+            The indices and scores of the matching segments,
+            best first. Segments sharing no term with the query are omitted.
+        """
+        num_docs = len(self) if num_docs is None else num_docs
+        avg_length = self.__avg_length if avg_length is None else avg_length
+        scores = np.zeros(len(self))
+        for term in query_terms:
+            term_id = self.__vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, stop = self.__offsets[term_id], self.__offsets[term_id + 1]
+            docs = self.__doc_ids[start:stop]
+            tf = self.__term_freqs[start:stop]
+            df = stop - start if doc_freqs is None else doc_freqs[term]
+            idf = np.log1p((num_docs - df + 0.5) / (df + 0.5))
+            norm = k1 * (1 - b + b * self.__doc_lengths[docs] / avg_length)
+            # documents are unique within a term, so no accumulation conflicts
+            scores[docs] += idf * tf * (k1 + 1) / (tf + norm)
+        if mask is not None:
+            scores[~mask] = 0
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        matched = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(int(idx), float(scores[idx])) for idx in matched]
+
+    def save(self, directory: str) -> None:
+        """
+        Write the index to a directory.
+
+        Parameters
+        ----------
+        directory : str
+            The directory to write to. It is created if missing.
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name, values in (
+            ("offsets", self.__offsets),
+            ("doc_ids", self.__doc_ids),
+            ("term_freqs", self.__term_freqs),
+            ("doc_lengths", self.__doc_lengths),
+        ):
+            np.save(os.path.join(directory, f"{name}.npy"), values)
+        path = os.path.join(directory, "vocabulary.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"language": self.language, "terms": self.__vocabulary},
+                f,
+                ensure_ascii=False,
+            )
+
+    @classmethod
+    def load(cls, directory: str) -> "BM25Index":
+        """
+        Read an index written by `BM25Index.save`.
+
+        Parameters
+        ----------
+        directory : str
+            The directory to read from.
+
+        Returns
+        -------
+        BM25Index
+            The loaded index.
+        """
+        with open(os.path.join(directory, "vocabulary.json"), encoding="utf-8") as f:
+            vocabulary = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+            for name in ("offsets", "doc_ids", "term_freqs", "doc_lengths")
+        }
+        return cls(vocabulary["terms"], **arrays, language=vocabulary["language"])
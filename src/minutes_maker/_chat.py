@@ -0,0 +1,263 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+import tiktoken
+
+from ._llm_client import LLMClient
+from ._prompt_lengths import MESSAGE_OVERHEAD
+
+COMPACTION_PROMPT = (
+    "Summarize the earlier part of a conversation about a recording in at most "
+    "5 sentences. Keep the facts, names, numbers and timestamps the user may "
+    "refer back to, and what the user wanted to know."
+)
+
+
+@dataclass(frozen=True)
+class ChatTurn:
+    """
+    A question and its answer.
+
+    Attributes
+    ----------
+    question : str
+        The question of the user.
+    answer : str
+        The answer of the assistant.
+    num_tokens : int
+        The tokens of both as chat messages.
+    """
+
+    question: str
+    answer: str
+    num_tokens: int
+
+
+@dataclass
+class ChatSession:
+    """
+    The conversation about a recording, for follow-up questions.
+
+    Attributes
+    ----------
+    id : str
+        The ID sent back by the client to continue the conversation.
+    recording_id : str
+        The recording the conversation is about.
+    summary : str
+        The summary of the compacted earlier turns, "" if none.
+    turns : list[ChatTurn]
+        The latest turns, oldest first.
+    context : list[int]
+        The timeline segments the latest question was answered from.
+    used_at : float
+        When the session was last used.
+    compaction : asyncio.Task, optional
+        The pending compaction of the oldest turns.
+    """
+
+    id: str
+    recording_id: str
+    summary: str = ""
+    turns: list[ChatTurn] = field(default_factory=list)
+    context: list[int] = field(default_factory=list)
+    used_at: float = field(default_factory=time.monotonic)
+    compaction: Optional[asyncio.Task] = None
+
+    @property
+    def num_tokens(self) -> int:
+        """
+        The tokens of the turns kept verbatim.
+        """
+        return sum(turn.num_tokens for turn in self.turns)
+
+    def history(self) -> list[dict[str, str]]:
+        """
+        The turns as chat messages, oldest first.
+        """
+        messages = []
+        for turn in self.turns:
+            messages.append({"role": "user", "content": turn.question})
+            messages.append({"role": "assistant", "content": turn.answer})
+        return messages
+
+
+class ChatSessionStore:
+    """
+    In-memory chat sessions with a token-bounded history.
+
+    Once the turns of a session exceed `history_tokens`, the oldest ones
+    are compacted into a short summary by the LLM in the background, and
+    the next question waits for it. Sessions idle for `max_idle` seconds
+    or beyond `max_sessions` are dropped.
+    """
+
+    def __init__(
+        self,
+        client: LLMClient,
+        model: str,
+        tokenizer: tiktoken.Encoding,
+        *,
+        history_tokens: int = 1000,
+        max_sessions: int = 1000,
+        max_idle: float = 60 * 60,
+    ) -> None:
+        """
+        Initialize the store.
+
+        Parameters
+        ----------
+        client : LLMClient
+            The client compacting histories.
+        model : str
+            The model compacting histories.
+        tokenizer : tiktoken.Encoding
+            The tokenizer of the model answering questions.
+        history_tokens : int, optional
+            The tokens of the turns kept verbatim, by default 1000.
+        max_sessions : int, optional
+            The maximum number of sessions, by default 1000.
+        max_idle : float, optional
+            Seconds an unused session is kept, by default 1 hour.
+        """
+        self.__client = client
+        self.__model = model
+        self.__tokenizer = tokenizer
+        self.__history_tokens = history_tokens
+        self.__max_sessions = max_sessions
+        self.__max_idle = max_idle
+        self.__sessions: OrderedDict[str, ChatSession] = OrderedDict()
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        """
+        Look a session up.
+
+        Parameters
+        ----------
+        session_id : str
+            The ID of the session.
+
+        Returns
+        -------
+        ChatSession, optional
+            The session, or None if unknown or expired.
+        """
+        self.__expire()
+        session = self.__sessions.get(session_id)
+        if session is not None:
+            session.used_at = time.monotonic()
+            self.__sessions.move_to_end(session_id)
+        return session
+
+    def create(self, recording_id: str) -> ChatSession:
+        """
+        Start a session.
+
+        Parameters
+        ----------
+        recording_id : str
+            The recording the conversation is about.
+
+        Returns
+        -------
+        ChatSession
+            The new session.
+        """
+        session = ChatSession(id=uuid.uuid4().hex, recording_id=recording_id)
+        self.__sessions[session.id] = session
+        self.__expire()
+        return session
+
+    async def history(self, session: ChatSession) -> tuple[str, list[dict[str, str]]]:
+        """
+        Get the history of a session, waiting for a pending compaction.
+
+        Parameters
+        ----------
+        session : ChatSession
+            The session.
+
+        Returns
+        -------
+        tuple[str, list[dict[str, str]]]
+            The summary of the compacted turns, "" if none, and the
+            remaining turns as chat messages.
+        """
+        if session.compaction is not None:
+            await asyncio.shield(session.compaction)
+        return session.summary, session.history()
+
+    def record(self, session: ChatSession, question: str, answer: str) -> None:
+        """
+        Add a turn to a session, compacting the history in the background
+        when it exceeds the budget.
+
+        Parameters
+        ----------
+        session : ChatSession
+            The session.
+        question : str
+            The question of the user.
+        answer : str
+            The answer of the assistant.
+        """
+        num_tokens = (
+            len(self.__tokenizer.encode_ordinary(question))
+            + len(self.__tokenizer.encode_ordinary(answer))
+            + 2 * MESSAGE_OVERHEAD
+        )
+        session.turns.append(ChatTurn(question, answer, num_tokens))
+        if session.num_tokens > self.__history_tokens and session.compaction is None:
+            session.compaction = asyncio.create_task(self.__compact(session))
+
+    async def __compact(self, session: ChatSession) -> None:
+        """
+        Summarize the oldest turns of a session with its earlier summary,
+        keeping the latest turns within half of the budget verbatim.
+        """
+        boundary, num_tokens = len(session.turns), 0
+        while boundary > 0:
+            num_tokens += session.turns[boundary - 1].num_tokens
+            if num_tokens > self.__history_tokens // 2:
+                break
+            boundary -= 1
+        compacted = session.turns[:boundary]
+
+        transcript = "\n\n".join(
+            f"User: {turn.question}\nAssistant: {turn.answer}" for turn in compacted
+        )
+        if session.summary:
+            transcript = (
+                f"Summary of the turns before:\n{session.summary}\n\n{transcript}"
+            )
+        try:
+            session.summary = await self.__client.complete(
+                self.__model,
+                [
+                    {"role": "system", "content": COMPACTION_PROMPT},
+                    {"role": "user", "content": transcript},
+                ],
+                max_tokens=256,
+            )
+            del session.turns[:boundary]
+        except Exception as e:
+            # the turns stay verbatim and are compacted after the next turn
+            logging.warning(f"failed to compact chat session {session.id}: {e}")
+        finally:
+            session.compaction = None
+
+    def __expire(self) -> None:
+        now = time.monotonic()
+        while self.__sessions:
+            session = next(iter(self.__sessions.values()))
+            if (
+                len(self.__sessions) <= self.__max_sessions
+                and now - session.used_at <= self.__max_idle
+            ):
+                break
+            self.__sessions.popitem(last=False)
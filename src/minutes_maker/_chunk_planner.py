@@ -0,0 +1,172 @@
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Optional, Sequence
+
+import tiktoken
+
+
+class ChunkPlanner:
+    """
+    Plan chunk boundaries of a transcript at sentence edges.
+
+    Every sentence is tokenized exactly once and the cumulative token
+    counts are kept in an array, so the token count of any sentence range
+    is a subtraction and the largest range fitting in a budget is found
+    by binary search.
+
+    Attributes
+    ----------
+    sentences : list[str]
+        The sentences of the transcript. Sentences longer than
+        `max_sentence_tokens` are split into pieces, see `ChunkPlanner.source`.
+    """
+
+    def __init__(
+        self,
+        tokenizer: tiktoken.Encoding,
+        sentences: list[str],
+        *,
+        max_sentence_tokens: Optional[int] = None,
+    ) -> None:
+        """
+        Tokenize the sentences and build the cumulative token counts.
+
+        Parameters
+        ----------
+        tokenizer : tiktoken.Encoding
+            The tokenizer of the model.
+        sentences : list[str]
+            The sentences of the transcript, joined by newlines.
+        max_sentence_tokens : int, optional
+            Split sentences longer than this into pieces,
+            by default None (never split).
+        """
+        tokenized = tokenizer.encode_ordinary_batch(sentences)
+        # index of the input sentence of each piece, None while nothing is split
+        self.__sources: Optional[array] = None
+        if max_sentence_tokens is not None and any(
+            len(tokens) > max_sentence_tokens for tokens in tokenized
+        ):
+            pieces: list[str] = []
+            piece_tokens: list[list[int]] = []
+            self.__sources = array("q")
+            for idx, (sentence, tokens) in enumerate(zip(sentences, tokenized)):
+                if len(tokens) <= max_sentence_tokens:
+                    pieces.append(sentence)
+                    piece_tokens.append(tokens)
+                    self.__sources.append(idx)
+                    continue
+                for i in range(0, len(tokens), max_sentence_tokens):
+                    piece_tokens.append(tokens[i : i + max_sentence_tokens])
+                    pieces.append(tokenizer.decode(piece_tokens[-1]))
+                    self.__sources.append(idx)
+            sentences, tokenized = pieces, piece_tokens
+
+        self.sentences = sentences
+        # +1 for the newline joining each sentence to the next
+        self.__cumulative = array(
+            "q", accumulate((len(tokens) + 1 for tokens in tokenized), initial=0)
+        )
+
+    def __len__(self) -> int:
+        return len(self.sentences)
+
+    def source(self, idx: int) -> int:
+        """
+        Map the index of a (possibly split) sentence to the index of the
+        input sentence it comes from.
+        """
+        return idx if self.__sources is None else self.__sources[idx]
+
+    def select(self, indices: Sequence[int]) -> "ChunkPlanner":
+        """
+        Build a planner over a subset of the sentences without
+        tokenizing them again.
+
+        Parameters
+        ----------
+        indices : Sequence[int]
+            The increasing indices of the sentences to keep.
+
+        Returns
+        -------
+        ChunkPlanner
+            The planner over the kept sentences, whose `source` maps back
+            to the input sentences of this planner.
+        """
+        planner = object.__new__(ChunkPlanner)
+        planner.sentences = [self.sentences[idx] for idx in indices]
+        planner.__sources = array("q", (self.source(idx) for idx in indices))
+        planner.__cumulative = array(
+            "q",
+            accumulate((self.num_tokens(idx, idx + 1) for idx in indices), initial=0),
+        )
+        return planner
+
+    def sentence_tokens(self) -> list[int]:
+        """
+        Count the tokens of each sentence, including its newline.
+        """
+        return [b - a for a, b in zip(self.__cumulative, self.__cumulative[1:])]
+
+    def num_tokens(self, start: int = 0, stop: Optional[int] = None) -> int:
+        """
+        Count the tokens of the sentences in `[start, stop)`.
+        """
+        stop = len(self) if stop is None else stop
+        return self.__cumulative[stop] - self.__cumulative[start]
+
+    def text(self, start: int = 0, stop: Optional[int] = None) -> str:
+        """
+        Join the sentences in `[start, stop)` by newlines.
+        """
+        return "\n".join(self.sentences[start:stop])
+
+    def fit(self, budget: int, start: int = 0) -> int:
+        """
+        Find the end of the longest sentence range from `start` that fits
+        in `budget` tokens.
+
+        Parameters
+        ----------
+        budget : int
+            The maximum number of tokens.
+        start : int, optional
+            The index of the first sentence, by default 0.
+
+        Returns
+        -------
+        int
+            The exclusive end index. At least one sentence is always taken,
+            so the range may exceed `budget` when a single sentence does.
+        """
+        stop = (
+            bisect_right(
+                self.__cumulative, self.__cumulative[start] + budget, lo=start + 1
+            )
+            - 1
+        )
+        return min(max(stop, start + 1), len(self))
+
+    def plan(self, budget: int) -> list[tuple[int, int]]:
+        """
+        Split all sentences into consecutive ranges of at most `budget` tokens.
+
+        Parameters
+        ----------
+        budget : int
+            The maximum number of tokens per chunk.
+
+        Returns
+        -------
+        list[tuple[int, int]]
+            The `(start, stop)` sentence ranges of the chunks.
+        """
+        ranges = []
+        start = 0
+        while start < len(self):
+            stop = self.fit(budget, start)
+            ranges.append((start, stop))
+            start = stop
+        return ranges
@@ -0,0 +1,480 @@
+import copy
+import heapq
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import uuid
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import numpy as np
+
+from ._bm25 import BM25Index
+from ._extractive import terms
+from ._recordings import RecordingStore
+from ._segments import SegmentStore
+
+# scripts written without spaces between words
+_UNSEGMENTED = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]")
+
+
+def corpus_terms(text: str) -> list[str]:
+    """
+    Split a text of any language into lowercase terms: words, or character
+    bigrams of the words of Japanese and Chinese text, so that recordings
+    and queries of different languages share one index.
+
+    Parameters
+    ----------
+    text : str
+        The text.
+
+    Returns
+    -------
+    list[str]
+        The terms in order of appearance.
+    """
+    result = []
+    for word in terms(text, None):
+        if _UNSEGMENTED.search(word):
+            result.extend(word[i : i + 2] for i in range(max(len(word) - 1, 1)))
+        else:
+            result.append(word)
+    return result
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    """
+    A segment matching a corpus-wide search.
+
+    Attributes
+    ----------
+    recording_id : str
+        The recording of the segment.
+    segment : int
+        The index of the segment in the recording.
+    start_ms : int
+        The start time of the segment in milliseconds.
+    end_ms : int
+        The end time of the segment in milliseconds.
+    text : str
+        The text of the segment.
+    score : float
+        The BM25 score of the segment.
+    """
+
+    recording_id: str
+    segment: int
+    start_ms: int
+    end_ms: int
+    text: str
+    score: float
+
+
+@dataclass(frozen=True)
+class _Shard:
+    """
+    The BM25 index of the segments of some recordings, with the recording
+    and the segment index of each of its documents.
+    """
+
+    index: BM25Index
+    recording_ids: list[str]
+    doc_recordings: np.ndarray
+    doc_segments: np.ndarray
+
+    @classmethod
+    def load(cls, directory: str) -> "_Shard":
+        with open(os.path.join(directory, "recordings.json"), encoding="utf-8") as f:
+            recording_ids = json.load(f)
+        return cls(
+            BM25Index.load(directory),
+            recording_ids,
+            np.load(os.path.join(directory, "doc_recordings.npy"), mmap_mode="r"),
+            np.load(os.path.join(directory, "doc_segments.npy"), mmap_mode="r"),
+        )
+
+
+@dataclass(frozen=True)
+class _State:
+    """
+    An immutable snapshot of the index, replaced as a whole by writers so
+    that searches never see a half-updated index.
+    """
+
+    manifest: dict[str, Any]
+    shards: dict[str, _Shard]
+    # the documents of recordings indexed again since, None if all are live
+    masks: dict[str, Optional[np.ndarray]]
+
+
+class CorpusIndex:
+    """
+    BM25 index over the segments of all the recordings, sharded on disk.
+
+    Every recording is indexed into a new small shard as soon as it is
+    transcribed. Whenever `merge_factor` shards of the same size tier
+    exist, they are merged into one of at most `max_shard_docs` segments
+    by a background thread, so the number of shards grows
+    logarithmically with the corpus without delaying new recordings. A
+    merge interrupted by the process exiting is redone later. Shards are
+    memory-mapped, and scores use corpus-wide statistics, so results do
+    not depend on the sharding. A recording indexed again is masked out of
+    its previous shard until the shard is merged.
+
+    `manifest.json` lists the shards and the shard of each recording and
+    is replaced atomically after the shards are written.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        recordings: RecordingStore,
+        *,
+        merge_factor: int = 10,
+        max_shard_docs: int = 2_000_000,
+    ) -> None:
+        """
+        Open the index, creating it if missing.
+
+        Parameters
+        ----------
+        directory : str
+            The directory of the index.
+        recordings : RecordingStore
+            The store of the indexed recordings.
+        merge_factor : int, optional
+            The number of shards of a size tier merged at once,
+            by default 10.
+        max_shard_docs : int, optional
+            The number of segments above which shards are not merged,
+            by default 2,000,000.
+        """
+        self.__directory = directory
+        self.__recordings = recordings
+        self.__merge_factor = merge_factor
+        self.__max_shard_docs = max_shard_docs
+        # held while the manifest is replaced
+        self.__lock = threading.Lock()
+        self.__merger: Optional[threading.Thread] = None
+        self.__merge_requested = False
+        self.__synced = False
+
+        os.makedirs(directory, exist_ok=True)
+        manifest = {"shards": {}, "recordings": {}}
+        path = os.path.join(directory, "manifest.json")
+        if os.path.isfile(path):
+            with open(path, encoding="utf-8") as f:
+                manifest = json.load(f)
+        # shards and staging directories left by an interrupted write
+        for name in os.listdir(directory):
+            entry = os.path.join(directory, name)
+            if os.path.isdir(entry) and name not in manifest["shards"]:
+                shutil.rmtree(entry, ignore_errors=True)
+        self.__state = self.__snapshot(manifest, {})
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """
+        The number of shards, recordings and segments of the index.
+        """
+        state = self.__state
+        return {
+            "shards": len(state.shards),
+            "recordings": len(state.manifest["recordings"]),
+            "segments": sum(
+                info["num_docs"] for info in state.manifest["recordings"].values()
+            ),
+        }
+
+    def add(self, recording_id: str, segments: SegmentStore) -> None:
+        """
+        Index the segments of a recording, replacing its previous version.
+
+        Parameters
+        ----------
+        recording_id : str
+            The ID of the recording.
+        segments : SegmentStore
+            The segments of the recording.
+        """
+        name, lengths = self.__write_shard({recording_id: segments})
+        with self.__lock:
+            manifest = copy.deepcopy(self.__state.manifest)
+            manifest["shards"][name] = {"num_docs": len(segments)}
+            manifest["recordings"][recording_id] = {
+                "shard": name,
+                "num_docs": len(segments),
+                "length": lengths[recording_id],
+            }
+            self.__commit(manifest)
+        self.__request_merge()
+
+    def sync(self) -> int:
+        """
+        Index the saved recordings missing from the index, e.g. those
+        transcribed before it existed. Only the first call of a process
+        looks for them.
+
+        Returns
+        -------
+        int
+            The number of recordings indexed.
+        """
+        if self.__synced:
+            return 0
+        missing = [
+            recording_id
+            for recording_id in self.__recordings.ids()
+            if recording_id not in self.__state.manifest["recordings"]
+        ]
+        for recording_id in missing:
+            self.add(recording_id, self.__recordings.load_segments(recording_id))
+        self.__synced = True
+        if missing:
+            logging.info(f"indexed {len(missing)} recordings for corpus search.")
+        return len(missing)
+
+    def search(self, query: str, k: int = 10) -> list[SearchHit]:
+        """
+        Find the segments of all the recordings that best match a query.
+
+        Parameters
+        ----------
+        query : str
+            The query.
+        k : int, optional
+            The maximum number of results, by default 10.
+
+        Returns
+        -------
+        list[SearchHit]
+            The matching segments, best first.
+        """
+        state = self.__state
+        query_terms = list(dict.fromkeys(corpus_terms(query)))
+        recordings = state.manifest["recordings"]
+        num_docs = sum(info["num_docs"] for info in recordings.values())
+        if not query_terms or not num_docs:
+            return []
+        avg_length = sum(info["length"] for info in recordings.values()) / num_docs
+        doc_freqs = {
+            term: sum(shard.index.doc_freq(term) for shard in state.shards.values())
+            for term in query_terms
+        }
+
+        candidates = []
+        for name, shard in state.shards.items():
+            for doc, score in shard.index.search_terms(
+                query_terms,
+                k,
+                num_docs=num_docs,
+                doc_freqs=doc_freqs,
+                avg_length=avg_length,
+                mask=state.masks[name],
+            ):
+                recording_id = shard.recording_ids[shard.doc_recordings[doc]]
+                candidates.append((score, recording_id, int(shard.doc_segments[doc])))
+
+        hits = []
+        loaded: dict[str, SegmentStore] = {}
+        for score, recording_id, segment in heapq.nlargest(k, candidates):
+            if recording_id not in loaded:
+                loaded[recording_id] = self.__recordings.load_segments(recording_id)
+            segments = loaded[recording_id]
+            if segment >= len(segments):
+                continue
+            hits.append(
+                SearchHit(
+                    recording_id,
+                    segment,
+                    segments.starts[segment],
+                    segments.ends[segment],
+                    segments.text(segment),
+                    score,
+                )
+            )
+        return hits
+
+    def __request_merge(self) -> None:
+        """
+        Merge the shards in a background thread, started unless one is
+        running; a running one looks at the new shards too.
+        """
+        with self.__lock:
+            self.__merge_requested = True
+            if self.__merger is None:
+                self.__merger = threading.Thread(
+                    target=self.__merge_loop, name="corpus-merge", daemon=True
+                )
+                self.__merger.start()
+
+    def __merge_loop(self) -> None:
+        while True:
+            with self.__lock:
+                if not self.__merge_requested:
+                    self.__merger = None
+                    return
+                self.__merge_requested = False
+            try:
+                self.__merge()
+            except Exception as e:
+                # retried after the next recording is added
+                logging.warning(f"failed to merge corpus index shards: {e}")
+
+    def __tier(self, num_docs: int) -> int:
+        """
+        The size tier of a shard: 0 below `merge_factor` segments, 1 below
+        its square and so on.
+        """
+        tier = 0
+        while num_docs >= self.__merge_factor:
+            num_docs //= self.__merge_factor
+            tier += 1
+        return tier
+
+    def __pick_merge(self, manifest: dict[str, Any]) -> list[str]:
+        """
+        The smallest shards of a full size tier that fit in one shard of
+        `max_shard_docs` segments, none if no tier has two such shards.
+        """
+        shards = manifest["shards"]
+        tiers: dict[int, list[str]] = {}
+        for name, info in shards.items():
+            if info["num_docs"] < self.__max_shard_docs:
+                tiers.setdefault(self.__tier(info["num_docs"]), []).append(name)
+        for names in tiers.values():
+            if len(names) < self.__merge_factor:
+                continue
+            names.sort(key=lambda name: shards[name]["num_docs"])
+            picked, num_docs = [], 0
+            for name in names[: self.__merge_factor]:
+                if num_docs + shards[name]["num_docs"] > self.__max_shard_docs:
+                    break
+                picked.append(name)
+                num_docs += shards[name]["num_docs"]
+            if len(picked) > 1:
+                return picked
+        return []
+
+    def __merge(self) -> None:
+        """
+        Merge the shards of full size tiers, until none is full.
+
+        Shards are read and written without the lock, so recordings added
+        meanwhile are indexed at once; those indexed again stay masked in
+        the merged shard.
+        """
+        while True:
+            manifest = self.__state.manifest
+            names = self.__pick_merge(manifest)
+            if not names:
+                return
+
+            live = {
+                recording_id: self.__recordings.load_segments(recording_id)
+                for recording_id, info in manifest["recordings"].items()
+                if info["shard"] in names and self.__recordings.exists(recording_id)
+            }
+            merged = self.__write_shard(live)[0] if live else None
+            with self.__lock:
+                manifest = copy.deepcopy(self.__state.manifest)
+                for name in names:
+                    manifest["shards"].pop(name, None)
+                for recording_id, info in list(manifest["recordings"].items()):
+                    if info["shard"] not in names:
+                        continue
+                    if recording_id in live:
+                        info["shard"] = merged
+                    else:
+                        del manifest["recordings"][recording_id]
+                if merged is not None:
+                    manifest["shards"][merged] = {
+                        "num_docs": sum(len(segments) for segments in live.values())
+                    }
+                self.__commit(manifest)
+
+    def __write_shard(
+        self, recordings: dict[str, SegmentStore]
+    ) -> tuple[str, dict[str, int]]:
+        """
+        Index the segments of recordings into a new shard.
+
+        Returns the name of the shard and the number of terms of each
+        recording.
+        """
+        recording_ids = list(recordings)
+        lengths = dict.fromkeys(recording_ids, 0)
+        documents, doc_recordings, doc_segments = [], [], []
+        for position, (recording_id, segments) in enumerate(recordings.items()):
+            for segment, (_, _, text) in enumerate(segments):
+                documents.append(corpus_terms(text))
+                doc_recordings.append(position)
+                doc_segments.append(segment)
+                lengths[recording_id] += len(documents[-1])
+        index = BM25Index.from_terms(documents)
+
+        name = f"shard-{uuid.uuid4().hex[:16]}"
+        staging = tempfile.mkdtemp(dir=self.__directory)
+        index.save(staging)
+        np.save(
+            os.path.join(staging, "doc_recordings.npy"),
+            np.asarray(doc_recordings, dtype=np.int32),
+        )
+        np.save(
+            os.path.join(staging, "doc_segments.npy"),
+            np.asarray(doc_segments, dtype=np.int32),
+        )
+        with open(os.path.join(staging, "recordings.json"), "w", encoding="utf-8") as f:
+            json.dump(recording_ids, f)
+        os.replace(staging, os.path.join(self.__directory, name))
+        return name, lengths
+
+    def __commit(self, manifest: dict[str, Any]) -> None:
+        """
+        Write the manifest, switch searches to it and delete the shards it
+        no longer lists. Called with the lock held.
+        """
+        # shards without live recordings are dropped
+        used = {info["shard"] for info in manifest["recordings"].values()}
+        for name in list(manifest["shards"]):
+            if name not in used:
+                del manifest["shards"][name]
+
+        path = os.path.join(self.__directory, "manifest.json")
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(f"{path}.tmp", path)
+
+        previous = self.__state
+        self.__state = self.__snapshot(manifest, previous.shards)
+        for name in previous.shards.keys() - self.__state.shards.keys():
+            # open memory maps stay valid after the files are removed
+            shutil.rmtree(os.path.join(self.__directory, name), ignore_errors=True)
+
+    def __snapshot(self, manifest: dict[str, Any], opened: dict[str, _Shard]) -> _State:
+        """
+        Open the shards of a manifest, reusing already opened ones.
+        """
+        shards = {
+            name: opened.get(name) or _Shard.load(os.path.join(self.__directory, name))
+            for name in manifest["shards"]
+        }
+        masks: dict[str, Optional[np.ndarray]] = {}
+        for name, shard in shards.items():
+            live = [
+                position
+                for position, recording_id in enumerate(shard.recording_ids)
+                if manifest["recordings"].get(recording_id, {}).get("shard") == name
+            ]
+            masks[name] = (
+                None
+                if len(live) == len(shard.recording_ids)
+                else np.isin(shard.doc_recordings, live)
+            )
+        return _State(manifest, shards, masks)
@@ -0,0 +1,293 @@
+import os
+import re
+import zlib
+from typing import Optional, Protocol, Sequence
+
+import numpy as np
+
+
+class Embedder(Protocol):
+    """
+    Embeds texts into L2-normalized vectors, so that their dot product
+    is their cosine similarity.
+
+    Attributes
+    ----------
+    name : str
+        The name of the embedding, used in file names so that indexes
+        built by different embedders do not mix.
+    min_similarity : float
+        The cosine similarity up to which texts are considered unrelated.
+    """
+
+    name: str
+    min_similarity: float
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray: ...
+
+
+class HashingEmbedder:
+    """
+    Embed texts offline by hashing their words and the character n-grams
+    of their words into a fixed number of signed buckets.
+
+    Shared n-grams make inflections and misspelled transcriptions of the
+    same word similar, e.g. "budget" and "budgets", without any model.
+    Paraphrases sharing no word need a model, see `SentenceTransformerEmbedder`.
+    """
+
+    def __init__(self, dim: int = 512, ngram_range: tuple[int, int] = (3, 5)) -> None:
+        """
+        Initialize the embedder.
+
+        Parameters
+        ----------
+        dim : int, optional
+            The number of dimensions, by default 512.
+        ngram_range : tuple[int, int], optional
+            The minimum and maximum length of the character n-grams,
+            by default (3, 5).
+        """
+        self.name = f"hashing-{dim}"
+        # texts sharing only common n-grams score about 0.1
+        self.min_similarity = 0.2
+        self.__dim = dim
+        self.__ngram_range = ngram_range
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embed texts.
+
+        Parameters
+        ----------
+        texts : Sequence[str]
+            The texts.
+
+        Returns
+        -------
+        np.ndarray
+            The float32 embeddings, one normalized row per text.
+            Texts without any word get a zero row.
+        """
+        rows: list[int] = []
+        hashes: list[int] = []
+        for row, text in enumerate(texts):
+            for feature in self.__features(text):
+                rows.append(row)
+                hashes.append(zlib.crc32(feature.encode("utf-8")))
+
+        hashes_a = np.asarray(hashes, dtype=np.int64)
+        cols = hashes_a % self.__dim
+        # a hash-derived sign keeps colliding features from adding up
+        signs = np.where((hashes_a // self.__dim) & 1, 1.0, -1.0)
+        vectors = np.bincount(
+            np.asarray(rows, dtype=np.int64) * self.__dim + cols,
+            weights=signs,
+            minlength=len(texts) * self.__dim,
+        ).reshape(len(texts), self.__dim)
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return (vectors / np.maximum(norms, 1e-12)).astype(np.float32)
+
+    def __features(self, text: str) -> list[str]:
+        low, high = self.__ngram_range
+        features = []
+        for word in re.findall(r"\w+", text.lower()):
+            features.append(word)
+            padded = f"<{word}>"
+            for n in range(low, min(high, len(padded)) + 1):
+                features.extend(padded[i : i + n] for i in range(len(padded) - n + 1))
+        return features
+
+
+class SentenceTransformerEmbedder:
+    """
+    Embed texts with a local sentence-transformers model, which also
+    matches paraphrases, e.g. "money" and "budget".
+
+    Requires the optional `sentence-transformers` package; the model is
+    downloaded once and then runs offline.
+    """
+
+    def __init__(self, model_name: str) -> None:
+        """
+        Load the model.
+
+        Parameters
+        ----------
+        model_name : str
+            The sentence-transformers model, e.g. "all-MiniLM-L6-v2".
+        """
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                f"Embedding model {model_name!r} requires sentence-transformers: "
+                "pip install 'minutes-maker[embeddings]'"
+            ) from e
+
+        self.name = model_name.replace("/", "--")
+        self.min_similarity = 0.3
+        self.__model = SentenceTransformer(model_name)
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embed texts.
+
+        Parameters
+        ----------
+        texts : Sequence[str]
+            The texts.
+
+        Returns
+        -------
+        np.ndarray
+            The float32 embeddings, one normalized row per text.
+        """
+        return self.__model.encode(
+            list(texts), normalize_embeddings=True, convert_to_numpy=True
+        ).astype(np.float32)
+
+
+def get_embedder(embedding_model: Optional[str]) -> Optional[Embedder]:
+    """
+    Create the embedder of a model name.
+
+    Parameters
+    ----------
+    embedding_model : str, optional
+        "hashing" for `HashingEmbedder`, "none" or None to disable
+        embeddings, or else a sentence-transformers model.
+
+    Returns
+    -------
+    Embedder, optional
+        The embedder, or None if disabled.
+    """
+    if embedding_model is None or embedding_model == "none":
+        return None
+    if embedding_model == "hashing":
+        return HashingEmbedder()
+    return SentenceTransformerEmbedder(embedding_model)
+
+
+class EmbeddingIndex:
+    """
+    Dense vectors of the segments of a recording, searched by cosine
+    similarity with a single matrix-vector product.
+
+    `EmbeddingIndex.load` memory-maps the matrix, so opening the index
+    of a long recording does not read it entirely.
+    """
+
+    def __init__(self, embeddings: np.ndarray, embedder: Embedder) -> None:
+        """
+        Initialize the index, see `EmbeddingIndex.build`.
+
+        Parameters
+        ----------
+        embeddings : np.ndarray
+            The normalized embeddings of the segments.
+        embedder : Embedder
+            The embedder of the segments and queries.
+        """
+        self.__embeddings = embeddings
+        self.__embedder = embedder
+
+    def __len__(self) -> int:
+        return len(self.__embeddings)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The memory used by the embeddings in bytes.
+        """
+        return self.__embeddings.nbytes
+
+    @staticmethod
+    def path(directory: str, embedder: Embedder) -> str:
+        """
+        The file of the embeddings of an embedder in an index directory.
+        """
+        return os.path.join(directory, f"embeddings-{embedder.name}.npy")
+
+    @classmethod
+    def build(cls, texts: Sequence[str], embedder: Embedder) -> "EmbeddingIndex":
+        """
+        Embed the segments.
+
+        Parameters
+        ----------
+        texts : Sequence[str]
+            The text of each segment.
+        embedder : Embedder
+            The embedder.
+
+        Returns
+        -------
+        EmbeddingIndex
+            The index.
+        """
+        return cls(embedder.embed(texts), embedder)
+
+    def search(self, query: str, k: int = 8) -> list[tuple[int, float]]:
+        """
+        Find the segments most similar to a query.
+
+        Parameters
+        ----------
+        query : str
+            The query.
+        k : int, optional
+            The maximum number of results, by default 8.
+
+        Returns
+        -------
+        list[tuple[int, float]]
+            The indices and cosine similarities of the most similar
+            segments, best first. Segments not more similar than the
+            `min_similarity` of the embedder are omitted.
+        """
+        if len(self) == 0:
+            return []
+        scores = self.__embeddings @ self.__embedder.embed([query])[0]
+        candidates = np.flatnonzero(scores > self.__embedder.min_similarity)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(idx), float(scores[idx])) for idx in candidates]
+
+    def save(self, directory: str) -> None:
+        """
+        Write the embeddings to a directory, replacing them atomically.
+
+        Parameters
+        ----------
+        directory : str
+            The directory to write to. It is created if missing.
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = self.path(directory, self.__embedder)
+        # np.save appends ".npy" to names without it
+        tmp_path = f"{path}.tmp.npy"
+        np.save(tmp_path, self.__embeddings)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, directory: str, embedder: Embedder) -> "EmbeddingIndex":
+        """
+        Read embeddings written by `EmbeddingIndex.save`.
+
+        Parameters
+        ----------
+        directory : str
+            The directory to read from.
+        embedder : Embedder
+            The embedder the embeddings were written by.
+
+        Returns
+        -------
+        EmbeddingIndex
+            The loaded index.
+        """
+        return cls(np.load(cls.path(directory, embedder), mmap_mode="r"), embedder)
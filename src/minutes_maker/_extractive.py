@@ -0,0 +1,560 @@
+import re
+from typing import Optional, Sequence
+
+import numpy as np
+
+# Phrases that carry no content on their own. A sentence is dropped only
+# when nothing but these phrases, punctuation and whitespace is left.
+FILLER_PHRASES: dict[str, tuple[str, ...]] = {
+    "en": (
+        "can you hear me",
+        "can everyone hear me",
+        "can you see my screen",
+        "you're on mute",
+        "you are on mute",
+        "i think you're muted",
+        "sorry, go ahead",
+        "go ahead",
+        "one second",
+        "just a second",
+        "let me share my screen",
+        "is my screen visible",
+        "hello",
+        "hi",
+        "hey",
+        "okay",
+        "ok",
+        "alright",
+        "all right",
+        "yeah",
+        "yes",
+        "yep",
+        "no",
+        "right",
+        "sure",
+        "uh",
+        "um",
+        "uh-huh",
+        "mm-hmm",
+        "hmm",
+        "so",
+        "well",
+        "thanks",
+        "thank you",
+        "i see",
+        "got it",
+        "cool",
+        "great",
+        "perfect",
+        "exactly",
+        "sorry",
+        "you know",
+        "i mean",
+        "like",
+        "and",
+        "bye",
+        "see you",
+    ),
+    "ja": (
+        "聞こえますか",
+        "聞こえてますか",
+        "画面見えますか",
+        "画面共有します",
+        "ミュートになってます",
+        "ミュートです",
+        "少々お待ちください",
+        "えー",
+        "えーと",
+        "えっと",
+        "あの",
+        "あのー",
+        "その",
+        "まあ",
+        "はい",
+        "うん",
+        "ええ",
+        "そうですね",
+        "なるほど",
+        "ありがとうございます",
+        "お願いします",
+        "よろしくお願いします",
+        "すみません",
+        "じゃあ",
+    ),
+    "es": (
+        "me oyes",
+        "me escuchan",
+        "me oyen",
+        "estás en silencio",
+        "estás silenciado",
+        "un momento",
+        "un segundo",
+        "comparto pantalla",
+        "hola",
+        "vale",
+        "bueno",
+        "sí",
+        "si",
+        "no",
+        "claro",
+        "eh",
+        "este",
+        "o sea",
+        "pues",
+        "gracias",
+        "perfecto",
+        "exacto",
+        "vale vale",
+    ),
+    "fr": (
+        "vous m'entendez",
+        "tu m'entends",
+        "vous êtes en sourdine",
+        "tu es en sourdine",
+        "un instant",
+        "une seconde",
+        "je partage mon écran",
+        "bonjour",
+        "salut",
+        "d'accord",
+        "ok",
+        "oui",
+        "non",
+        "euh",
+        "bah",
+        "ben",
+        "voilà",
+        "bon",
+        "alors",
+        "merci",
+        "parfait",
+        "exactement",
+    ),
+    "de": (
+        "hört ihr mich",
+        "hören sie mich",
+        "können sie mich hören",
+        "du bist stumm",
+        "sie sind stummgeschaltet",
+        "einen moment",
+        "eine sekunde",
+        "ich teile meinen bildschirm",
+        "hallo",
+        "okay",
+        "ok",
+        "ja",
+        "nein",
+        "genau",
+        "äh",
+        "ähm",
+        "also",
+        "gut",
+        "danke",
+        "super",
+        "richtig",
+        "na ja",
+    ),
+    "zh": (
+        "能听到吗",
+        "听得到吗",
+        "能看到我的屏幕吗",
+        "你静音了",
+        "稍等一下",
+        "等一下",
+        "我共享一下屏幕",
+        "你好",
+        "好的",
+        "好",
+        "嗯",
+        "对",
+        "是的",
+        "那个",
+        "就是",
+        "然后",
+        "谢谢",
+        "没问题",
+        "可以",
+    ),
+    "hi": (
+        "क्या आप मुझे सुन सकते हैं",
+        "आप म्यूट पर हैं",
+        "एक सेकंड",
+        "एक मिनट",
+        "नमस्ते",
+        "हाँ",
+        "हां",
+        "जी",
+        "ठीक है",
+        "अच्छा",
+        "धन्यवाद",
+        "मतलब",
+        "तो",
+        "हम्म",
+    ),
+    "ar": (
+        "هل تسمعني",
+        "هل تسمعونني",
+        "أنت على الصامت",
+        "لحظة",
+        "ثانية واحدة",
+        "مرحبا",
+        "نعم",
+        "لا",
+        "حسنا",
+        "طيب",
+        "تمام",
+        "شكرا",
+        "يعني",
+        "آه",
+    ),
+    "ru": (
+        "вы меня слышите",
+        "ты меня слышишь",
+        "у вас выключен микрофон",
+        "одну секунду",
+        "секундочку",
+        "минутку",
+        "я покажу экран",
+        "привет",
+        "здравствуйте",
+        "да",
+        "нет",
+        "хорошо",
+        "ладно",
+        "окей",
+        "ну",
+        "э",
+        "эм",
+        "так",
+        "вот",
+        "спасибо",
+        "понятно",
+        "отлично",
+        "короче",
+    ),
+    "pt": (
+        "você me ouve",
+        "vocês me ouvem",
+        "está no mudo",
+        "você está mudo",
+        "um momento",
+        "um segundo",
+        "vou compartilhar a tela",
+        "olá",
+        "oi",
+        "tá",
+        "ok",
+        "sim",
+        "não",
+        "né",
+        "então",
+        "tipo",
+        "é",
+        "obrigado",
+        "obrigada",
+        "perfeito",
+        "certo",
+        "beleza",
+    ),
+    "ko": (
+        "제 목소리 들리세요",
+        "들리세요",
+        "화면 보이세요",
+        "음소거 되어 있어요",
+        "잠시만요",
+        "잠깐만요",
+        "화면 공유할게요",
+        "안녕하세요",
+        "네",
+        "예",
+        "아니요",
+        "음",
+        "어",
+        "그",
+        "저",
+        "그러니까",
+        "감사합니다",
+        "좋아요",
+        "맞아요",
+    ),
+    "it": (
+        "mi sentite",
+        "mi senti",
+        "sei in muto",
+        "sei silenziato",
+        "un attimo",
+        "un secondo",
+        "condivido lo schermo",
+        "ciao",
+        "salve",
+        "ok",
+        "sì",
+        "si",
+        "no",
+        "allora",
+        "cioè",
+        "ehm",
+        "beh",
+        "grazie",
+        "perfetto",
+        "esatto",
+        "va bene",
+        "certo",
+    ),
+    "tr": (
+        "beni duyabiliyor musunuz",
+        "sesim geliyor mu",
+        "sessizdesiniz",
+        "bir saniye",
+        "bir dakika",
+        "ekranımı paylaşıyorum",
+        "merhaba",
+        "evet",
+        "hayır",
+        "tamam",
+        "peki",
+        "yani",
+        "şey",
+        "ee",
+        "hı",
+        "teşekkürler",
+        "teşekkür ederim",
+        "süper",
+        "aynen",
+    ),
+    "bn": (
+        "আপনি কি আমাকে শুনতে পাচ্ছেন",
+        "আপনি মিউট আছেন",
+        "এক সেকেন্ড",
+        "এক মিনিট",
+        "নমস্কার",
+        "হ্যালো",
+        "হ্যাঁ",
+        "না",
+        "ঠিক আছে",
+        "আচ্ছা",
+        "ধন্যবাদ",
+        "মানে",
+        "তো",
+    ),
+    "ur": (
+        "کیا آپ مجھے سن سکتے ہیں",
+        "آپ میوٹ پر ہیں",
+        "ایک سیکنڈ",
+        "ایک منٹ",
+        "السلام علیکم",
+        "ہیلو",
+        "جی",
+        "ہاں",
+        "نہیں",
+        "ٹھیک ہے",
+        "اچھا",
+        "شکریہ",
+        "مطلب",
+        "تو",
+    ),
+}
+
+# scripts written without spaces between words
+_UNSEGMENTED_LANGUAGES = frozenset({"ja", "zh"})
+
+_WORD = re.compile(r"\w+")
+
+
+def _filler_pattern(language: Optional[str]) -> re.Pattern:
+    """
+    Compile the filler phrases of a language, or of every language.
+    """
+    languages = [language] if language in FILLER_PHRASES else list(FILLER_PHRASES)
+    # phrases must not match inside words of space-separated scripts
+    alternatives = []
+    for unsegmented in (False, True):
+        phrases = {
+            phrase
+            for lang in languages
+            if (lang in _UNSEGMENTED_LANGUAGES) == unsegmented
+            for phrase in FILLER_PHRASES[lang]
+        }
+        if phrases:
+            # longest first, so "thank you" wins over "thank"
+            group = "|".join(
+                re.escape(phrase) for phrase in sorted(phrases, key=len, reverse=True)
+            )
+            alternatives.append(
+                f"(?:{group})" if unsegmented else rf"(?<!\w)(?:{group})(?!\w)"
+            )
+    return re.compile("|".join(alternatives))
+
+
+def is_filler(sentence: str, pattern: re.Pattern) -> bool:
+    """
+    Check whether a sentence consists of filler phrases only.
+
+    Parameters
+    ----------
+    sentence : str
+        The sentence.
+    pattern : re.Pattern
+        The compiled filler phrases.
+
+    Returns
+    -------
+    bool
+        Whether no word is left after removing the filler phrases.
+    """
+    return _WORD.search(pattern.sub(" ", sentence.lower())) is None
+
+
+def terms(sentence: str, language: Optional[str]) -> list[str]:
+    """
+    Split a sentence into lowercase terms: words, or character bigrams
+    for languages written without spaces.
+
+    Parameters
+    ----------
+    sentence : str
+        The sentence.
+    language : str, optional
+        The language of the sentence.
+
+    Returns
+    -------
+    list[str]
+        The terms in order of appearance.
+    """
+    words = _WORD.findall(sentence.lower())
+    if language not in _UNSEGMENTED_LANGUAGES:
+        return words
+    return [word[i : i + 2] for word in words for i in range(max(len(word) - 1, 1))]
+
+
+def textrank_scores(
+    sentences: Sequence[str],
+    language: Optional[str] = None,
+    *,
+    damping: float = 0.85,
+    max_iterations: int = 50,
+    tolerance: float = 1e-6,
+) -> np.ndarray:
+    """
+    Score sentences by TextRank over their TF-IDF cosine similarities.
+
+    The sentence-term matrix is kept in coordinate form and the similarity
+    matrix is never built: each power iteration multiplies by the term
+    matrix and its transpose, so memory grows with the number of terms
+    instead of the square of the number of sentences.
+
+    Parameters
+    ----------
+    sentences : Sequence[str]
+        The sentences.
+    language : str, optional
+        The language of the sentences, by default None.
+    damping : float, optional
+        The damping factor of TextRank, by default 0.85.
+    max_iterations : int, optional
+        The maximum number of power iterations, by default 50.
+    tolerance : float, optional
+        The L1 change at which the iteration stops, by default 1e-6.
+
+    Returns
+    -------
+    np.ndarray
+        The score of each sentence, 0 for sentences without terms.
+    """
+    n = len(sentences)
+    vocabulary: dict[str, int] = {}
+    rows: list[int] = []
+    cols: list[int] = []
+    for row, sentence in enumerate(sentences):
+        for term in terms(sentence, language):
+            rows.append(row)
+            cols.append(vocabulary.setdefault(term, len(vocabulary)))
+    if not rows:
+        return np.zeros(n)
+
+    rows_a = np.asarray(rows, dtype=np.int64)
+    cols_a = np.asarray(cols, dtype=np.int64)
+    # merge repeated terms of a sentence into term frequencies
+    keys, tf = np.unique(rows_a * len(vocabulary) + cols_a, return_counts=True)
+    rows_a, cols_a = np.divmod(keys, len(vocabulary))
+    df = np.bincount(cols_a, minlength=len(vocabulary))
+    idf = np.log((1 + n) / (1 + df)) + 1
+    values = np.log1p(tf) * idf[cols_a]
+    norms = np.sqrt(np.bincount(rows_a, weights=values**2, minlength=n))
+    values /= norms[rows_a]
+
+    has_terms = norms > 0
+
+    def similarity(x: np.ndarray) -> np.ndarray:
+        # (X X^T - I) x, leaving out the similarity of a sentence to itself
+        projected = np.bincount(
+            cols_a, weights=values * x[rows_a], minlength=len(vocabulary)
+        )
+        return (
+            np.bincount(rows_a, weights=values * projected[cols_a], minlength=n)
+            - x * has_terms
+        )
+
+    degrees = similarity(np.ones(n))
+    connected = degrees > 1e-12
+    scores = np.full(n, 1 / n)
+    for _ in range(max_iterations):
+        spread = np.divide(scores, degrees, out=np.zeros(n), where=connected)
+        updated = (1 - damping) / n + damping * similarity(spread)
+        converged = np.abs(updated - scores).sum() < tolerance
+        scores = updated
+        if converged:
+            break
+
+    return np.where(has_terms, scores, 0.0)
+
+
+def select_sentences(
+    sentences: Sequence[str],
+    num_tokens: Sequence[int],
+    budget: int,
+    language: Optional[str] = None,
+) -> list[int]:
+    """
+    Drop filler sentences and keep the highest scoring sentences
+    that fit in `budget` tokens.
+
+    Parameters
+    ----------
+    sentences : Sequence[str]
+        The sentences of the transcript.
+    num_tokens : Sequence[int]
+        The number of tokens of each sentence.
+    budget : int
+        The maximum number of tokens kept.
+    language : str, optional
+        The language of the transcript, selecting the filler phrases,
+        by default None (the phrases of every supported language).
+
+    Returns
+    -------
+    list[int]
+        The indices of the kept sentences in their original order.
+    """
+    pattern = _filler_pattern(language)
+    candidates = np.array(
+        [
+            idx
+            for idx, sentence in enumerate(sentences)
+            if not is_filler(sentence, pattern)
+        ],
+        dtype=np.int64,
+    )
+    if len(candidates) == 0:
+        return []
+
+    counts = np.asarray(num_tokens, dtype=np.int64)[candidates]
+    if counts.sum() <= budget:
+        return candidates.tolist()
+
+    scores = textrank_scores([sentences[idx] for idx in candidates], language)
+    # stable sort keeps earlier sentences first among equal scores
+    order = np.argsort(-scores, kind="stable")
+    kept = order[np.cumsum(counts[order]) <= budget]
+    return np.sort(candidates[kept]).tolist()
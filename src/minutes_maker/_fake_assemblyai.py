@@ -0,0 +1,261 @@
+import argparse
+import asyncio
+import hashlib
+import io
+import random
+import time
+from typing import Any, Optional
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from pydub import AudioSegment
+
+_WORDS = (
+    "we the team project budget schedule release customer feedback design "
+    "review meeting next week decide plan test data model result question "
+    "agenda update risk cost deadline owner action item lecture example "
+    "chapter theory practice important point summary"
+).split()
+
+
+def _audio_duration_ms(data: bytes) -> int:
+    """
+    Measure the duration of uploaded audio, falling back to an estimate
+    from its size at 128 kbps when it cannot be decoded.
+    """
+    try:
+        return len(AudioSegment.from_file(io.BytesIO(data)))
+    except Exception:
+        return max(1000, len(data) * 8 // 128)
+
+
+def _sentence(seed: str, idx: int, start: int, end: int) -> dict[str, Any]:
+    rng = random.Random(f"{seed}:{idx}")
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(4, 14))]
+    return {
+        "text": " ".join(words).capitalize() + ".",
+        "start": start,
+        "end": end,
+        "confidence": 0.9,
+        "words": [],
+    }
+
+
+def create_app(
+    *,
+    processing_time: float = 1.0,
+    realtime_factor: float = 0.0,
+    request_latency: float = 0.0,
+    failure_rate: float = 0.0,
+    http_failure_rate: float = 0.0,
+    sentence_ms: int = 4000,
+    language_code: str = "en",
+    seed: int = 0,
+) -> FastAPI:
+    """
+    Create an offline stand-in for the AssemblyAI endpoints used by the
+    `assemblyai` SDK: upload, submit, poll and sentences.
+
+    Sentences are derived deterministically from the audio duration,
+    so the same file always yields the same transcript.
+    Point `ASSEMBLYAI_BASE_URL` at the server to use it.
+
+    Parameters
+    ----------
+    processing_time : float, optional
+        Seconds a transcript stays queued/processing, by default 1.0.
+    realtime_factor : float, optional
+        Extra processing seconds per second of audio, by default 0.0.
+    request_latency : float, optional
+        Seconds added to every HTTP response, by default 0.0.
+    failure_rate : float, optional
+        Probability that a transcript completes with the error status,
+        by default 0.0.
+    http_failure_rate : float, optional
+        Probability that a request fails with HTTP 503, by default 0.0.
+    sentence_ms : int, optional
+        Length of each generated sentence in milliseconds, by default 4000.
+    language_code : str, optional
+        Language reported when language detection is requested,
+        by default "en".
+    seed : int, optional
+        Seed for failure injection, by default 0.
+
+    Returns
+    -------
+    FastAPI
+        The fake AssemblyAI application.
+    """
+    app = FastAPI()
+    rng = random.Random(seed)
+    uploads: dict[str, int] = {}
+    transcripts: dict[str, dict[str, Any]] = {}
+
+    async def simulate(request: Request) -> None:
+        if request_latency > 0:
+            await asyncio.sleep(request_latency)
+        if rng.random() < http_failure_rate:
+            raise HTTPException(status_code=503, detail="injected failure")
+
+    def transcript_response(transcript_id: str) -> dict[str, Any]:
+        transcript = transcripts.get(transcript_id)
+        if transcript is None:
+            raise HTTPException(status_code=404, detail="Transcript not found")
+        response = {
+            key: transcript[key]
+            for key in ("id", "audio_url", "language_code", "speech_model")
+        }
+        elapsed = time.monotonic() - transcript["submitted_at"]
+        if elapsed < transcript["processing_time"]:
+            response["status"] = "queued" if elapsed < 0.1 else "processing"
+        elif transcript["failed"]:
+            response["status"] = "error"
+            response["error"] = "injected transcription failure"
+        else:
+            response.update(
+                status="completed",
+                audio_duration=transcript["duration_ms"] // 1000,
+                confidence=0.9,
+                language_confidence=0.99,
+            )
+        return response
+
+    @app.post("/v2/upload")
+    async def upload(request: Request) -> dict[str, str]:
+        await simulate(request)
+        data = await request.body()
+        upload_id = hashlib.sha256(data).hexdigest()
+        uploads[upload_id] = _audio_duration_ms(data)
+        return {"upload_url": f"{request.base_url}files/{upload_id}"}
+
+    @app.post("/v2/transcript")
+    async def submit(request: Request) -> dict[str, Any]:
+        await simulate(request)
+        body = await request.json()
+        audio_url = body.get("audio_url", "")
+        upload_id = audio_url.rsplit("/", 1)[-1]
+        if upload_id in uploads:
+            duration_ms = uploads[upload_id]
+        else:
+            # unknown URLs get a stable pseudo-duration between 1 and 10 minutes
+            digest = hashlib.sha256(audio_url.encode("utf-8")).digest()
+            duration_ms = 60_000 + int.from_bytes(digest[:4], "big") % 540_000
+
+        transcript_id = f"fake-{len(transcripts):08d}"
+        transcripts[transcript_id] = {
+            "id": transcript_id,
+            "audio_url": audio_url,
+            "seed": upload_id,
+            "duration_ms": duration_ms,
+            "language_code": (
+                language_code
+                if body.get("language_detection")
+                else body.get("language_code") or "en_us"
+            ),
+            "speech_model": body.get("speech_model"),
+            "submitted_at": time.monotonic(),
+            "processing_time": processing_time
+            + realtime_factor * duration_ms / 1000,
+            "failed": rng.random() < failure_rate,
+        }
+        return transcript_response(transcript_id)
+
+    @app.get("/v2/transcript/{transcript_id}")
+    async def poll(transcript_id: str, request: Request) -> dict[str, Any]:
+        await simulate(request)
+        return transcript_response(transcript_id)
+
+    @app.get("/v2/transcript/{transcript_id}/sentences")
+    async def sentences(transcript_id: str, request: Request) -> dict[str, Any]:
+        await simulate(request)
+        if transcript_response(transcript_id)["status"] != "completed":
+            raise HTTPException(status_code=400, detail="Transcript is not completed")
+        transcript = transcripts[transcript_id]
+        duration_ms = transcript["duration_ms"]
+        return {
+            "id": transcript_id,
+            "confidence": 0.9,
+            "audio_duration": duration_ms / 1000,
+            "sentences": [
+                _sentence(
+                    transcript["seed"],
+                    idx,
+                    start,
+                    min(start + sentence_ms, duration_ms),
+                )
+                for idx, start in enumerate(range(0, duration_ms, sentence_ms))
+            ],
+        }
+
+    return app
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    argparser = argparse.ArgumentParser(
+        description="Offline AssemblyAI-compatible server for tests and benchmarks."
+    )
+    argparser.add_argument(
+        "-p",
+        "--port",
+        type=int,
+        default=10366,
+        help="port number for the fake API (default: 10366)",
+    )
+    argparser.add_argument(
+        "--processing_time",
+        type=float,
+        default=1.0,
+        help="seconds each transcript stays queued/processing (default: 1.0)",
+    )
+    argparser.add_argument(
+        "--realtime_factor",
+        type=float,
+        default=0.0,
+        help="extra processing seconds per second of audio (default: 0.0)",
+    )
+    argparser.add_argument(
+        "--request_latency",
+        type=float,
+        default=0.0,
+        help="seconds added to every response (default: 0.0)",
+    )
+    argparser.add_argument(
+        "--failure_rate",
+        type=float,
+        default=0.0,
+        help="probability of a transcript ending in error (default: 0.0)",
+    )
+    argparser.add_argument(
+        "--http_failure_rate",
+        type=float,
+        default=0.0,
+        help="probability of a request failing with HTTP 503 (default: 0.0)",
+    )
+    argparser.add_argument(
+        "--language_code",
+        type=str,
+        default="en",
+        help="language reported by language detection (default: en)",
+    )
+    argparser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="seed for failure injection (default: 0)",
+    )
+    args = argparser.parse_args(argv)
+
+    app = create_app(
+        processing_time=args.processing_time,
+        realtime_factor=args.realtime_factor,
+        request_latency=args.request_latency,
+        failure_rate=args.failure_rate,
+        http_failure_rate=args.http_failure_rate,
+        language_code=args.language_code,
+        seed=args.seed,
+    )
+    uvicorn.run(app, host="0.0.0.0", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Any, Optional
+
+
+class LLMCache:
+    """
+    SQLite-backed cache of chat completion responses.
+
+    Entries are keyed by a hash of the model, the messages and
+    `max_tokens`, so byte-identical requests from retries, duplicate
+    uploads and re-summaries are answered without calling the API.
+    Entries older than `max_age` are dropped and the least recently used
+    entries are evicted beyond `max_entries`.
+
+    Attributes
+    ----------
+    hits : int
+        The number of lookups answered from the cache.
+    misses : int
+        The number of lookups not found in the cache.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        max_entries: int = 10000,
+        max_age: float = 30 * 24 * 60 * 60,
+    ) -> None:
+        """
+        Initialize the cache.
+
+        Parameters
+        ----------
+        path : str
+            The path to the SQLite database file.
+        max_entries : int, optional
+            The maximum number of cached responses, by default 10000.
+        max_age : float, optional
+            Seconds a response stays cached, by default 30 days.
+        """
+        self.__path = path
+        self.__max_entries = max_entries
+        self.__max_age = max_age
+        self.__lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        with closing(sqlite3.connect(self.__path)) as conn, conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    used_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at)"
+            )
+
+    @staticmethod
+    def key(
+        model: str, messages: list[dict[str, str]], max_tokens: Optional[int]
+    ) -> str:
+        """
+        Hash a request into a cache key.
+
+        Parameters
+        ----------
+        model : str
+            The model name.
+        messages : list[dict[str, str]]
+            The chat messages.
+        max_tokens : int, optional
+            The generation limit.
+
+        Returns
+        -------
+        str
+            The hex digest identifying the request.
+        """
+        return hashlib.sha256(
+            json.dumps(
+                [model, messages, max_tokens], ensure_ascii=False, sort_keys=True
+            ).encode("utf-8")
+        ).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response and mark it as recently used.
+
+        Parameters
+        ----------
+        key : str
+            The key from `LLMCache.key`.
+
+        Returns
+        -------
+        str, optional
+            The cached response, or None on a miss.
+        """
+        now = time.time()
+        with closing(sqlite3.connect(self.__path)) as conn, conn:
+            row = conn.execute(
+                "SELECT response FROM responses WHERE key = ? AND created_at >= ?",
+                (key, now - self.__max_age),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE responses SET used_at = ? WHERE key = ?", (now, key)
+                )
+
+        with self.__lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        return None if row is None else row[0]
+
+    def put(self, key: str, response: str) -> None:
+        """
+        Cache a response and evict expired and least recently used entries.
+
+        Parameters
+        ----------
+        key : str
+            The key from `LLMCache.key`.
+        response : str
+            The response content.
+        """
+        now = time.time()
+        with closing(sqlite3.connect(self.__path)) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, response, now, now),
+            )
+            conn.execute(
+                "DELETE FROM responses WHERE created_at < ?", (now - self.__max_age,)
+            )
+            conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.__max_entries,),
+            )
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        """
+        The hit/miss counters and the number of cached entries.
+        """
+        with closing(sqlite3.connect(self.__path)) as conn:
+            (entries,) = conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
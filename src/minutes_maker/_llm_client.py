@@ -0,0 +1,308 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import AsyncIterator, Optional
+
+import aiohttp
+import openai
+import tiktoken
+
+from ._models import get_tokenizer
+
+# errors worth retrying: rate limits, server-side failures and network issues
+_RETRYABLE_ERRORS = (
+    openai.error.RateLimitError,
+    openai.error.APIError,
+    openai.error.Timeout,
+    openai.error.ServiceUnavailableError,
+    openai.error.APIConnectionError,
+    openai.error.TryAgain,
+)
+
+# the HTTP responses received by the current task, collected while
+# `LLMClient.stream` opens a stream so that it can close the connection
+_responses: ContextVar[Optional[list[aiohttp.ClientResponse]]] = ContextVar(
+    "responses", default=None
+)
+
+
+async def _on_request_end(session, context, params) -> None:
+    responses = _responses.get()
+    if responses is not None:
+        responses.append(params.response)
+
+
+class TokenBucket:
+    """
+    Asynchronous token bucket refilled continuously at `rate_per_minute`.
+    """
+
+    def __init__(self, rate_per_minute: float) -> None:
+        self.__rate = rate_per_minute / 60
+        self.__capacity = rate_per_minute
+        self.__tokens = rate_per_minute
+        self.__updated_at = time.monotonic()
+        self.__lock = asyncio.Lock()
+
+    async def acquire(self, amount: float = 1) -> None:
+        """
+        Wait until `amount` tokens are available and take them.
+
+        Requests larger than the capacity wait for a full bucket and
+        then drive it negative, so they are delayed instead of rejected.
+        """
+        async with self.__lock:
+            while True:
+                now = time.monotonic()
+                self.__tokens = min(
+                    self.__capacity,
+                    self.__tokens + (now - self.__updated_at) * self.__rate,
+                )
+                self.__updated_at = now
+                needed = min(amount, self.__capacity)
+                if self.__tokens >= needed:
+                    self.__tokens -= amount
+                    return
+                await asyncio.sleep((needed - self.__tokens) / self.__rate)
+
+
+class LLMClient:
+    """
+    Shared asynchronous client for OpenAI chat completions.
+
+    All requests share one pooled aiohttp session and are limited by a
+    global and a per-model semaphore and, when configured, by token
+    buckets for requests and tokens per minute. Retryable errors such as
+    429s are retried with exponential backoff and full jitter, so a single
+    rate limit does not fail a multi-minute job.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_concurrency: int = 16,
+        max_concurrency_per_model: int = 8,
+        max_streams: int = 256,
+        rpm: Optional[int] = None,
+        tpm: Optional[int] = None,
+        max_retries: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        request_timeout: float = 600.0,
+    ) -> None:
+        """
+        Initialize the client and set the OpenAI API key.
+
+        Parameters
+        ----------
+        max_concurrency : int, optional
+            The maximum number of in-flight requests, by default 16.
+        max_concurrency_per_model : int, optional
+            The maximum number of in-flight requests per model,
+            by default 8.
+        max_streams : int, optional
+            The maximum number of open streamed responses, by default 256.
+            Streams only take a request slot until OpenAI accepts them.
+        rpm : int, optional
+            The requests per minute allowed by the account,
+            by default None (unlimited).
+        tpm : int, optional
+            The tokens per minute allowed by the account,
+            by default None (unlimited).
+        max_retries : int, optional
+            The number of retries of a failed request, by default 6.
+        base_delay : float, optional
+            The backoff of the first retry in seconds, by default 1.0.
+        max_delay : float, optional
+            The maximum backoff in seconds, also capping the waits asked
+            by "Retry-After" headers, by default 60.0.
+        request_timeout : float, optional
+            The timeout of a single request in seconds, by default 600.0.
+        """
+        openai.organization = os.getenv("OPENAI_ORGANIZATION", "")
+        openai.api_key = os.getenv("OPENAI_API_KEY")
+
+        self.__max_concurrency = max_concurrency
+        self.__max_retries = max_retries
+        self.__base_delay = base_delay
+        self.__max_delay = max_delay
+        self.__request_timeout = request_timeout
+        self.__session: Optional[aiohttp.ClientSession] = None
+        self.__max_streams = max_streams
+        self.__semaphore = asyncio.Semaphore(max_concurrency)
+        self.__stream_semaphore = asyncio.Semaphore(max_streams)
+        self.__model_semaphores: defaultdict[str, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(max_concurrency_per_model)
+        )
+        self.__request_bucket = TokenBucket(rpm) if rpm else None
+        self.__token_bucket = TokenBucket(tpm) if tpm else None
+        self.__tokenizers: dict[str, tiktoken.Encoding] = {}
+
+    async def complete(
+        self,
+        model: str,
+        messages: list[dict[str, str]],
+        *,
+        max_tokens: Optional[int] = None,
+    ) -> str:
+        """
+        Request a chat completion.
+
+        Parameters
+        ----------
+        model : str
+            The model name.
+        messages : list[dict[str, str]]
+            The chat messages.
+        max_tokens : int, optional
+            The generation limit, by default None.
+
+        Returns
+        -------
+        str
+            The content of the response.
+        """
+        async with self.__model_semaphores[model], self.__semaphore:
+            for attempt in range(self.__max_retries + 1):
+                await self.__throttle(model, messages, max_tokens)
+                try:
+                    response = await self.__create(
+                        model=model, messages=messages, max_tokens=max_tokens
+                    )
+                    return response["choices"][0]["message"]["content"]
+                except _RETRYABLE_ERRORS as e:
+                    await self.__backoff(attempt, e)
+
+    async def stream(
+        self,
+        model: str,
+        messages: list[dict[str, str]],
+        *,
+        max_tokens: Optional[int] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Request a chat completion and yield its content deltas.
+
+        Only opening the stream is retried; errors after the first delta
+        are raised, since the caller has already received a partial answer.
+        Closing the iterator early, e.g. when the client of an answer
+        disconnects, closes the connection, so OpenAI stops generating.
+        The request semaphores are only held until the stream is opened,
+        so long answers do not hold back other requests; open streams are
+        bounded by `max_streams` instead.
+
+        Parameters
+        ----------
+        model : str
+            The model name.
+        messages : list[dict[str, str]]
+            The chat messages.
+        max_tokens : int, optional
+            The generation limit, by default None.
+
+        Yields
+        ------
+        str
+            The content deltas of the response.
+        """
+        async with self.__stream_semaphore:
+            opened: list[aiohttp.ClientResponse] = []
+            async with self.__model_semaphores[model], self.__semaphore:
+                token = _responses.set(opened)
+                try:
+                    for attempt in range(self.__max_retries + 1):
+                        await self.__throttle(model, messages, max_tokens)
+                        try:
+                            response = await self.__create(
+                                model=model,
+                                messages=messages,
+                                max_tokens=max_tokens,
+                                stream=True,
+                            )
+                            break
+                        except _RETRYABLE_ERRORS as e:
+                            await self.__backoff(attempt, e)
+                finally:
+                    _responses.reset(token)
+
+            try:
+                async for chunk in response:
+                    if "choices" in chunk and chunk["choices"][0].get("delta", {}).get(
+                        "content"
+                    ):
+                        yield chunk["choices"][0]["delta"]["content"]
+            finally:
+                await response.aclose()
+                # the SDK leaves an unfinished stream open until it is
+                # garbage collected
+                for http_response in opened:
+                    http_response.close()
+
+    async def aclose(self) -> None:
+        """
+        Close the pooled HTTP session.
+        """
+        if self.__session is not None:
+            await self.__session.close()
+            self.__session = None
+
+    async def __create(self, **kwargs):
+        if self.__session is None or self.__session.closed:
+            trace_config = aiohttp.TraceConfig()
+            trace_config.on_request_end.append(_on_request_end)
+            self.__session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.__max_concurrency + self.__max_streams
+                ),
+                trace_configs=[trace_config],
+            )
+        # the SDK picks the session up from this context variable
+        # when the request starts
+        token = openai.aiosession.set(self.__session)
+        try:
+            return await openai.ChatCompletion.acreate(
+                request_timeout=self.__request_timeout, **kwargs
+            )
+        finally:
+            openai.aiosession.reset(token)
+
+    async def __throttle(
+        self, model: str, messages: list[dict[str, str]], max_tokens: Optional[int]
+    ) -> None:
+        if self.__request_bucket is not None:
+            await self.__request_bucket.acquire()
+        if self.__token_bucket is not None:
+            await self.__token_bucket.acquire(
+                self.__count_tokens(model, messages) + (max_tokens or 0)
+            )
+
+    async def __backoff(self, attempt: int, error: openai.error.OpenAIError) -> None:
+        if attempt >= self.__max_retries:
+            raise error
+        retry_after = (error.headers or {}).get("retry-after")
+        try:
+            # a server asking for an absurd wait must not stall the call
+            delay = max(0.0, min(self.__max_delay, float(retry_after)))
+        except (TypeError, ValueError):
+            # exponential backoff with full jitter
+            delay = random.uniform(
+                0, min(self.__max_delay, self.__base_delay * 2**attempt)
+            )
+        logging.warning(
+            f"{type(error).__name__}: {error}; retrying in {delay:.1f}s "
+            f"({attempt + 1}/{self.__max_retries})."
+        )
+        await asyncio.sleep(delay)
+
+    def __count_tokens(self, model: str, messages: list[dict[str, str]]) -> int:
+        if model not in self.__tokenizers:
+            self.__tokenizers[model] = get_tokenizer(model)
+        tokenizer = self.__tokenizers[model]
+        return sum(
+            len(tokenizer.encode_ordinary(message["content"])) + 4
+            for message in messages
+        )
@@ -0,0 +1,136 @@
+import json
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+import tiktoken
+
+
+@dataclass(frozen=True)
+class ModelCapabilities:
+    """
+    The token limits of a model.
+
+    Attributes
+    ----------
+    context_window : int
+        The number of tokens of the prompt and the completion together.
+    max_output_tokens : int
+        The maximum number of tokens the model generates at once.
+    """
+
+    context_window: int
+    max_output_tokens: int
+
+
+# Limits published by OpenAI. Dated snapshots resolve to their base model
+# by prefix, e.g. "gpt-4o-2024-08-06" uses the "gpt-4o" entry.
+DEFAULT_MODEL_CAPABILITIES: dict[str, ModelCapabilities] = {
+    "gpt-3.5-turbo": ModelCapabilities(16385, 4096),
+    "gpt-3.5-turbo-0613": ModelCapabilities(4096, 4096),
+    "gpt-3.5-turbo-16k": ModelCapabilities(16385, 4096),
+    "gpt-4": ModelCapabilities(8192, 8192),
+    "gpt-4-32k": ModelCapabilities(32768, 8192),
+    "gpt-4-turbo": ModelCapabilities(128000, 4096),
+    "gpt-4-1106-preview": ModelCapabilities(128000, 4096),
+    "gpt-4-0125-preview": ModelCapabilities(128000, 4096),
+    "gpt-4o": ModelCapabilities(128000, 16384),
+    "gpt-4o-mini": ModelCapabilities(128000, 16384),
+    "gpt-4.1": ModelCapabilities(1047576, 32768),
+    "gpt-4.1-mini": ModelCapabilities(1047576, 32768),
+    "gpt-4.1-nano": ModelCapabilities(1047576, 32768),
+}
+
+# used for models that are neither registered nor configured
+FALLBACK_MODEL_CAPABILITIES = ModelCapabilities(4096, 4096)
+
+
+class ModelRegistry:
+    """
+    Registry of model context windows and output limits.
+
+    The built-in limits can be overridden or extended from a JSON file
+    mapping model names to `{"context_window": ..., "max_output_tokens": ...}`.
+    """
+
+    def __init__(
+        self, overrides: Optional[dict[str, ModelCapabilities]] = None
+    ) -> None:
+        """
+        Initialize the registry.
+
+        Parameters
+        ----------
+        overrides : dict[str, ModelCapabilities], optional
+            Limits replacing or extending the built-in ones,
+            by default None.
+        """
+        self.__capabilities = {**DEFAULT_MODEL_CAPABILITIES, **(overrides or {})}
+
+    @classmethod
+    def from_file(cls, path: Optional[str]) -> "ModelRegistry":
+        """
+        Create a registry with the overrides in a JSON file.
+
+        Parameters
+        ----------
+        path : str, optional
+            The path to the JSON file, or None for the built-in limits only.
+
+        Returns
+        -------
+        ModelRegistry
+            The registry.
+        """
+        if path is None:
+            return cls()
+        with open(path, encoding="utf-8") as f:
+            overrides = json.load(f)
+        return cls(
+            {model: ModelCapabilities(**limits) for model, limits in overrides.items()}
+        )
+
+    def __getitem__(self, model: str) -> ModelCapabilities:
+        """
+        Look up the limits of a model, matching the longest registered
+        prefix for dated snapshots and fine-tuned names.
+        """
+        if model in self.__capabilities:
+            return self.__capabilities[model]
+        base = model.removeprefix("ft:")
+        prefixes = [name for name in self.__capabilities if base.startswith(name)]
+        if prefixes:
+            return self.__capabilities[max(prefixes, key=len)]
+
+        logging.warning(
+            f"unknown model {model}, assuming {FALLBACK_MODEL_CAPABILITIES}."
+        )
+        return FALLBACK_MODEL_CAPABILITIES
+
+
+def get_tokenizer(model: str) -> tiktoken.Encoding:
+    """
+    Get the tokenizer of a model, falling back to the encoding of recent
+    OpenAI models when tiktoken does not know the model name.
+
+    Parameters
+    ----------
+    model : str
+        The model name.
+
+    Returns
+    -------
+    tiktoken.Encoding
+        The tokenizer.
+    """
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        pass
+    if model.startswith(("gpt-4o", "gpt-4.1")):
+        try:
+            return tiktoken.get_encoding("o200k_base")
+        except ValueError:
+            # older tiktoken releases do not ship o200k_base
+            pass
+    return tiktoken.get_encoding("cl100k_base")
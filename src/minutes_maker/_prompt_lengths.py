@@ -0,0 +1,130 @@
+import inspect
+import threading
+from dataclasses import dataclass
+from enum import Enum
+
+import tiktoken
+
+from . import _prompts
+
+# tokens wrapping each chat message, including its role
+MESSAGE_OVERHEAD = 4
+# tokens priming the reply of the assistant
+REPLY_OVERHEAD = 3
+
+# every prompt enum defined in `_prompts.py`
+PROMPT_ENUMS: tuple[type[Enum], ...] = tuple(
+    obj
+    for _, obj in inspect.getmembers(_prompts, inspect.isclass)
+    if issubclass(obj, Enum) and obj.__module__ == _prompts.__name__
+)
+
+
+@dataclass(frozen=True)
+class PromptLengths:
+    """
+    The token counts of the summarization templates of a prompt enum.
+
+    Attributes
+    ----------
+    system : int
+        The tokens of `SUMMARIZE_SYSTEM_PROMPT` around `{transcript}`.
+    summary : int
+        The tokens of `SUMMARIZE_USER_PROMPT_FOR_SUMMARY`.
+    shortening : int
+        The tokens of `SUMMARIZE_USER_PROMPT_FOR_SHORTENING`.
+    """
+
+    system: int
+    summary: int
+    shortening: int
+
+    @property
+    def summary_request(self) -> int:
+        """
+        The tokens of a summary request besides the transcript.
+        """
+        return self.system + self.summary + 2 * MESSAGE_OVERHEAD + REPLY_OVERHEAD
+
+    @property
+    def shortening_request(self) -> int:
+        """
+        The tokens of a shortening request besides the transcript.
+        """
+        return self.system + self.shortening + 2 * MESSAGE_OVERHEAD + REPLY_OVERHEAD
+
+
+_cache: dict[str, dict[type[Enum], PromptLengths]] = {}
+_lock = threading.Lock()
+
+
+def measure_prompts(prompts: type[Enum], tokenizer: tiktoken.Encoding) -> PromptLengths:
+    """
+    Count the tokens of the summarization templates of a prompt enum.
+
+    The system template is measured without its `{transcript}` field, as
+    the text before and after it, so that the length of a request is the
+    sum of these counts and the token count of the transcript.
+
+    Parameters
+    ----------
+    prompts : type[Enum]
+        The prompt enum.
+    tokenizer : tiktoken.Encoding
+        The tokenizer of the model.
+
+    Returns
+    -------
+    PromptLengths
+        The token counts.
+    """
+    prefix, _, suffix = prompts.SUMMARIZE_SYSTEM_PROMPT.value.partition("{transcript}")
+    return PromptLengths(
+        system=len(tokenizer.encode(prefix)) + len(tokenizer.encode(suffix)),
+        summary=len(tokenizer.encode(prompts.SUMMARIZE_USER_PROMPT_FOR_SUMMARY.value)),
+        shortening=len(
+            tokenizer.encode(prompts.SUMMARIZE_USER_PROMPT_FOR_SHORTENING.value)
+        ),
+    )
+
+
+def precompute_prompt_lengths(tokenizer: tiktoken.Encoding) -> None:
+    """
+    Measure every prompt enum of `_prompts.py` for a tokenizer,
+    once per tokenizer and process.
+
+    Parameters
+    ----------
+    tokenizer : tiktoken.Encoding
+        The tokenizer of the model.
+    """
+    with _lock:
+        if tokenizer.name not in _cache:
+            _cache[tokenizer.name] = {
+                prompts: measure_prompts(prompts, tokenizer) for prompts in PROMPT_ENUMS
+            }
+
+
+def prompt_lengths(prompts: type[Enum], tokenizer: tiktoken.Encoding) -> PromptLengths:
+    """
+    Get the precomputed token counts of a prompt enum, measuring enums
+    defined elsewhere on first use.
+
+    Parameters
+    ----------
+    prompts : type[Enum]
+        The prompt enum.
+    tokenizer : tiktoken.Encoding
+        The tokenizer of the model.
+
+    Returns
+    -------
+    PromptLengths
+        The token counts.
+    """
+    precompute_prompt_lengths(tokenizer)
+    lengths = _cache[tokenizer.name]
+    if prompts not in lengths:
+        with _lock:
+            lengths[prompts] = measure_prompts(prompts, tokenizer)
+    return lengths[prompts]
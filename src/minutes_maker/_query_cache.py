@@ -0,0 +1,169 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Generic, Hashable, Optional, TypeVar
+
+from ._retrieval import SegmentRetriever
+from ._segments import SegmentStore
+
+V = TypeVar("V")
+
+
+@dataclass(frozen=True)
+class LoadedRecording:
+    """
+    The parsed structures questions about a recording are answered from.
+
+    Attributes
+    ----------
+    segments : SegmentStore
+        The transcribed sentences.
+    retriever : SegmentRetriever
+        The retrieval index over the sentences.
+    summary : str, optional
+        The latest summary.
+    category : str, optional
+        The category the summary was written for, "meeting" or "lecture".
+    """
+
+    segments: SegmentStore
+    retriever: SegmentRetriever
+    summary: Optional[str]
+    category: Optional[str] = None
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The approximate memory used by the structures.
+        """
+        summary_bytes = len(self.summary.encode("utf-8")) if self.summary else 0
+        return self.segments.nbytes + self.retriever.nbytes + summary_bytes
+
+
+class SizedLRUCache(Generic[V]):
+    """
+    Thread-safe LRU cache bounded by the total size of its values.
+
+    Each value is stored with its size in bytes, and the least recently
+    used values are evicted until the total fits in `max_bytes`. A value
+    larger than `max_bytes` is returned to the caller but not cached.
+
+    Attributes
+    ----------
+    hits : int
+        The number of lookups answered from the cache.
+    misses : int
+        The number of lookups not found in the cache.
+    evictions : int
+        The number of values evicted to make room.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        """
+        Initialize the cache.
+
+        Parameters
+        ----------
+        max_bytes : int
+            The maximum total size of the cached values in bytes.
+        """
+        self.__max_bytes = max_bytes
+        self.__entries: OrderedDict[Hashable, tuple[V, int]] = OrderedDict()
+        self.__nbytes = 0
+        # bumped by invalidations, so values loaded before one are not cached
+        self.__generation = 0
+        self.__lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The total size of the cached values in bytes.
+        """
+        return self.__nbytes
+
+    def get_or_load(
+        self, key: Hashable, load: Callable[[], V], size: Callable[[V], int]
+    ) -> V:
+        """
+        Look a value up, loading and caching it on a miss.
+
+        Parameters
+        ----------
+        key : Hashable
+            The key.
+        load : Callable[[], V]
+            Loads the value. It runs outside the lock, so concurrent
+            misses of the same key may load it more than once.
+        size : Callable[[V], int]
+            Measures a value in bytes.
+
+        Returns
+        -------
+        V
+            The value.
+        """
+        with self.__lock:
+            if key in self.__entries:
+                self.__entries.move_to_end(key)
+                self.hits += 1
+                return self.__entries[key][0]
+            self.misses += 1
+            generation = self.__generation
+
+        value = load()
+        nbytes = size(value)
+        with self.__lock:
+            if nbytes <= self.__max_bytes and generation == self.__generation:
+                self.__discard(key)
+                self.__entries[key] = (value, nbytes)
+                self.__nbytes += nbytes
+                while self.__nbytes > self.__max_bytes:
+                    self.__discard(next(iter(self.__entries)))
+                    self.evictions += 1
+        return value
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Drop the value of a key, if cached.
+
+        Parameters
+        ----------
+        key : Hashable
+            The key.
+        """
+        with self.__lock:
+            self.__generation += 1
+            self.__discard(key)
+
+    def stats(self) -> dict[str, Any]:
+        """
+        The hit rate and memory use of the cache.
+
+        Returns
+        -------
+        dict[str, Any]
+            The number of entries, their size, the size limit, the hits,
+            misses and evictions, and the hit rate.
+        """
+        with self.__lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.__entries),
+                "bytes": self.__nbytes,
+                "max_bytes": self.__max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def __discard(self, key: Hashable) -> None:
+        entry = self.__entries.pop(key, None)
+        if entry is not None:
+            self.__nbytes -= entry[1]
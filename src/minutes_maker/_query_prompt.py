@@ -0,0 +1,184 @@
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+import tiktoken
+
+from ._models import ModelCapabilities
+from ._prompt_lengths import MESSAGE_OVERHEAD, REPLY_OVERHEAD
+from ._retrieval import SegmentRetriever
+
+# tokens kept free in the context window for the answer to a question
+ANSWER_TOKENS = 1024
+
+
+@dataclass(frozen=True)
+class QueryPrompt:
+    """
+    The chat messages asking a question about a recording, fitted to the
+    context window of the model answering it.
+
+    Attributes
+    ----------
+    messages : list[dict[str, str]]
+        The system prompt with the context, the history and the question.
+    context : list[int]
+        The timeline segments in the system prompt.
+    truncation : list[str]
+        How the prompt was fitted: first "full" when the whole timeline
+        is sent, "retrieved" for the segments matching the question,
+        "skeleton" for segments sampled evenly over the recording, or
+        "none" if no segment fits; then "history" if the oldest turns were
+        dropped and "summary" if the summary was cut.
+    num_tokens : int
+        The tokens of the messages.
+    max_tokens : int
+        The tokens left for the answer.
+    """
+
+    messages: list[dict[str, str]]
+    context: list[int]
+    truncation: list[str]
+    num_tokens: int
+    max_tokens: int
+
+
+def count_message_tokens(
+    messages: Sequence[dict[str, str]], tokenizer: tiktoken.Encoding
+) -> int:
+    """
+    Count the tokens of chat messages as the model sees them.
+
+    Parameters
+    ----------
+    messages : Sequence[dict[str, str]]
+        The chat messages.
+    tokenizer : tiktoken.Encoding
+        The tokenizer of the model.
+
+    Returns
+    -------
+    int
+        The tokens of the messages, their roles and the reply priming.
+    """
+    return REPLY_OVERHEAD + sum(
+        len(tokenizer.encode_ordinary(message["content"])) + MESSAGE_OVERHEAD
+        for message in messages
+    )
+
+
+def fit_query_prompt(
+    system_prompt: str,
+    question: str,
+    retriever: SegmentRetriever,
+    summary: Optional[str],
+    tokenizer: tiktoken.Encoding,
+    limits: ModelCapabilities,
+    *,
+    context_tokens: int,
+    history: Sequence[dict[str, str]] = (),
+    history_summary: str = "",
+    keep: Sequence[int] = (),
+) -> QueryPrompt:
+    """
+    Build the messages asking a question within the context window of a
+    model, measured with its tokenizer.
+
+    The summary and the history come first. The oldest turns of the
+    history are dropped, and then the end of the summary is cut, only if
+    they do not fit on their own. The timeline gets the rest, up to
+    `context_tokens`: the whole timeline if it fits, else the segments
+    matching the question, else a skeleton of segments sampled evenly
+    over the recording.
+
+    Parameters
+    ----------
+    system_prompt : str
+        The system prompt, with a `{context}` field for the summary and
+        the timeline.
+    question : str
+        The question.
+    retriever : SegmentRetriever
+        The retriever of the timeline segments of the recording.
+    summary : str, optional
+        The summary of the recording.
+    tokenizer : tiktoken.Encoding
+        The tokenizer of the model.
+    limits : ModelCapabilities
+        The token limits of the model.
+    context_tokens : int
+        The maximum number of timeline tokens.
+    history : Sequence[dict[str, str]], optional
+        The earlier turns of the conversation as chat messages, by
+        default ().
+    history_summary : str, optional
+        The summary of the compacted earlier turns, by default "".
+    keep : Sequence[int], optional
+        The segments earlier questions were answered from, see
+        `SegmentRetriever.select`, by default ().
+
+    Returns
+    -------
+    QueryPrompt
+        The messages and how they were fitted.
+
+    Raises
+    ------
+    ValueError
+        If the question alone does not fit the context window.
+    """
+    max_tokens = min(ANSWER_TOKENS, limits.max_output_tokens)
+    available = limits.context_window - max_tokens
+    summary = summary or ""
+    history = list(history)
+    truncation = []
+
+    def build(summary: str, excerpts: str) -> list[dict[str, str]]:
+        context = "\n\n".join(filter(None, [summary, excerpts]))
+        if history_summary:
+            context += f"\n\nEarlier conversation (summarized):\n{history_summary}"
+        return [
+            {"role": "system", "content": system_prompt.format(context=context)},
+            *history,
+            {"role": "user", "content": question},
+        ]
+
+    fixed = count_message_tokens(build(summary, ""), tokenizer)
+    if fixed > available and history:
+        truncation.append("history")
+        while fixed > available and history:
+            # a question and its answer at a time
+            del history[:2]
+            fixed = count_message_tokens(build(summary, ""), tokenizer)
+    if fixed > available and summary:
+        truncation.append("summary")
+        tokens = tokenizer.encode_ordinary(summary)
+        while fixed > available and tokens:
+            tokens = tokens[: max(len(tokens) - (fixed - available), 0)]
+            summary = tokenizer.decode(tokens)
+            fixed = count_message_tokens(build(summary, ""), tokenizer)
+    if fixed > available:
+        raise ValueError(
+            f"The question needs {fixed} tokens, more than the "
+            f"{available} tokens the context window of the model leaves."
+        )
+
+    budget = min(context_tokens, available - fixed)
+    while budget > 0:
+        indices = retriever.select(question, budget, keep=keep)
+        if len(indices) == len(retriever):
+            mode = "full"
+        elif indices:
+            mode = "retrieved"
+        else:
+            indices = retriever.sample(budget)
+            mode = "skeleton" if indices else "none"
+        messages = build(summary, retriever.render(indices))
+        num_tokens = count_message_tokens(messages, tokenizer)
+        if num_tokens <= available:
+            return QueryPrompt(
+                messages, indices, [mode, *truncation], num_tokens, max_tokens
+            )
+        # the separators of the rendered segments did not fit
+        budget = min(budget - 1, budget * 9 // 10)
+
+    return QueryPrompt(build(summary, ""), [], ["none", *truncation], fixed, max_tokens)
@@ -0,0 +1,260 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from typing import Any
+
+from ._segments import SegmentStore
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    Compute the SHA-256 hex digest of a file without loading it at once.
+
+    Parameters
+    ----------
+    path : str
+        The path to the file.
+    chunk_size : int, optional
+        The number of bytes to read at a time, by default 1 MiB.
+
+    Returns
+    -------
+    str
+        The hex digest of the file content.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class RecordingStore:
+    """
+    On-disk store of transcribed recordings.
+
+    Each recording lives in `<root>/<recording_id>/` and holds its
+    segments (see `SegmentStore.save`) and a `metadata.json` file, so that
+    a recording can be summarized again without being re-transcribed.
+    The latest summary tree is kept in `summary_tree.json`.
+
+    `<root>/<recording_id>` links to a hidden version directory, so saving
+    a recording again swaps the whole version at once and readers never
+    see a partly written one. The previous version is kept until the next
+    save for readers still loading it.
+
+    Attributes
+    ----------
+    root : str
+        The directory the recordings are stored in.
+    """
+
+    def __init__(self, root: str = "recordings") -> None:
+        """
+        Initialize the store.
+
+        Parameters
+        ----------
+        root : str, optional
+            The directory the recordings are stored in,
+            by default "recordings".
+        """
+        self.root = root
+        self.__lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, recording_id: str, *names: str) -> str:
+        """
+        Build a path inside the directory of a recording.
+
+        Parameters
+        ----------
+        recording_id : str
+            The ID of the recording.
+        *names : str
+            Path components below the recording directory.
+
+        Returns
+        -------
+        str
+            The joined path.
+        """
+        if not recording_id or os.sep in recording_id or recording_id.startswith("."):
+            raise ValueError(f"Invalid recording ID: {recording_id!r}")
+        return os.path.join(self.root, recording_id, *names)
+
+    def exists(self, recording_id: str) -> bool:
+        try:
+            return os.path.isfile(self.path(recording_id, "metadata.json"))
+        except ValueError:
+            return False
+
+    def ids(self) -> list[str]:
+        """
+        List the IDs of the saved recordings.
+
+        Returns
+        -------
+        list[str]
+            The IDs of the completely saved recordings, sorted.
+        """
+        return sorted(
+            name
+            for name in os.listdir(self.root)
+            if not name.startswith(".") and self.exists(name)
+        )
+
+    def save(
+        self, recording_id: str, segments: SegmentStore, metadata: dict[str, Any]
+    ) -> None:
+        """
+        Save the segments and metadata of a recording,
+        replacing a previously saved version.
+
+        Parameters
+        ----------
+        recording_id : str
+            The ID of the recording.
+        segments : SegmentStore
+            The transcribed sentences.
+        metadata : dict[str, Any]
+            JSON-serializable metadata of the recording.
+        """
+        directory = self.path(recording_id)
+        with self.__lock:
+            staging = tempfile.mkdtemp(dir=self.root, prefix=f".{recording_id}.")
+            segments.save(staging)
+            self.__write_json(os.path.join(staging, "metadata.json"), metadata)
+
+            link = f"{staging}.link"
+            os.symlink(os.path.basename(staging), link)
+            previous = None
+            if os.path.islink(directory):
+                previous = os.path.join(self.root, os.readlink(directory))
+            elif os.path.isdir(directory):
+                # a recording saved before versions were linked
+                previous = f"{staging}.old"
+                os.replace(directory, previous)
+            os.replace(link, directory)
+
+            for name in os.listdir(self.root):
+                entry = os.path.join(self.root, name)
+                if not name.startswith(f".{recording_id}.") or entry in (
+                    staging,
+                    previous,
+                ):
+                    continue
+                if os.path.islink(entry):
+                    os.remove(entry)
+                else:
+                    shutil.rmtree(entry, ignore_errors=True)
+
+    def load_segments(self, recording_id: str) -> SegmentStore:
+        """
+        Load the segments of a recording.
+
+        Parameters
+        ----------
+        recording_id : str
+            The ID of the recording.
+
+        Returns
+        -------
+        SegmentStore
+            The transcribed sentences.
+        """
+        if not self.exists(recording_id):
+            raise KeyError(recording_id)
+        # read every file from the same version, and the newest one if
+        # saves removed it meanwhile
+        while True:
+            version = os.path.realpath(self.path(recording_id))
+            try:
+                return SegmentStore.load(version)
+            except FileNotFoundError:
+                if os.path.realpath(self.path(recording_id)) == version:
+                    raise
+
+    def load_metadata(self, recording_id: str) -> dict[str, Any]:
+        """
+        Load the metadata of a recording.
+
+        Parameters
+        ----------
+        recording_id : str
+            The ID of the recording.
+
+        Returns
+        -------
+        dict[str, Any]
+            The metadata of the recording.
+        """
+        if not self.exists(recording_id):
+            raise KeyError(recording_id)
+        with open(self.path(recording_id, "metadata.json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    def update_metadata(self, recording_id: str, metadata: dict[str, Any]) -> None:
+        """
+        Merge `metadata` into the stored metadata of a recording.
+
+        Parameters
+        ----------
+        recording_id : str
+            The ID of the recording.
+        metadata : dict[str, Any]
+            JSON-serializable metadata to merge.
+        """
+        merged = self.load_metadata(recording_id) if self.exists(recording_id) else {}
+        merged.update(metadata)
+        self.__write_json(self.path(recording_id, "metadata.json"), merged)
+
+    def save_summary_tree(self, recording_id: str, tree: dict[str, Any]) -> None:
+        """
+        Save the summary tree of a recording, replacing the previous one.
+
+        Parameters
+        ----------
+        recording_id : str
+            The ID of the recording.
+        tree : dict[str, Any]
+            The JSON-serializable summary tree.
+        """
+        if not self.exists(recording_id):
+            raise KeyError(recording_id)
+        self.__write_json(self.path(recording_id, "summary_tree.json"), tree)
+
+    def load_summary_tree(self, recording_id: str) -> dict[str, Any]:
+        """
+        Load the summary tree of a recording.
+
+        Parameters
+        ----------
+        recording_id : str
+            The ID of the recording.
+
+        Returns
+        -------
+        dict[str, Any]
+            The summary tree.
+
+        Raises
+        ------
+        KeyError
+            If the recording does not exist or has not been summarized.
+        """
+        if not self.exists(recording_id) or not os.path.isfile(
+            self.path(recording_id, "summary_tree.json")
+        ):
+            raise KeyError(recording_id)
+        with open(self.path(recording_id, "summary_tree.json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    def __write_json(self, path: str, data: dict[str, Any]) -> None:
+        # write to a temporary file first so readers never see partial files
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(f"{path}.tmp", path)
@@ -0,0 +1,322 @@
+import os
+from typing import Optional, Sequence
+
+import numpy as np
+import tiktoken
+
+from ._bm25 import BM25Index
+from ._embeddings import Embedder, EmbeddingIndex
+from ._extractive import terms
+from ._segments import SegmentStore
+
+
+class SegmentRetriever:
+    """
+    Select the segments of a recording relevant to a question.
+
+    The segments are indexed once at ingest, and each question only
+    sends the best matching segments and their neighbors, up to a token
+    budget, instead of the whole timeline. With an embedder, the keyword
+    matches and the most similar segments are merged by reciprocal rank
+    fusion, so questions worded differently from the recording still
+    find their segments.
+    """
+
+    # the rank offset of reciprocal rank fusion
+    RRF_K = 60
+
+    def __init__(
+        self,
+        segments: SegmentStore,
+        index: BM25Index,
+        num_tokens: np.ndarray,
+        embeddings: Optional[EmbeddingIndex] = None,
+    ) -> None:
+        """
+        Initialize the retriever, see `SegmentRetriever.build`.
+
+        Parameters
+        ----------
+        segments : SegmentStore
+            The segments of the recording.
+        index : BM25Index
+            The keyword index over the segments.
+        num_tokens : np.ndarray
+            The number of tokens of each rendered segment.
+        embeddings : EmbeddingIndex, optional
+            The dense index over the segments, by default None.
+        """
+        self.__segments = segments
+        self.__index = index
+        self.__num_tokens = num_tokens
+        self.__embeddings = embeddings
+
+    def __len__(self) -> int:
+        return len(self.__segments)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The approximate memory used by the indexes in bytes.
+        """
+        nbytes = self.__index.nbytes + self.__num_tokens.nbytes
+        if self.__embeddings is not None:
+            nbytes += self.__embeddings.nbytes
+        return nbytes
+
+    @classmethod
+    def build(
+        cls,
+        segments: SegmentStore,
+        language: Optional[str],
+        tokenizer: tiktoken.Encoding,
+        embedder: Optional[Embedder] = None,
+    ) -> "SegmentRetriever":
+        """
+        Index the segments of a recording.
+
+        Parameters
+        ----------
+        segments : SegmentStore
+            The segments of the recording.
+        language : str, optional
+            The language spoken in the recording.
+        tokenizer : tiktoken.Encoding
+            The tokenizer of the model answering questions.
+        embedder : Embedder, optional
+            The embedder of the dense index, by default None for
+            keyword search only.
+
+        Returns
+        -------
+        SegmentRetriever
+            The retriever.
+        """
+        texts = [text for _, _, text in segments]
+        lines = list(segments.iter_chatbot_timeline())
+        return cls(
+            segments,
+            BM25Index.build(texts, language),
+            np.fromiter(
+                (len(tokens) for tokens in tokenizer.encode_ordinary_batch(lines)),
+                dtype=np.int32,
+                count=len(lines),
+            ),
+            EmbeddingIndex.build(texts, embedder) if embedder else None,
+        )
+
+    def save(self, directory: str) -> None:
+        """
+        Write the index to a directory.
+
+        Parameters
+        ----------
+        directory : str
+            The directory to write to. It is created if missing.
+        """
+        self.__index.save(directory)
+        np.save(os.path.join(directory, "num_tokens.npy"), self.__num_tokens)
+        if self.__embeddings is not None:
+            self.__embeddings.save(directory)
+
+    @classmethod
+    def load(
+        cls,
+        directory: str,
+        segments: SegmentStore,
+        embedder: Optional[Embedder] = None,
+    ) -> "SegmentRetriever":
+        """
+        Read an index written by `SegmentRetriever.save`.
+
+        Indexes written without embeddings of `embedder`, e.g. before it
+        was configured, are embedded and their embeddings saved.
+
+        Parameters
+        ----------
+        directory : str
+            The directory to read from.
+        segments : SegmentStore
+            The segments of the recording.
+        embedder : Embedder, optional
+            The embedder of the dense index, by default None for
+            keyword search only.
+
+        Returns
+        -------
+        SegmentRetriever
+            The retriever.
+        """
+        embeddings = None
+        if embedder is not None:
+            if os.path.exists(EmbeddingIndex.path(directory, embedder)):
+                embeddings = EmbeddingIndex.load(directory, embedder)
+            else:
+                embeddings = EmbeddingIndex.build(
+                    [text for _, _, text in segments], embedder
+                )
+                embeddings.save(directory)
+        return cls(
+            segments,
+            BM25Index.load(directory),
+            np.load(os.path.join(directory, "num_tokens.npy"), mmap_mode="r"),
+            embeddings,
+        )
+
+    def select(
+        self,
+        question: str,
+        budget: int,
+        *,
+        top_k: int = 8,
+        neighbors: int = 1,
+        keep: Sequence[int] = (),
+    ) -> list[int]:
+        """
+        Select the segments relevant to a question within a token budget.
+
+        Parameters
+        ----------
+        question : str
+            The question.
+        budget : int
+            The maximum number of tokens of the selected segments.
+        top_k : int, optional
+            The number of best matching segments, by default 8.
+        neighbors : int, optional
+            The number of segments kept before and after each match
+            for context, by default 1.
+        keep : Sequence[int], optional
+            Segments selected for earlier questions of a conversation,
+            kept after the matches of this question while the budget
+            allows, by default (). A follow-up without matches of its own
+            is answered from them.
+
+        Returns
+        -------
+        list[int]
+            The indices of the selected segments in chronological order.
+            Every segment is selected when the whole timeline fits.
+        """
+        if int(self.__num_tokens.sum()) <= budget:
+            return list(range(len(self.__segments)))
+
+        # the match first, then its neighbors from the closest outwards
+        offsets = [0]
+        for distance in range(1, neighbors + 1):
+            offsets += [-distance, distance]
+
+        selected: set[int] = set()
+        used = 0
+        for idx in self.__search(question, top_k):
+            for offset in offsets:
+                candidate = idx + offset
+                if not 0 <= candidate < len(self.__segments) or candidate in selected:
+                    continue
+                if used + self.__num_tokens[candidate] > budget:
+                    continue
+                selected.add(candidate)
+                used += int(self.__num_tokens[candidate])
+
+        for idx in keep:
+            if not 0 <= idx < len(self.__segments) or idx in selected:
+                continue
+            if used + self.__num_tokens[idx] <= budget:
+                selected.add(idx)
+                used += int(self.__num_tokens[idx])
+
+        return sorted(selected)
+
+    def sample(self, budget: int) -> list[int]:
+        """
+        Select segments evenly spread over the recording within a token
+        budget, as a skeleton of the timeline for questions no segment
+        matches.
+
+        Parameters
+        ----------
+        budget : int
+            The maximum number of tokens of the selected segments.
+
+        Returns
+        -------
+        list[int]
+            The indices of the selected segments in chronological order.
+        """
+        total = int(self.__num_tokens.sum())
+        if total <= budget:
+            return list(range(len(self.__segments)))
+        count = int(budget * len(self.__segments) / total) if total else 0
+        while count > 0:
+            indices = np.unique(
+                np.linspace(0, len(self.__segments) - 1, count).round().astype(int)
+            )
+            if int(self.__num_tokens[indices].sum()) <= budget:
+                return indices.tolist()
+            count = min(count - 1, int(count * 0.9))
+        return []
+
+    def find(self, keywords: str, k: int = 3) -> list[int]:
+        """
+        Find the segments containing every keyword, e.g. the places a
+        subject is mentioned, by keyword search only.
+
+        Parameters
+        ----------
+        keywords : str
+            The keywords.
+        k : int, optional
+            The maximum number of segments, by default 3.
+
+        Returns
+        -------
+        list[int]
+            The indices of the best matching segments in chronological
+            order, none if no segment contains every keyword.
+        """
+        language = self.__index.language
+        keyword_terms = set(terms(keywords, language))
+        if not keyword_terms:
+            return []
+        found = [
+            idx
+            for idx, _ in self.__index.search(keywords, 4 * k)
+            if keyword_terms <= set(terms(self.__segments.text(idx), language))
+        ]
+        return sorted(found[:k])
+
+    def render(self, indices: list[int]) -> str:
+        """
+        Render segments like `SegmentStore.render_chatbot_timeline`,
+        marking the gaps between non-consecutive segments with "...".
+
+        Parameters
+        ----------
+        indices : list[int]
+            The indices of the segments in chronological order.
+
+        Returns
+        -------
+        str
+            The rendered segments.
+        """
+        parts = []
+        for previous, idx in zip([None, *indices], indices):
+            if previous is not None:
+                parts.append("--" if idx == previous + 1 else "\n...\n")
+            parts.extend(self.__segments.iter_chatbot_timeline(idx, idx + 1))
+        return "".join(parts)
+
+    def __search(self, question: str, top_k: int) -> list[int]:
+        """
+        The best matching segments, best first.
+        """
+        keyword_hits = self.__index.search(question, top_k)
+        if self.__embeddings is None:
+            return [idx for idx, _ in keyword_hits]
+
+        scores: dict[int, float] = {}
+        for hits in (keyword_hits, self.__embeddings.search(question, top_k)):
+            for rank, (idx, _) in enumerate(hits):
+                scores[idx] = scores.get(idx, 0.0) + 1 / (self.RRF_K + rank + 1)
+        return sorted(scores, key=scores.__getitem__, reverse=True)[:top_k]
@@ -0,0 +1,224 @@
+import re
+import threading
+from typing import Any, Optional
+
+from ._timestamps import route_time_question
+
+# the kinds of questions about a recording, cheapest first
+ROUTES = ("timestamp_lookup", "keyword_find", "summary_recall", "synthesis")
+
+# "where/when did they mention X?", "find X"
+_FIND = re.compile(
+    r"^\s*(?:find|search(?:\s+for)?|look\s+for|show\s+me\s+where)\b"
+    r"|^\s*(?:where|when|at\s+what\s+(?:time|point)|(?:in\s+)?which\s+part"
+    r"|did|does|do|was|were|has|have)\b.*\b(?:mention\w*|said|say|talk\w*"
+    r"|discuss\w*|brought\s+up|bring\w*\s+up|refer\w*|c[ao]me\s+up)\b",
+    re.IGNORECASE,
+)
+# the words of find questions that are not the keywords looked for
+_FILLER = frozenset("""
+    a an the this that it its in at on of to for up about where when what time
+    point which part did does do was were is are has have been find search look
+    show me where anyone someone somebody they he she we you i speaker speakers
+    mention mentions mentioned mentioning say said says talk talks talked
+    talking discuss discusses discussed discussing bring brings brought refer
+    refers referred come came recording meeting lecture video audio
+    """.split())
+# the parts of the summary, by the "## 1." numbers of the summary prompts
+_SECTIONS = {
+    "meeting": {"summary": 1, "decisions": 2, "actions": 3},
+    "lecture": {"summary": 1, "key_points": 2, "conclusions": 3, "notes": 4},
+}
+_TOPICS = {
+    "decisions": re.compile(r"\b(?:decisions?|decided)\b", re.IGNORECASE),
+    "actions": re.compile(
+        r"\b(?:action\s+items?|to-?dos?|next\s+(?:steps?|actions?)|follow[- ]ups?)\b",
+        re.IGNORECASE,
+    ),
+    "key_points": re.compile(
+        r"\b(?:key|main)\s+points\b|\btakeaways?\b", re.IGNORECASE
+    ),
+    "conclusions": re.compile(r"\b(?:conclusions?|concluded)\b", re.IGNORECASE),
+    "notes": re.compile(r"\bother\s+notes\b", re.IGNORECASE),
+    "summary": re.compile(
+        r"\b(?:summar\w*|recap|overview|gist|tl;?dr)\b"
+        r"|\bwhat\s+(?:was|is)\s+(?:this|it|the\s+(?:meeting|lecture|recording"
+        r"|video|talk))\s+about\s*\??\s*$",
+        re.IGNORECASE,
+    ),
+}
+# questions asking for reasons, people or comparisons
+_OPEN = re.compile(
+    r"\b(?:why|how|who|whom|whose|explain\w*|compar\w*|between)\b", re.IGNORECASE
+)
+# questions about one subject rather than a part of the summary, e.g.
+# "what decisions were made about hiring?"
+_SPECIFIC = re.compile(r"\b(?:regarding|concerning|about\s+\w)", re.IGNORECASE)
+_HEADING = re.compile(r"^#{1,6}\s*\**\s*(\d+)\.", re.MULTILINE)
+
+
+def classify_question(question: str, duration_ms: int) -> str:
+    """
+    Classify a question about a recording by the cheapest way to answer it.
+
+    Questions are matched against English phrasings; other questions are
+    classified as "synthesis".
+
+    Parameters
+    ----------
+    question : str
+        The question.
+    duration_ms : int
+        The length of the recording in milliseconds.
+
+    Returns
+    -------
+    str
+        "timestamp_lookup" for what was said at a clock time or a time
+        tied to the recording, see `route_time_question`,
+        "keyword_find" for where something was mentioned,
+        "summary_recall" for the summary or a part of it,
+        or "synthesis" for questions needing an LLM.
+    """
+    if route_time_question(question, duration_ms) is not None:
+        return "timestamp_lookup"
+    if _FIND.search(question) and not _OPEN.search(question):
+        return "keyword_find"
+    if summary_topic(question) is not None:
+        return "summary_recall"
+    return "synthesis"
+
+
+def find_keywords(question: str) -> str:
+    """
+    Extract the keywords of a "keyword_find" question.
+
+    Parameters
+    ----------
+    question : str
+        The question, e.g. "When did they mention the marketing budget?".
+
+    Returns
+    -------
+    str
+        The keywords, e.g. "marketing budget", or "" if none.
+    """
+    words = re.findall(r"[\w'-]+", question)
+    return " ".join(word for word in words if word.lower() not in _FILLER)
+
+
+def summary_topic(question: str) -> Optional[str]:
+    """
+    Find the part of the summary a question asks for.
+
+    Parameters
+    ----------
+    question : str
+        The question, e.g. "What are the action items?".
+
+    Returns
+    -------
+    str, optional
+        "summary" for the whole summary, "decisions", "actions",
+        "key_points", "conclusions" or "notes" for a part of it, or None
+        if the question asks about something else.
+    """
+    if _OPEN.search(question) or _SPECIFIC.search(question):
+        return None
+    for topic, pattern in _TOPICS.items():
+        if pattern.search(question):
+            return topic
+    return None
+
+
+def summary_section(summary: str, category: Optional[str], topic: str) -> Optional[str]:
+    """
+    Cut the part of a summary a question asks for out of the summary.
+
+    Summaries follow the numbered "## 1." sections of the summary prompts,
+    so parts are found by their number in any language.
+
+    Parameters
+    ----------
+    summary : str
+        The summary.
+    category : str, optional
+        The category the summary was written for, "meeting" or "lecture".
+    topic : str
+        The part, see `summary_topic`.
+
+    Returns
+    -------
+    str, optional
+        The part, the whole summary for "summary", or None if the summary
+        has no such part.
+    """
+    if topic == "summary":
+        return summary
+    number = _SECTIONS.get(category or "", {}).get(topic)
+    if number is None:
+        return None
+    headings = list(_HEADING.finditer(summary))
+    for heading, following in zip(headings, [*headings[1:], None]):
+        if int(heading.group(1)) == number:
+            stop = following.start() if following else len(summary)
+            return summary[heading.start() : stop].strip()
+    return None
+
+
+class RouteStats:
+    """
+    Thread-safe counts and latencies of the questions of each route, by
+    how they were answered: "local" without an LLM, "cache" from the
+    answer cache or "llm".
+    """
+
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+        self.__counts: dict[tuple[str, str], int] = {}
+        self.__seconds: dict[tuple[str, str], float] = {}
+        self.__models: dict[str, int] = {}
+
+    def record(
+        self, route: str, path: str, seconds: float, model: Optional[str] = None
+    ) -> None:
+        """
+        Count an answered question.
+
+        Parameters
+        ----------
+        route : str
+            The route of the question, see `classify_question`.
+        path : str
+            How it was answered, "local", "cache" or "llm".
+        seconds : float
+            The time until the whole answer was ready.
+        model : str, optional
+            The model that answered it, by default None.
+        """
+        with self.__lock:
+            key = (route, path)
+            self.__counts[key] = self.__counts.get(key, 0) + 1
+            self.__seconds[key] = self.__seconds.get(key, 0.0) + seconds
+            if model is not None:
+                self.__models[model] = self.__models.get(model, 0) + 1
+
+    def stats(self) -> dict[str, Any]:
+        """
+        The questions and mean latency of each route and path, and the
+        questions answered by each model.
+
+        Returns
+        -------
+        dict[str, Any]
+            e.g. {"routes": {"keyword_find": {"local": {"count": 3,
+            "mean_ms": 4.2}}}, "models": {"gpt-4": 1}}.
+        """
+        with self.__lock:
+            routes: dict[str, dict[str, dict[str, float]]] = {}
+            for (route, path), count in sorted(self.__counts.items()):
+                routes.setdefault(route, {})[path] = {
+                    "count": count,
+                    "mean_ms": 1000 * self.__seconds[route, path] / count,
+                }
+            return {"routes": routes, "models": dict(self.__models)}
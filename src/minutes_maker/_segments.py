@@ -0,0 +1,188 @@
+import datetime
+import os
+from array import array
+from typing import Iterator, Optional
+
+
+def ms_to_srt_time(ms: int) -> str:
+    """
+    Convert milliseconds to SRT-style timestamp: HH:MM:SS
+    """
+    td = datetime.timedelta(milliseconds=ms)
+    total_seconds = td.total_seconds()
+    hours = int(total_seconds // 3600)
+    minutes = int((total_seconds % 3600) // 60)
+    seconds = int(total_seconds % 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+class SegmentStore:
+    """
+    Column-oriented store for transcribed sentences.
+
+    Start and end times are kept in `array('i')` columns and all the
+    sentence texts share a single UTF-8 buffer addressed by offsets,
+    so a recording with 100k+ sentences holds each text exactly once.
+    The timeline, transcript and chatbot formats are rendered lazily.
+
+    Attributes
+    ----------
+    starts : array
+        Start time of each sentence in milliseconds.
+    ends : array
+        End time of each sentence in milliseconds.
+    """
+
+    def __init__(self) -> None:
+        self.starts = array("i")
+        self.ends = array("i")
+        self.__offsets = array("q", [0])
+        self.__buffer = bytearray()
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The memory used by the columns and the text buffer in bytes.
+        """
+        return (
+            self.starts.itemsize * len(self.starts)
+            + self.ends.itemsize * len(self.ends)
+            + self.__offsets.itemsize * len(self.__offsets)
+            + len(self.__buffer)
+        )
+
+    def __iter__(self) -> Iterator[tuple[int, int, str]]:
+        for idx in range(len(self)):
+            yield self.starts[idx], self.ends[idx], self.text(idx)
+
+    def append(self, start: int, end: int, text: str) -> None:
+        """
+        Append a sentence to the store.
+
+        Parameters
+        ----------
+        start : int
+            The start time of the sentence in milliseconds.
+        end : int
+            The end time of the sentence in milliseconds.
+        text : str
+            The text of the sentence. Surrounding whitespace is stripped.
+        """
+        self.starts.append(start)
+        self.ends.append(end)
+        self.__buffer += text.strip().encode("utf-8")
+        self.__offsets.append(len(self.__buffer))
+
+    def text(self, idx: int) -> str:
+        """
+        Decode the text of the `idx`-th sentence.
+
+        Parameters
+        ----------
+        idx : int
+            The index of the sentence.
+
+        Returns
+        -------
+        str
+            The text of the sentence.
+        """
+        if idx < 0:
+            idx += len(self)
+        return self.__buffer[self.__offsets[idx] : self.__offsets[idx + 1]].decode(
+            "utf-8"
+        )
+
+    def iter_timeline(
+        self, start: int = 0, stop: Optional[int] = None
+    ) -> Iterator[str]:
+        """
+        Yield the timeline lines, e.g. `00:00:01 --> 00:00:03  **Hello.**`.
+        """
+        for idx in range(*slice(start, stop).indices(len(self))):
+            yield (
+                f"{ms_to_srt_time(self.starts[idx])} --> "
+                f"{ms_to_srt_time(self.ends[idx])}  **{self.text(idx)}**"
+            )
+
+    def iter_chatbot_timeline(
+        self, start: int = 0, stop: Optional[int] = None
+    ) -> Iterator[str]:
+        """
+        Yield the chatbot timeline entries, e.g. `00:00:01-->00:00:03*Hello.*`.
+        """
+        for idx in range(*slice(start, stop).indices(len(self))):
+            yield (
+                f"{ms_to_srt_time(self.starts[idx])}-->"
+                f"{ms_to_srt_time(self.ends[idx])}*{self.text(idx)}*"
+            )
+
+    def render_timeline(self) -> str:
+        """
+        Render the timeline shown to users, one sentence per paragraph.
+        """
+        return "\n\n".join(self.iter_timeline())
+
+    def render_transcript(self) -> str:
+        """
+        Render the plain transcript, one sentence per line.
+        """
+        return "\n".join(self.text(idx) for idx in range(len(self)))
+
+    def render_chatbot_timeline(self) -> str:
+        """
+        Render the compact timeline given to the chatbot as context.
+        """
+        return "--".join(self.iter_chatbot_timeline())
+
+    def save(self, directory: str) -> None:
+        """
+        Write the columns and the text buffer to `directory`.
+
+        Parameters
+        ----------
+        directory : str
+            The directory to write to. It must already exist.
+        """
+        for name, column in (
+            ("starts", self.starts),
+            ("ends", self.ends),
+            ("offsets", self.__offsets),
+        ):
+            with open(os.path.join(directory, f"{name}.bin"), "wb") as f:
+                column.tofile(f)
+        with open(os.path.join(directory, "text.bin"), "wb") as f:
+            f.write(self.__buffer)
+
+    @classmethod
+    def load(cls, directory: str) -> "SegmentStore":
+        """
+        Read a store written by `SegmentStore.save`.
+
+        Parameters
+        ----------
+        directory : str
+            The directory to read from.
+
+        Returns
+        -------
+        SegmentStore
+            The loaded store.
+        """
+        store = cls()
+        store.__offsets = array("q")
+        for name, column in (
+            ("starts", store.starts),
+            ("ends", store.ends),
+            ("offsets", store.__offsets),
+        ):
+            path = os.path.join(directory, f"{name}.bin")
+            with open(path, "rb") as f:
+                column.fromfile(f, os.path.getsize(path) // column.itemsize)
+        with open(os.path.join(directory, "text.bin"), "rb") as f:
+            store.__buffer = bytearray(f.read())
+
+        return store
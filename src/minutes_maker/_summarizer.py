@@ -1,10 +1,15 @@
+import asyncio
 import logging
-import os
-from typing import Union
-
-import openai
-import tiktoken
+from dataclasses import dataclass
+from enum import Enum
+from typing import AsyncIterator, Literal, Optional, Sequence, Union
 
+from ._chunk_planner import ChunkPlanner
+from ._extractive import select_sentences
+from ._llm_cache import LLMCache
+from ._llm_client import LLMClient
+from ._models import ModelRegistry, get_tokenizer
+from ._prompt_lengths import precompute_prompt_lengths, prompt_lengths
 from ._prompts import (
     EnglishLecturePrompts,
     EnglishMeetingPrompts,
@@ -39,6 +44,36 @@ from ._prompts import (
 )
 
 
+@dataclass(frozen=True)
+class SummaryNode:
+    """
+    A node of the summary tree of a transcript.
+
+    Leaves summarize consecutive sentences of the transcript, intermediate
+    nodes summarize consecutive nodes of the level below, and the root is
+    the final summary.
+
+    Attributes
+    ----------
+    level : int
+        The level of the node, 0 for leaves.
+    start : int
+        The index of the first sentence covered by the node.
+    stop : int
+        The index after the last sentence covered by the node.
+    summary : str
+        The summary of the sentences.
+    children : tuple[int, ...]
+        The indices of the summarized nodes of the level below.
+    """
+
+    level: int
+    start: int
+    stop: int
+    summary: str
+    children: tuple[int, ...] = ()
+
+
 class Summarizer:
     """
     A class to summarize research papers using OpenAI's API.
@@ -50,69 +85,82 @@ class Summarizer:
     language : Literal["ja", "en". etc.]
     """
 
-    def __init__(self, model: str = "gpt-3.5-turbo") -> None:
+    def __init__(
+        self,
+        model: str = "gpt-3.5-turbo",
+        *,
+        strategy: Literal["map_reduce", "rolling"] = "map_reduce",
+        max_concurrency: int = 4,
+        cache: Optional[LLMCache] = None,
+        client: Optional[LLMClient] = None,
+        registry: Optional[ModelRegistry] = None,
+        max_generation_length: int = 3000,
+        max_depth: int = 4,
+        extractive_ratio: Optional[float] = None,
+    ) -> None:
         """
-        Initialize the Summarizer class with an OCRModel instance and
-        set the OpenAI API key.
+        Initialize the Summarizer class.
 
         Parameters
         ----------
         model : str, optional
             The OpenAI model to be used for summarization,
             by default "gpt-3.5-turbo".
+        strategy : Literal["map_reduce", "rolling"], optional
+            How to shorten transcripts longer than the context window,
+            by default "map_reduce".
+            "map_reduce" splits the transcript into chunks once, shortens
+            them concurrently and reduces the results level by level.
+            "rolling" shortens the head of the transcript one call at a
+            time and prepends the result to the rest.
+        max_concurrency : int, optional
+            The number of concurrent requests per summary in "map_reduce",
+            by default 4.
+        cache : LLMCache, optional
+            The cache of responses to identical requests,
+            by default None (no caching).
+        client : LLMClient, optional
+            The client shared with other OpenAI callers,
+            by default None (a new client).
+        registry : ModelRegistry, optional
+            The registry of model context windows and output limits,
+            by default None (the built-in limits).
+        max_generation_length : int, optional
+            The maximum number of tokens of each summary, capped by the
+            output limit of the model, by default 3000.
+        max_depth : int, optional
+            The maximum number of levels of intermediate summaries of the
+            "map_reduce" strategy, by default 4.
+        extractive_ratio : float, optional
+            Drop filler sentences and keep the highest ranked sentences
+            up to this fraction of the tokens of long transcripts before
+            any request, by default None (disabled).
         """
+        if strategy not in ("map_reduce", "rolling"):
+            raise ValueError(
+                f"strategy must be either 'map_reduce' or 'rolling', but got {strategy}."
+            )
+        if extractive_ratio is not None and not 0 < extractive_ratio <= 1:
+            raise ValueError(
+                f"extractive_ratio must be in (0, 1], but got {extractive_ratio}."
+            )
+        self.__strategy = strategy
+        self.__max_concurrency = max_concurrency
+        self.__max_depth = max_depth
+        self.__extractive_ratio = extractive_ratio
+        self.__cache = cache
+        self.__client = client if client is not None else LLMClient()
         self.__model = model
-        self.__tokenizer = tiktoken.encoding_for_model(self.__model)
-
-        openai.organization = os.getenv("OPENAI_ORGANIZATION", "")
-        openai.api_key = os.getenv("OPENAI_API_KEY")
+        self.__tokenizer = get_tokenizer(self.__model)
+        precompute_prompt_lengths(self.__tokenizer)
 
-        if "16k" in self.__model:
-            self.__max_context_length = 12500
-            self.__max_generation_length = 3000
-        elif "32k" in self.__model:
-            self.__max_context_length = 28500
-            self.__max_generation_length = 3000
-        else:
-            self.__max_context_length = 4500
-            self.__max_generation_length = 3000
-
-        # Somehow cannot extend the Enum class,
-        # we cannot make base class for prompts.
-        self.__prompts: Union[
-              EnglishLecturePrompts,
-    EnglishMeetingPrompts,
-    JapaneseLecturePrompts,
-    JapaneseMeetingPrompts,
-    SpanishLecturePrompts,
-    SpanishMeetingPrompts,
-    UrduLecturePrompts,
-    HindiLecturePrompts,
-    ArabicLecturePrompts,
-    FrenchLecturePrompts,
-    GermanLecturePrompts,
-    KoreanLecturePrompts,
-    BengaliLecturePrompts,
-    ChineseLecturePrompts,
-    ItalianLecturePrompts,
-    RussianLecturePrompts,
-    TurkishLecturePrompts,
-    PortugueseLecturePrompts,
-    UrduMeetingPrompts,
-    HindiMeetingPrompts,
-    ArabicMeetingPrompts,
-    FrenchMeetingPrompts,
-    GermanMeetingPrompts,
-    KoreanMeetingPrompts,
-    BengaliMeetingPrompts,
-    ChineseMeetingPrompts,
-    ItalianMeetingPrompts,
-    RussianMeetingPrompts,
-    TurkishMeetingPrompts,
-    PortugueseMeetingPrompts  
-        ] = None
+        capabilities = (registry if registry is not None else ModelRegistry())[model]
+        self.__context_window = capabilities.context_window
+        self.__max_generation_length = min(
+            max_generation_length, capabilities.max_output_tokens
+        )
 
-    def summarize(
+    async def summarize(
         self,
         transcript: str,
         prompts: Union[
@@ -147,6 +195,9 @@ class Summarizer:
     TurkishMeetingPrompts,
     PortugueseMeetingPrompts  
         ],
+        *,
+        use_cache: bool = True,
+        language: Optional[str] = None,
     ) -> str:
         """
         Summarize the given text using OpenAI's language model.
@@ -163,94 +214,547 @@ class Summarizer:
             EnglishMeetingPrompts
         ]
             The prompts to be used for summarization.
+        use_cache : bool, optional
+            Whether to reuse cached responses to identical requests,
+            by default True.
+        language : str, optional
+            The language of the transcript, selecting the filler phrases of
+            the extractive filter, by default None (every language).
 
         Returns
         -------
         str
             The summarized text.
         """
-        self.__prompts = prompts
-        response = openai.ChatCompletion.create(
-            model=self.__model,
-            max_tokens=self.__max_generation_length,
-            messages=[
+        tree = await self.summarize_tree(
+            transcript, prompts, use_cache=use_cache, language=language
+        )
+        return tree[-1].summary
+
+    async def summarize_tree(
+        self,
+        transcript: str,
+        prompts: Enum,
+        *,
+        use_cache: bool = True,
+        language: Optional[str] = None,
+    ) -> list[SummaryNode]:
+        """
+        Summarize the given text and keep the intermediate summaries.
+
+        With the "map_reduce" strategy, the summaries of the chunks of a
+        long transcript and of their groups are returned as the nodes of
+        a tree, so that any part of a recording can be looked up without
+        further requests.
+
+        Parameters
+        ----------
+        transcript : str
+            The transcript of the meeting.
+            Texts are split into sentences by newline characters.
+        prompts : Enum
+            The prompts to be used for summarization.
+        use_cache : bool, optional
+            Whether to reuse cached responses to identical requests,
+            by default True.
+        language : str, optional
+            The language of the transcript, selecting the filler phrases of
+            the extractive filter, by default None (every language).
+
+        Returns
+        -------
+        list[SummaryNode]
+            The nodes ordered by level, the root last.
+        """
+        (tree,) = await self.summarize_trees(
+            transcript, [prompts], use_cache=use_cache, language=language
+        )
+        return tree
+
+    async def summarize_trees(
+        self,
+        transcript: str,
+        prompts: Sequence[Enum],
+        *,
+        use_cache: bool = True,
+        language: Optional[str] = None,
+    ) -> list[list[SummaryNode]]:
+        """
+        Summarize the given text once per prompts, e.g. in several languages,
+        shortening it only once.
+
+        The transcript is shortened with the first prompts until it fits in
+        the summary request of every prompts, and the summary requests then
+        run concurrently on the shared intermediate summaries.
+
+        Parameters
+        ----------
+        transcript : str
+            The transcript of the meeting.
+            Texts are split into sentences by newline characters.
+        prompts : Sequence[Enum]
+            The prompts of each summary.
+        use_cache : bool, optional
+            Whether to reuse cached responses to identical requests,
+            by default True.
+        language : str, optional
+            The language of the transcript, selecting the filler phrases of
+            the extractive filter, by default None (every language).
+
+        Returns
+        -------
+        list[list[SummaryNode]]
+            The tree of each summary, see `Summarizer.summarize_tree`.
+            The trees share all nodes but their roots.
+        """
+        shortened, nodes = await self.__shortening_transcript(
+            transcript,
+            prompts[0],
+            use_cache=use_cache,
+            language=language,
+            budget=min(self.__budget(p, "summary") for p in prompts),
+        )
+        summaries = await asyncio.gather(
+            *(
+                self.__complete(
+                    self.__summary_messages(shortened, p), use_cache=use_cache
+                )
+                for p in prompts
+            )
+        )
+        if self.__cache is not None:
+            stats = await asyncio.to_thread(lambda: self.__cache.stats)
+            logging.info(f"LLM cache: {stats}")
+
+        return [
+            nodes + [self.__root(transcript, nodes, summary)] for summary in summaries
+        ]
+
+    async def summarize_stream(
+        self,
+        transcript: str,
+        prompts: Enum,
+        *,
+        use_cache: bool = True,
+        language: Optional[str] = None,
+        tree: Optional[list[SummaryNode]] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Summarize the given text and yield the summary as it is generated.
+
+        The transcript is shortened as in `Summarizer.summarize`, and only
+        the final summary request is streamed. A cached summary is
+        yielded at once.
+
+        Parameters
+        ----------
+        transcript : str
+            The transcript of the meeting.
+            Texts are split into sentences by newline characters.
+        prompts : Enum
+            The prompts to be used for summarization.
+        use_cache : bool, optional
+            Whether to reuse cached responses to identical requests,
+            by default True.
+        language : str, optional
+            The language of the transcript, selecting the filler phrases of
+            the extractive filter, by default None (every language).
+        tree : list[SummaryNode], optional
+            A list the nodes of `Summarizer.summarize_tree` are appended
+            to once the stream is complete, by default None.
+
+        Yields
+        ------
+        str
+            The deltas of the summarized text.
+        """
+        shortened, nodes = await self.__shortening_transcript(
+            transcript,
+            prompts,
+            use_cache=use_cache,
+            language=language,
+            budget=self.__budget(prompts, "summary"),
+        )
+        messages = self.__summary_messages(shortened, prompts)
+
+        use_cache = use_cache and self.__cache is not None
+        key = LLMCache.key(self.__model, messages, self.__max_generation_length)
+        cached = (
+            await asyncio.to_thread(self.__cache.get, key) if use_cache else None
+        )
+        if cached is not None:
+            yield cached
+            summary = cached
+        else:
+            deltas = []
+            async for delta in self.__client.stream(
+                self.__model, messages, max_tokens=self.__max_generation_length
+            ):
+                deltas.append(delta)
+                yield delta
+            summary = "".join(deltas)
+
+            if use_cache:
+                await asyncio.to_thread(self.__cache.put, key, summary)
+
+        if tree is not None:
+            tree.extend(nodes + [self.__root(transcript, nodes, summary)])
+
+    def __root(
+        self, transcript: str, nodes: list[SummaryNode], summary: str
+    ) -> SummaryNode:
+        """
+        Build the root node above the top level of `nodes`.
+        """
+        top = nodes[-1].level if nodes else -1
+        return SummaryNode(
+            level=top + 1,
+            start=0,
+            stop=transcript.count("\n") + 1,
+            summary=summary,
+            children=tuple(idx for idx, node in enumerate(nodes) if node.level == top),
+        )
+
+    def __summary_messages(
+        self, transcript: str, prompts: Enum
+    ) -> list[dict[str, str]]:
+        """
+        Build the messages of the final summary request.
+
+        Parameters
+        ----------
+        transcript : str
+            The transcript, short enough to fit in the context window.
+        prompts : Enum
+            The prompts to be used for summarization.
+
+        Returns
+        -------
+        list[dict[str, str]]
+            The chat messages.
+        """
+        return [
+            {
+                "role": "system",
+                "content": prompts.SUMMARIZE_SYSTEM_PROMPT.value.format(
+                    transcript=transcript
+                ),
+            },
+            {
+                "role": "user",
+                "content": prompts.SUMMARIZE_USER_PROMPT_FOR_SUMMARY.value,
+            },
+        ]
+
+    async def __shortening_transcript(
+        self,
+        transcript: str,
+        prompts: Enum,
+        *,
+        use_cache: bool,
+        language: Optional[str],
+        budget: int,
+    ) -> tuple[str, list[SummaryNode]]:
+        """
+        Shorten the given transcript using OpenAI's language model.
+
+        Parameters
+        ----------
+        transcript : str
+            The transcript of the meeting.
+            Texts are split into sentences by newline characters.
+        prompts : Enum
+            The prompts to be used for shortening.
+        use_cache : bool
+            Whether to reuse cached responses to identical requests.
+        language : str, optional
+            The language of the transcript, selecting the filler phrases of
+            the extractive filter, None for every language.
+        budget : int
+            The number of tokens the shortened text must fit in.
+
+        Returns
+        -------
+        tuple[str, list[SummaryNode]]
+            The shortened text and the intermediate summaries it is made of,
+            which are only kept by the "map_reduce" strategy.
+        """
+        chunk_budget = self.__budget(prompts, "shortening")
+        # tokenizing a long transcript takes a while; keep the event loop free
+        planner = await asyncio.to_thread(
+            ChunkPlanner,
+            self.__tokenizer,
+            transcript.split("\n"),
+            max_sentence_tokens=chunk_budget,
+        )
+        if self.__extractive_ratio is not None:
+            planner = await asyncio.to_thread(self.__extract, planner, budget, language)
+            transcript = planner.text()
+        if planner.num_tokens() <= budget:
+            return transcript, []
+
+        if self.__strategy == "map_reduce":
+            return await self.__map_reduce_transcript(
+                planner, prompts, budget, chunk_budget, use_cache=use_cache
+            )
+
+        shortened, shortened_length, start = "", 0, 0
+        while shortened_length + planner.num_tokens(start) > budget:
+            logging.info(
+                f"transcript is too long "
+                f"({shortened_length + planner.num_tokens(start)} tokens), "
+                "shortening transcript..."
+            )
+            # shorten the previous summary and the following sentences
+            stop = planner.fit(chunk_budget - shortened_length, start)
+            shortened = await self.__shorten(
+                "\n".join(filter(None, [shortened, planner.text(start, stop)])),
+                prompts,
+                use_cache=use_cache,
+            )
+            shortened_length = len(self.__tokenizer.encode(f"{shortened}\n"))
+            start = stop
+
+            logging.info(
+                f"shortened transcript to "
+                f"{shortened_length + planner.num_tokens(start)} tokens."
+            )
+
+        return "\n".join(filter(None, [shortened, planner.text(start)])), []
+
+    async def __map_reduce_transcript(
+        self,
+        planner: ChunkPlanner,
+        prompts: Enum,
+        budget: int,
+        chunk_budget: int,
+        *,
+        use_cache: bool,
+    ) -> tuple[str, list[SummaryNode]]:
+        """
+        Shorten a transcript by summarizing its chunks concurrently
+        and reducing the summaries until they fit in the context window.
+
+        Each level runs its calls in parallel, so a transcript split into
+        N chunks takes about log(N) sequential round trips instead of N.
+        Every summary is kept as a node of the summary tree.
+
+        Parameters
+        ----------
+        planner : ChunkPlanner
+            The planner over the sentences of the transcript.
+        prompts : Enum
+            The prompts to be used for shortening.
+        budget : int
+            The number of transcript tokens that fit in the summary request.
+        chunk_budget : int
+            The number of transcript tokens that fit in a shortening request.
+        use_cache : bool
+            Whether to reuse cached responses to identical requests.
+
+        Returns
+        -------
+        tuple[str, list[SummaryNode]]
+            The shortened text and the summaries of all levels.
+        """
+        semaphore = asyncio.Semaphore(self.__max_concurrency)
+
+        async def shorten(chunk: str) -> str:
+            async with semaphore:
+                return await self.__shorten(chunk, prompts, use_cache=use_cache)
+
+        nodes: list[SummaryNode] = []
+        # the node of each "sentence" of the current planner, None for leaves
+        current: Optional[list[int]] = None
+        level = 0
+        while planner.num_tokens() > budget:
+            if level == self.__max_depth:
+                logging.warning(
+                    f"summary tree reached its maximum depth ({level}), "
+                    f"truncating {planner.num_tokens()} tokens to {budget}."
+                )
+                return planner.text(0, planner.fit(budget)), nodes
+
+            ranges = planner.plan(chunk_budget)
+            logging.info(f"shortening {len(ranges)} chunks at level {level}...")
+            summaries = await asyncio.gather(
+                *(shorten(planner.text(start, stop)) for start, stop in ranges)
+            )
+
+            next_nodes = []
+            for (start, stop), summary in zip(ranges, summaries):
+                if current is None:
+                    node = SummaryNode(
+                        level,
+                        planner.source(start),
+                        planner.source(stop - 1) + 1,
+                        summary,
+                    )
+                else:
+                    # split summaries map back to the same child
+                    children = tuple(
+                        dict.fromkeys(
+                            current[planner.source(i)] for i in range(start, stop)
+                        )
+                    )
+                    node = SummaryNode(
+                        level,
+                        nodes[children[0]].start,
+                        nodes[children[-1]].stop,
+                        summary,
+                        children,
+                    )
+                next_nodes.append(len(nodes))
+                nodes.append(node)
+
+            # each summary becomes a "sentence" of the next level
+            planner = ChunkPlanner(
+                self.__tokenizer, list(summaries), max_sentence_tokens=chunk_budget
+            )
+            logging.info(f"shortened transcript to {planner.num_tokens()} tokens.")
+            current = next_nodes
+            level += 1
+
+        return planner.text(), nodes
+
+    def __extract(
+        self, planner: ChunkPlanner, budget: int, language: Optional[str]
+    ) -> ChunkPlanner:
+        """
+        Drop filler sentences and keep the most central sentences locally,
+        before any request is sent.
+
+        Transcripts that fit in one request only lose their filler; longer
+        ones are reduced to `extractive_ratio` of their tokens, but not
+        below one request.
+
+        Parameters
+        ----------
+        planner : ChunkPlanner
+            The planner over the sentences of the transcript.
+        budget : int
+            The number of transcript tokens that fit in one request.
+        language : str, optional
+            The language of the transcript.
+
+        Returns
+        -------
+        ChunkPlanner
+            The planner over the kept sentences.
+        """
+        total = planner.num_tokens()
+        target = max(int(total * self.__extractive_ratio), min(total, budget))
+        extracted = planner.select(
+            select_sentences(
+                planner.sentences, planner.sentence_tokens(), target, language
+            )
+        )
+        logging.info(
+            f"extractive filter kept {len(extracted)}/{len(planner)} sentences, "
+            f"{extracted.num_tokens()}/{total} tokens "
+            f"({1 - extracted.num_tokens() / max(total, 1):.0%} fewer)."
+        )
+        return extracted
+
+    def __budget(self, prompts: Enum, request: Literal["summary", "shortening"]) -> int:
+        """
+        Compute how many transcript tokens fit in one request with `prompts`.
+
+        The context window of the model is reduced by the generation length
+        and by the precomputed length of the prompt templates, so chunks
+        fill the context window without encoding any request.
+
+        Parameters
+        ----------
+        prompts : Enum
+            The prompts to be used for summarization.
+        request : Literal["summary", "shortening"]
+            The request the transcript is sent with.
+
+        Returns
+        -------
+        int
+            The number of transcript tokens.
+        """
+        lengths = prompt_lengths(prompts, self.__tokenizer)
+        return (
+            self.__context_window
+            - self.__max_generation_length
+            - (
+                lengths.summary_request
+                if request == "summary"
+                else lengths.shortening_request
+            )
+        )
+
+    async def __shorten(
+        self, transcript: str, prompts: Enum, *, use_cache: bool
+    ) -> str:
+        """
+        Shorten a part of the transcript with a single request.
+
+        Parameters
+        ----------
+        transcript : str
+            The part of the transcript to shorten.
+        prompts : Enum
+            The prompts to be used for shortening.
+        use_cache : bool
+            Whether to reuse cached responses to identical requests.
+
+        Returns
+        -------
+        str
+            The shortened text.
+        """
+        return await self.__complete(
+            [
                 {
                     "role": "system",
-                    "content": self.__prompts.SUMMARIZE_SYSTEM_PROMPT.value.format(
-                        transcript=self.__shortening_transcript(transcript)
+                    "content": prompts.SUMMARIZE_SYSTEM_PROMPT.value.format(
+                        transcript=transcript
                     ),
                 },
                 {
                     "role": "user",
-                    "content": self.__prompts.SUMMARIZE_USER_PROMPT_FOR_SUMMARY.value,
+                    "content": prompts.SUMMARIZE_USER_PROMPT_FOR_SHORTENING.value,
                 },
             ],
+            use_cache=use_cache,
         )
-        return response["choices"][0]["message"]["content"]
 
-    def __shortening_transcript(self, transcript: str) -> str:
+    async def __complete(
+        self, messages: list[dict[str, str]], *, use_cache: bool
+    ) -> str:
         """
-        Shorten the given transcript using OpenAI's language model.
+        Request a chat completion, answering from the cache when possible.
+        The SQLite cache is read and written in worker threads, so that
+        other requests are served meanwhile.
 
         Parameters
         ----------
-        transcript : str
-            The transcript of the meeting.
-            Texts are split into sentences by newline characters.
+        messages : list[dict[str, str]]
+            The chat messages.
+        use_cache : bool
+            Whether to reuse and store cached responses.
 
         Returns
         -------
         str
-            The shortened text.
+            The content of the response.
         """
-        tokenized = self.__tokenizer.encode(transcript)
-        while len(tokenized) > self.__max_context_length:
-            logging.info(
-                f"transcript is too long ({len(tokenized)} tokens)",
-                "shortening transcript...",
-            )
-            # seperate `tokenized` by newline token with the close index
-            # to `self.__max_context_length`
-            close_token_idx = None
-            for i, token in enumerate(
-                tokenized[
-                    self.__max_context_length - 100 : self.__max_context_length + 200
-                ]
-            ):
-                if token in [198, 345, 627, 4999, 5380, 9174, 95532]:
-                    close_token_idx = self.__max_context_length - 100 + i
-                    break
-
-            # if no newline token is close to `self.__max_context_length` th,
-            # just split `tokenized` at `self.__max_context_length`
-            if close_token_idx is None:
-                close_token_idx = self.__max_context_length
-
-            # shorten the part of transcript
-            shortened = openai.ChatCompletion.create(
-                model=self.__model,
-                max_tokens=self.__max_generation_length,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": self.__prompts.SUMMARIZE_SYSTEM_PROMPT.value.format(
-                            transcript=self.__tokenizer.decode(
-                                tokenized[:close_token_idx]
-                            )
-                        ),
-                    },
-                    {
-                        "role": "user",
-                        "content": self.__prompts.SUMMARIZE_USER_PROMPT_FOR_SHORTENING.value,
-                    },
-                ],
-            )["choices"][0]["message"]["content"]
-
-            # concatenate the shortened part and the rest of transcript
-            tokenized = (
-                self.__tokenizer.encode(f"{shortened}\n") + tokenized[close_token_idx:]
-            )
+        use_cache = use_cache and self.__cache is not None
+        if use_cache:
+            key = LLMCache.key(self.__model, messages, self.__max_generation_length)
+            cached = await asyncio.to_thread(self.__cache.get, key)
+            if cached is not None:
+                return cached
+
+        content = await self.__client.complete(
+            self.__model, messages, max_tokens=self.__max_generation_length
+        )
 
-            logging.info(f"shortened transcript to {len(tokenized)} tokens.")
+        if use_cache:
+            await asyncio.to_thread(self.__cache.put, key, content)
 
-        return self.__tokenizer.decode(tokenized)
+        return content
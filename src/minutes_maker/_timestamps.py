@@ -0,0 +1,266 @@
+import re
+from bisect import bisect_right
+from typing import Optional, Sequence
+
+_UNITS = {
+    "zero": 0,
+    "one": 1,
+    "two": 2,
+    "three": 3,
+    "four": 4,
+    "five": 5,
+    "six": 6,
+    "seven": 7,
+    "eight": 8,
+    "nine": 9,
+    "ten": 10,
+    "eleven": 11,
+    "twelve": 12,
+    "thirteen": 13,
+    "fourteen": 14,
+    "fifteen": 15,
+    "sixteen": 16,
+    "seventeen": 17,
+    "eighteen": 18,
+    "nineteen": 19,
+}
+_TENS = {"twenty": 20, "thirty": 30, "forty": 40, "fifty": 50, "sixty": 60}
+_UNIT_MS = {"h": 3_600_000, "m": 60_000, "s": 1_000}
+
+_COUNT = (
+    r"\d+(?:\.\d+)?"
+    rf"|(?:{'|'.join(_TENS)})(?:[- ](?:{'|'.join(list(_UNITS)[1:10])}))?"
+    rf"|{'|'.join(_UNITS)}"
+)
+_NUMBER = rf"{_COUNT}|an?|half an?"
+_UNIT = r"hours?|hrs?|minutes?|mins?|seconds?|secs?"
+_PART = rf"\b(?:{_NUMBER})\s+(?:{_UNIT})\b"
+# e.g. "1 hour 2 minutes and 30 seconds", "an hour and a half" is not supported
+_DURATION = rf"{_PART}(?:\s*(?:,\s*|and\s+)?{_PART})*"
+
+# words that change the quantity or the part of a recording a question is
+# about, besides numbers
+_TERMS = frozenset("""
+    half quarter dozen hundred thousand million billion percent first second
+    third fourth fifth last final start beginning middle end before after
+    since until till past ago early earlier late later previous next hour
+    minute second day week month year
+    """.split())
+_ABBREVIATIONS = {"hr": "hour", "min": "minute", "sec": "second"}
+
+_CLOCK = re.compile(r"\b(\d{1,2}):([0-5]\d)(?::([0-5]\d))?\b")
+# e.g. "1h05m", "1h 5m 30s", "5m30s"
+_COMPACT = re.compile(
+    r"\b\d+h\s?\d{1,2}m(?:\s?\d{1,2}s)?\b|\b\d+[hm]\s?\d{1,2}s\b", re.IGNORECASE
+)
+_RECORDING = r"(?:recording|meeting|lecture|video|audio|talk|call)"
+# what ties a duration to the timeline of the recording
+_ANCHOR = (
+    rf"\s+mark\b|\s+into\s+the\s+{_RECORDING}\b|(?:\s+in(?:to)?)?\s*[?.!]*\s*$"
+)
+_FROM_START = re.compile(
+    rf"(?:\b(?:at|around)\s+(?:the\s+)?(?P<at>{_DURATION})(?P<anchor>{_ANCHOR})?"
+    rf"|(?P<after>{_DURATION})\s+(?:(?:after|from|past|since|into)\s+the\s+"
+    rf"(?:start|beginning)|into\s+the\s+{_RECORDING})"
+    # "5 minutes in" only at the end, unlike "takes 3 hours in total"
+    rf"|(?P<into>{_DURATION})\s+in(?:to)?\s*[?.!]*\s*$)",
+    re.IGNORECASE,
+)
+_FROM_END = re.compile(
+    rf"(?P<before>{_DURATION})\s+(?:before|from)\s+the\s+end", re.IGNORECASE
+)
+_AT_START = re.compile(
+    r"\bat\s+the\s+(?:very\s+)?(?:start|beginning)\b"
+    rf"(?P<anchor>\s+of\s+the\s+{_RECORDING}\b|\s*[?.!]*\s*$)?",
+    re.IGNORECASE,
+)
+_AT_END = re.compile(
+    r"\bat\s+the\s+(?:very\s+)?end\b"
+    rf"(?P<anchor>\s+of\s+the\s+{_RECORDING}\b|\s*[?.!]*\s*$)?",
+    re.IGNORECASE,
+)
+
+# questions asking what was said at a point in time ...
+_LOOKUP = re.compile(
+    r"\b(?:said|say|says|saying|spoken|speak\w*|talk\w*|discuss\w*|mention\w*"
+    r"|happen\w*|going on|quote\w*)\b",
+    re.IGNORECASE,
+)
+# ... unless they need an answer synthesized over the timeline
+_SYNTHESIS = re.compile(
+    r"\b(?:why|how|summar\w*|explain\w*|compar\w*|between|until|till|through"
+    r"|first|last|every|all|whole)\b",
+    re.IGNORECASE,
+)
+
+
+def _parse_number(number: str) -> float:
+    number = number.lower().replace("-", " ")
+    if number.startswith("half"):
+        return 0.5
+    if number in ("a", "an"):
+        return 1
+    if number[0].isdigit():
+        return float(number)
+    return sum(_TENS.get(word, _UNITS.get(word, 0)) for word in number.split())
+
+
+def _parse_duration(duration: str) -> int:
+    """
+    Convert a duration such as "two minutes and 5 seconds" to milliseconds.
+    """
+    return int(
+        sum(
+            _parse_number(number) * _UNIT_MS[unit[0].lower()]
+            for number, unit in re.findall(
+                rf"\b({_NUMBER})\s+({_UNIT})\b", duration, re.IGNORECASE
+            )
+        )
+    )
+
+
+def time_terms(question: str) -> list[str]:
+    """
+    List the numbers, in digits, and the quantity and position words of a
+    question in order, e.g. ["first", "10", "minute"] for "What was said
+    in the first ten minutes?". Questions with different terms ask about
+    different amounts or parts of a recording.
+
+    Parameters
+    ----------
+    question : str
+        The question.
+
+    Returns
+    -------
+    list[str]
+        The terms of the question.
+    """
+    terms = []
+    for word in re.findall(rf"\b(?:{_COUNT})\b|\w+", question.lower()):
+        if re.fullmatch(_COUNT, word):
+            terms.append(f"{_parse_number(word):g}")
+            continue
+        singular = word[:-1] if word.endswith("s") else word
+        for term in (word, singular):
+            term = _ABBREVIATIONS.get(term, term)
+            if term in _TERMS:
+                terms.append(term)
+                break
+    return terms
+
+
+def parse_time_reference(
+    question: str, duration_ms: int, *, anchored: bool = False
+) -> Optional[int]:
+    """
+    Find the point in time a question refers to.
+
+    Understands clock times ("00:02:01", "2:01" as MM:SS, "1h05m") and
+    English relative expressions ("two minutes after the start", "5
+    minutes into the meeting", "5 minutes in?", "at 90 seconds", "1 minute
+    before the end", "at the end").
+
+    Parameters
+    ----------
+    question : str
+        The question.
+    duration_ms : int
+        The length of the recording in milliseconds, for expressions
+        relative to its end.
+    anchored : bool, optional
+        Whether to only understand clock times and expressions tied to the
+        recording, e.g. "at 90 seconds?" or "at the end of the meeting"
+        but not "at 90 seconds the kettle boils" or "at the end of the
+        discussion", by default False.
+
+    Returns
+    -------
+    int, optional
+        The point in time in milliseconds, or None if the question does
+        not refer to one.
+    """
+    if match := _CLOCK.search(question):
+        first, second, third = match.groups()
+        if third is None:
+            return (int(first) * 60 + int(second)) * 1000
+        return (int(first) * 3600 + int(second) * 60 + int(third)) * 1000
+    if match := _COMPACT.search(question):
+        return sum(
+            int(number) * _UNIT_MS[unit.lower()]
+            for number, unit in re.findall(r"(\d+)([hms])", match[0], re.IGNORECASE)
+        )
+    if match := _FROM_END.search(question):
+        return max(duration_ms - _parse_duration(match["before"]), 0)
+    match = _FROM_START.search(question)
+    if match and not (anchored and match["at"] and match["anchor"] is None):
+        return _parse_duration(match["at"] or match["after"] or match["into"])
+    match = _AT_START.search(question)
+    if match and not (anchored and match["anchor"] is None):
+        return 0
+    match = _AT_END.search(question)
+    if match and not (anchored and match["anchor"] is None):
+        return max(duration_ms - 1, 0)
+    return None
+
+
+def route_time_question(question: str, duration_ms: int) -> Optional[int]:
+    """
+    Decide whether a question only asks what was said at a point in time,
+    so that it is answered by looking the segments up without an LLM.
+
+    Only clock times and expressions tied to the recording count, see
+    `parse_time_reference`; questions merely mentioning a duration, e.g.
+    "did they say it takes 3 hours at most?", need an LLM.
+
+    Parameters
+    ----------
+    question : str
+        The question.
+    duration_ms : int
+        The length of the recording in milliseconds.
+
+    Returns
+    -------
+    int, optional
+        The point in time in milliseconds, or None if the question needs
+        an LLM.
+    """
+    if not _LOOKUP.search(question) or _SYNTHESIS.search(question):
+        return None
+    return parse_time_reference(question, duration_ms, anchored=True)
+
+
+def segments_at(
+    starts: Sequence[int], ends: Sequence[int], ms: int, neighbors: int = 1
+) -> range:
+    """
+    Find the segments spoken at a point in time by bisecting their sorted
+    start times.
+
+    Parameters
+    ----------
+    starts : Sequence[int]
+        The sorted start times of the segments in milliseconds.
+    ends : Sequence[int]
+        The end times of the segments in milliseconds.
+    ms : int
+        The point in time in milliseconds.
+    neighbors : int, optional
+        The number of segments kept before and after for context,
+        by default 1.
+
+    Returns
+    -------
+    range
+        The indices of the segment spoken at `ms`, or of the segments
+        around it if nothing was said then, and their neighbors.
+    """
+    if not starts:
+        return range(0)
+    idx = bisect_right(starts, ms) - 1
+    first = last = max(idx, 0)
+    if idx >= 0 and ends[idx] < ms and idx + 1 < len(starts):
+        # a pause: the segments before and after it
+        last = idx + 1
+    return range(max(first - neighbors, 0), min(last + neighbors + 1, len(starts)))
@@ -1,58 +1,149 @@
 import logging
 from dataclasses import dataclass
-from typing import Literal
+from typing import Literal, Optional
 import assemblyai as aai
-import datetime
 from pydub import AudioSegment
 import os
+from tempfile import TemporaryDirectory
 from dotenv import load_dotenv
 
+from ._recordings import file_sha256
+from ._segments import SegmentStore
+from ._transcription_cache import TranscriptionCache
+
 
 @dataclass(frozen=True)
 class TranscribeData:
-    timeline: str
-    transcript: str
-    chatbot_timeline: str
+    """
+    The transcribed sentences of an audio file.
+
+    The timeline, transcript and chatbot timeline are rendered from
+    `segments` on access, so only one copy of each sentence is kept.
+    """
+
+    segments: SegmentStore
+
+    @property
+    def timeline(self) -> str:
+        return self.segments.render_timeline()
+
+    @property
+    def transcript(self) -> str:
+        return self.segments.render_transcript()
+
+    @property
+    def chatbot_timeline(self) -> str:
+        return self.segments.render_chatbot_timeline()
 
 load_dotenv()
 
 aai.settings.api_key = os.getenv('ASSEMBLYAI_API_KEY')
+# point these at `python -m minutes_maker._fake_assemblyai` to run offline
+aai.settings.base_url = os.getenv('ASSEMBLYAI_BASE_URL', aai.settings.base_url)
+aai.settings.polling_interval = float(
+    os.getenv('ASSEMBLYAI_POLLING_INTERVAL', aai.settings.polling_interval)
+)
+
+
+# Languages the "best" speech model handles; everything else goes to "nano",
+# which is cheaper and covers a wider range of languages.
+BEST_MODEL_LANGUAGES = frozenset(
+    ["en", "es", "fr", "de", "it", "pt", "nl", "hi", "ja", "zh", "fi", "ko",
+     "pl", "ru", "tr", "uk", "vi"]
+)
 
-def ms_to_srt_time(ms: int) -> str:
+
+def transcription_config(
+    language: Optional[str],
+) -> Optional[aai.TranscriptionConfig]:
     """
-    Convert milliseconds to SRT-style timestamp: HH:MM:SS,mmm
+    Build the config routing `language` to the appropriate speech model.
+
+    Parameters
+    ----------
+    language : str, optional
+        The language code of the audio, e.g. "en".
+        None lets the backend use its defaults.
+
+    Returns
+    -------
+    aai.TranscriptionConfig, optional
+        The config, or None for the backend defaults.
     """
-    td = datetime.timedelta(milliseconds=ms)
-    total_seconds = td.total_seconds()
-    hours = int(total_seconds // 3600)
-    minutes = int((total_seconds % 3600) // 60)
-    seconds = int(total_seconds % 60)
-    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+    if language is None:
+        return None
+    return aai.TranscriptionConfig(
+        language_code=language,
+        speech_model=(
+            aai.SpeechModel.best
+            if language in BEST_MODEL_LANGUAGES
+            else aai.SpeechModel.nano
+        ),
+    )
 
 
-def transcribe_with_srt(audio_path: str):
+def transcribe_with_srt(
+    audio_path: str,
+    cache: Optional[TranscriptionCache] = None,
+    config: Optional[aai.TranscriptionConfig] = None,
+) -> SegmentStore:
     """
-    Transcribe audio with AssemblyAI, then write SRT with sentence timestamps.
+    Transcribe audio with AssemblyAI and collect sentences with timestamps.
+
+    When `cache` is given, the upload URL and the completed transcript ID
+    are reused for audio with the same content, so a retry or a re-run
+    only fetches the sentences again.
     """
-    transcriber = aai.Transcriber()
-    transcript = transcriber.transcribe(audio_path)
-    timelines = []
-    transcripts = []
-    chatbot_timelines = []
+    transcript = None
+    if cache is not None:
+        audio_sha256 = file_sha256(audio_path)
+        # transcripts made for another language must not be reused
+        transcript_key = (
+            audio_sha256
+            if config is None or config.language_code is None
+            else f"{audio_sha256}:{config.language_code}"
+        )
+        transcript_id = cache.transcript_id(transcript_key)
+        if transcript_id is not None:
+            try:
+                transcript = aai.Transcript.get_by_id(transcript_id)
+            except Exception as e:
+                logging.warning(f"cached transcript {transcript_id} is gone: {e}")
+            if (
+                transcript is None
+                or transcript.status != aai.TranscriptStatus.completed
+            ):
+                transcript = None
+                cache.put_transcript_id(transcript_key, None)
+            else:
+                logging.info(f"reusing transcript {transcript_id}.")
 
-    if transcript.status == aai.TranscriptStatus.error:
-        raise RuntimeError(f"Transcription failed: {transcript.error}")
+    if transcript is None:
+        transcriber = aai.Transcriber(config=config)
+        if cache is None:
+            transcript = transcriber.transcribe(audio_path)
+        else:
+            upload_url = cache.upload_url(audio_sha256)
+            if upload_url is not None:
+                logging.info("reusing uploaded audio.")
+                transcript = transcriber.transcribe(upload_url)
+            # the cached upload may have been removed before its TTL
+            if upload_url is None or transcript.status == aai.TranscriptStatus.error:
+                upload_url = transcriber.upload_file(audio_path)
+                cache.put_upload_url(audio_sha256, upload_url)
+                transcript = transcriber.transcribe(upload_url)
 
-    sentences = transcript.get_sentences()
+        if transcript.status == aai.TranscriptStatus.error:
+            raise RuntimeError(f"Transcription failed: {transcript.error}")
 
-    for idx, sent in enumerate(sentences, start=1):
-        start_ts = ms_to_srt_time(sent.start)
-        end_ts = ms_to_srt_time(sent.end)
-        timelines.append(f"{start_ts} --> {end_ts}  **{sent.text.strip()}**")
-        transcripts.append(sent.text.strip())
-        chatbot_timelines.append(f"{start_ts}-->{end_ts}*{sent.text.strip()}*")
-         
-    return timelines, transcripts, chatbot_timelines
+        if cache is not None:
+            cache.put_transcript_id(transcript_key, transcript.id)
+
+    segments = SegmentStore()
+    for sent in transcript.get_sentences():
+        segments.append(sent.start, sent.end, sent.text)
+
+    return segments
 
 
 
@@ -63,6 +154,7 @@ class Transcriber:
         *,
         cpu_threads: int = 7,
         num_workers: int = 1,
+        cache_path: Optional[str] = None,
     ) -> None:
         """ 
         Initialize the transcriber.
@@ -77,8 +169,76 @@ class Transcriber:
         num_workers : int, optional
             The number of workers to use for inference,
             by default 1 (non-parallel).
+        cache_path : str, optional
+            The path to the SQLite file caching upload URLs and
+            transcript IDs, by default None (no caching).
+        """
+        self.__cache = (
+            TranscriptionCache(cache_path) if cache_path is not None else None
+        )
+
+    def detect_language(
+        self, audio_or_video_file_path: str, *, seconds: float = 30.0
+    ) -> tuple[Optional[str], float]:
         """
+        Identify the spoken language from the opening seconds of a file.
 
+        Only a short clip is decoded and sent to the backend's language
+        detection, so this costs a fraction of the full transcription.
+        Detections are cached by the SHA-256 of the file, so retries and
+        re-runs of the same recording skip it.
+
+        Parameters
+        ----------
+        audio_or_video_file_path : str
+            The path to the video or audio file.
+        seconds : float, optional
+            The length of the opening window, by default 30.0.
+
+        Returns
+        -------
+        tuple[Optional[str], float]
+            The detected language code, e.g. "en", and its confidence.
+            The language is None if detection failed.
+        """
+        try:
+            audio_sha256 = file_sha256(audio_or_video_file_path)
+            if self.__cache is not None:
+                cached = self.__cache.detected_language(audio_sha256, seconds)
+                if cached is not None:
+                    return cached
+
+            with TemporaryDirectory() as tempdir:
+                clip_path = f"{tempdir}/clip.mp3"
+                AudioSegment.from_file(
+                    audio_or_video_file_path, duration=seconds
+                ).export(clip_path, format="mp3")
+                transcript = aai.Transcriber(
+                    config=aai.TranscriptionConfig(
+                        language_detection=True, speech_model=aai.SpeechModel.nano
+                    )
+                ).transcribe(clip_path)
+        except Exception as e:
+            # the recording is still transcribed without a detected language
+            logging.warning(f"language detection failed: {e}")
+            return None, 0.0
+
+        if transcript.status == aai.TranscriptStatus.error:
+            logging.warning(f"language detection failed: {transcript.error}")
+            return None, 0.0
+
+        language = transcript.json_response.get("language_code") or ""
+        confidence = transcript.json_response.get("language_confidence") or 0.0
+        logging.info(f"detected language {language} ({confidence:.2f}).")
+
+        language = language.split("_")[0]
+        if not language:
+            return None, 0.0
+        if self.__cache is not None:
+            self.__cache.put_detected_language(
+                audio_sha256, seconds, language, confidence
+            )
+        return language, confidence
 
     def convert_and_transcribe(
         self,
@@ -86,6 +246,7 @@ class Transcriber:
         *,
         prompt: str = "",
         beam_size: int = 5,
+        language: Optional[str] = None,
     ) -> TranscribeData:
         """
         Transcribe an audio or video file.
@@ -99,6 +260,9 @@ class Transcriber:
             the context, by default "".
         beam_size : int, optional
             The beam size to use for beam search, by default 5.
+        language : str, optional
+            The language of the audio, used to route it to the
+            appropriate speech model, by default None (backend default).
 
         Returns
         -------
@@ -110,7 +274,10 @@ class Transcriber:
 
         # Transcribe the audio file
         return self.__transcribe(
-            audio_file_path=audio_file_path, prompt=prompt, beam_size=beam_size
+            audio_file_path=audio_file_path,
+            prompt=prompt,
+            beam_size=beam_size,
+            language=language,
         )
 
     def __transcribe(
@@ -119,6 +286,7 @@ class Transcriber:
         *,
         prompt: str = "",
         beam_size: int = 5,
+        language: Optional[str] = None,
     ) -> TranscribeData:
         """
         Transcribe an audio file.
@@ -130,30 +298,20 @@ class Transcriber:
         prompt : str, optional
             The initial prompt to make the model easier to understand
             the context, by default "".
+        language : str, optional
+            The language of the audio, by default None (backend default).
 
         Returns
         -------
         TranscribeData
             The transcribed text and the timeline of the audio file.
         """
-
-        transcripts: list[str] = []
-        timelines: list[str] = []
-        chatbot_timelines: list[str] = []
-        
-
-
-        timelines, transcripts, chatbot_timelines = transcribe_with_srt(audio_file_path)
-        text = "\n\n".join(timelines)
-        audio_file_path_text_file = audio_file_path.split('/')[0] +'.txt'
-        with open(audio_file_path_text_file, "w", encoding="utf-8") as f:
-            f.write(text) 
-        print(f'saved to {audio_file_path_text_file}')
-        
-
-        return TranscribeData(
-            timeline="\n\n".join(timelines), transcript="\n".join(transcripts), chatbot_timeline= "--".join(chatbot_timelines)
+        segments = transcribe_with_srt(
+            audio_file_path,
+            cache=self.__cache,
+            config=transcription_config(language),
         )
+        return TranscribeData(segments=segments)
         
 
     def __convert_to_audio(self, audio_or_video_file_path: str) -> str:
@@ -0,0 +1,141 @@
+import os
+import sqlite3
+import time
+from contextlib import closing
+from typing import Optional
+
+# AssemblyAI only keeps uploaded files for a limited time, and transcripts
+# are retained until deleted unless the account configures a TTL.
+# Both can be tuned to match the account's retention settings.
+UPLOAD_URL_TTL = float(os.getenv("ASSEMBLYAI_UPLOAD_URL_TTL", 23 * 60 * 60))
+TRANSCRIPT_TTL = float(os.getenv("ASSEMBLYAI_TRANSCRIPT_TTL", 30 * 24 * 60 * 60))
+
+
+class TranscriptionCache:
+    """
+    SQLite-backed cache of AssemblyAI upload URLs, transcript IDs and
+    detected languages keyed by the SHA-256 of the audio content.
+
+    Retrying after a downstream failure or re-running the same recording
+    then skips both the upload and the transcription and only fetches
+    the sentences of the completed transcript again.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        upload_url_ttl: float = UPLOAD_URL_TTL,
+        transcript_ttl: float = TRANSCRIPT_TTL,
+    ) -> None:
+        """
+        Initialize the cache.
+
+        Parameters
+        ----------
+        path : str
+            The path to the SQLite database file.
+        upload_url_ttl : float, optional
+            Seconds an upload URL stays usable,
+            by default `ASSEMBLYAI_UPLOAD_URL_TTL` or 23 hours.
+        transcript_ttl : float, optional
+            Seconds a completed transcript stays retrievable,
+            by default `ASSEMBLYAI_TRANSCRIPT_TTL` or 30 days.
+        """
+        self.__path = path
+        self.__upload_url_ttl = upload_url_ttl
+        self.__transcript_ttl = transcript_ttl
+
+        with closing(sqlite3.connect(self.__path)) as conn, conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS transcriptions (
+                    audio_sha256 TEXT PRIMARY KEY,
+                    upload_url TEXT,
+                    uploaded_at REAL,
+                    transcript_id TEXT,
+                    transcribed_at REAL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS language_detections (
+                    audio_sha256 TEXT PRIMARY KEY,
+                    seconds REAL NOT NULL,
+                    language TEXT NOT NULL,
+                    confidence REAL NOT NULL
+                )
+                """
+            )
+
+    def upload_url(self, audio_sha256: str) -> Optional[str]:
+        """
+        Return the cached upload URL of the audio if it has not expired.
+        """
+        return self.__get(
+            "upload_url", "uploaded_at", audio_sha256, self.__upload_url_ttl
+        )
+
+    def transcript_id(self, audio_sha256: str) -> Optional[str]:
+        """
+        Return the cached completed transcript ID of the audio
+        if it has not expired.
+        """
+        return self.__get(
+            "transcript_id", "transcribed_at", audio_sha256, self.__transcript_ttl
+        )
+
+    def put_upload_url(self, audio_sha256: str, upload_url: Optional[str]) -> None:
+        self.__put("upload_url", "uploaded_at", audio_sha256, upload_url)
+
+    def put_transcript_id(self, audio_sha256: str, transcript_id: Optional[str]) -> None:
+        self.__put("transcript_id", "transcribed_at", audio_sha256, transcript_id)
+
+    def detected_language(
+        self, audio_sha256: str, seconds: float
+    ) -> Optional[tuple[str, float]]:
+        """
+        Return the cached language and confidence detected in the opening
+        `seconds` of the audio.
+        """
+        with closing(sqlite3.connect(self.__path)) as conn:
+            row = conn.execute(
+                "SELECT language, confidence FROM language_detections "
+                "WHERE audio_sha256 = ? AND seconds = ?",
+                (audio_sha256, seconds),
+            ).fetchone()
+        return (row[0], row[1]) if row is not None else None
+
+    def put_detected_language(
+        self, audio_sha256: str, seconds: float, language: str, confidence: float
+    ) -> None:
+        with closing(sqlite3.connect(self.__path)) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO language_detections VALUES (?, ?, ?, ?)",
+                (audio_sha256, seconds, language, confidence),
+            )
+
+    def __get(
+        self, column: str, time_column: str, audio_sha256: str, ttl: float
+    ) -> Optional[str]:
+        with closing(sqlite3.connect(self.__path)) as conn:
+            row = conn.execute(
+                f"SELECT {column}, {time_column} FROM transcriptions "
+                "WHERE audio_sha256 = ?",
+                (audio_sha256,),
+            ).fetchone()
+        if row is None or row[0] is None or time.time() - row[1] > ttl:
+            return None
+        return row[0]
+
+    def __put(
+        self, column: str, time_column: str, audio_sha256: str, value: Optional[str]
+    ) -> None:
+        with closing(sqlite3.connect(self.__path)) as conn, conn:
+            conn.execute(
+                f"INSERT INTO transcriptions (audio_sha256, {column}, {time_column}) "
+                "VALUES (?, ?, ?) ON CONFLICT(audio_sha256) DO UPDATE SET "
+                f"{column} = excluded.{column}, {time_column} = excluded.{time_column}",
+                (audio_sha256, value, time.time()),
+            )
@@ -1,6 +1,11 @@
+import asyncio
 import logging
+import os
+import shutil
 import subprocess
-from typing import Literal, Union
+import tempfile
+import time
+from typing import Any, AsyncIterator, Literal, Optional, Sequence, Union
 
 from dotenv import load_dotenv
 
@@ -36,13 +41,67 @@ from ._prompts import (
     TurkishMeetingPrompts,
     PortugueseMeetingPrompts,
 )
-from ._summarizer import Summarizer
+from ._answer_cache import AnswerCache
+from ._chat import ChatSessionStore
+from ._corpus import CorpusIndex, SearchHit
+from ._embeddings import SentenceTransformerEmbedder, get_embedder
+from ._llm_cache import LLMCache
+from ._llm_client import LLMClient
+from ._models import ModelRegistry, get_tokenizer
+from ._query_cache import LoadedRecording, SizedLRUCache
+from ._query_prompt import QueryPrompt, fit_query_prompt
+from ._recordings import RecordingStore, file_sha256
+from ._retrieval import SegmentRetriever
+from ._router import (
+    ROUTES,
+    RouteStats,
+    classify_question,
+    find_keywords,
+    summary_section,
+    summary_topic,
+)
+from ._segments import SegmentStore, ms_to_srt_time
+from ._summarizer import Summarizer, SummaryNode
+from ._timestamps import route_time_question, segments_at
 from ._transcriber import Transcriber
 
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO)
 
+_PROMPTS = {
+    ("ja", "meeting"): JapaneseMeetingPrompts,
+    ("ja", "lecture"): JapaneseLecturePrompts,
+    ("en", "meeting"): EnglishMeetingPrompts,
+    ("en", "lecture"): EnglishLecturePrompts,
+    ("es", "meeting"): SpanishMeetingPrompts,
+    ("es", "lecture"): SpanishLecturePrompts,
+    ("fr", "meeting"): FrenchMeetingPrompts,
+    ("fr", "lecture"): FrenchLecturePrompts,
+    ("de", "meeting"): GermanMeetingPrompts,
+    ("de", "lecture"): GermanLecturePrompts,
+    ("zh", "meeting"): ChineseMeetingPrompts,
+    ("zh", "lecture"): ChineseLecturePrompts,
+    ("hi", "meeting"): HindiMeetingPrompts,
+    ("hi", "lecture"): HindiLecturePrompts,
+    ("ar", "meeting"): ArabicMeetingPrompts,
+    ("ar", "lecture"): ArabicLecturePrompts,
+    ("ru", "meeting"): RussianMeetingPrompts,
+    ("ru", "lecture"): RussianLecturePrompts,
+    ("pt", "meeting"): PortugueseMeetingPrompts,
+    ("pt", "lecture"): PortugueseLecturePrompts,
+    ("ko", "meeting"): KoreanMeetingPrompts,
+    ("ko", "lecture"): KoreanLecturePrompts,
+    ("it", "meeting"): ItalianMeetingPrompts,
+    ("it", "lecture"): ItalianLecturePrompts,
+    ("tr", "meeting"): TurkishMeetingPrompts,
+    ("tr", "lecture"): TurkishLecturePrompts,
+    ("bn", "meeting"): BengaliMeetingPrompts,
+    ("bn", "lecture"): BengaliLecturePrompts,
+    ("ur", "meeting"): UrduMeetingPrompts,
+    ("ur", "lecture"): UrduLecturePrompts,
+}
+
 
 class MinutesMaker:
     def __init__(
@@ -51,6 +110,25 @@ class MinutesMaker:
         *,
         cpu_threads: int = 0,
         num_workers: int = 1,
+        data_dir: str = "recordings",
+        language_detection_seconds: float = 30.0,
+        min_language_confidence: float = 0.7,
+        summarize_strategy: Literal["map_reduce", "rolling"] = "map_reduce",
+        max_concurrency: int = 4,
+        llm_max_concurrency: int = 16,
+        llm_max_streams: int = 256,
+        llm_rpm: Optional[int] = None,
+        llm_tpm: Optional[int] = None,
+        model_registry: Optional[str] = None,
+        extractive_ratio: Optional[float] = None,
+        query_model: str = "gpt-3.5-turbo",
+        query_context_tokens: int = 3000,
+        embedding_model: Optional[str] = "hashing",
+        query_cache_bytes: int = 256 << 20,
+        query_history_tokens: int = 1000,
+        answer_cache_ttl: float = 24 * 60 * 60,
+        answer_similarity: Optional[float] = 0.9,
+        query_model_tiers: Optional[dict[str, str]] = None,
     ) -> None:
         """
         Initialize the MinutesMaker class with a Summarizer and
@@ -67,12 +145,129 @@ class MinutesMaker:
         num_workers : int, optional
             The number of workers to use for inference,
             by default 1 (non-parallel).
+        data_dir : str, optional
+            The directory to store transcribed recordings in,
+            by default "recordings".
+        language_detection_seconds : float, optional
+            The length of the opening audio window used to identify
+            the spoken language, by default 30.0. 0 disables detection.
+        min_language_confidence : float, optional
+            The confidence a detected language needs to be used,
+            by default 0.7.
+        summarize_strategy : Literal["map_reduce", "rolling"], optional
+            How long transcripts are shortened before summarization,
+            by default "map_reduce".
+        max_concurrency : int, optional
+            The number of concurrent requests per summary,
+            by default 4.
+        llm_max_concurrency : int, optional
+            The number of in-flight OpenAI requests across all jobs
+            and queries, by default 16.
+        llm_max_streams : int, optional
+            The number of answers streamed from OpenAI at once, e.g. to
+            "/query", by default 256. A stream only counts against
+            `llm_max_concurrency` until it is opened.
+        llm_rpm : int, optional
+            The OpenAI requests per minute limit, by default None.
+        llm_tpm : int, optional
+            The OpenAI tokens per minute limit, by default None.
+        model_registry : str, optional
+            The path to a JSON file overriding the context windows and
+            output limits of models, by default None (built-in limits).
+        extractive_ratio : float, optional
+            The fraction of the tokens of long transcripts kept by the
+            local extractive filter before summarization,
+            by default None (disabled).
+        query_model : str, optional
+            The OpenAI model answering questions about recordings,
+            by default "gpt-3.5-turbo".
+        query_context_tokens : int, optional
+            The number of timeline tokens sent with a question,
+            by default 3000.
+        embedding_model : str, optional
+            The local embedding of timeline segments searched besides
+            keywords: "hashing" for hashed n-gram vectors, the name of a
+            sentence-transformers model, or None to search keywords only,
+            by default "hashing".
+        query_cache_bytes : int, optional
+            The memory the parsed recordings answering questions are
+            cached in, by default 256 MiB.
+        query_history_tokens : int, optional
+            The tokens of the earlier turns of a conversation sent
+            verbatim with a follow-up question; older turns are compacted
+            into a summary, by default 1000.
+        answer_cache_ttl : float, optional
+            Seconds an answer is reused for the same question about the
+            same recording, by default 1 day. 0 disables the cache.
+        answer_similarity : float, optional
+            The similarity of the embeddings of two questions for one to
+            be answered by the cached answer of the other, by default 0.9.
+            None only reuses answers to identical questions, and so do
+            embedders other than sentence-transformers models.
+        query_model_tiers : dict[str, str], optional
+            The OpenAI model answering the questions of a route that
+            cannot be answered locally, e.g. {"synthesis": "gpt-4"}, by
+            default None. Other routes use `query_model`.
         """
-        self.__summarizer = Summarizer(model=model)
+        self.__language_detection_seconds = language_detection_seconds
+        self.__min_language_confidence = min_language_confidence
+        self.__recordings = RecordingStore(data_dir)
+        self.__query_model = query_model
+        self.__registry = ModelRegistry.from_file(model_registry)
+        self.__query_model_tiers = dict(query_model_tiers or {})
+        unknown = self.__query_model_tiers.keys() - set(ROUTES)
+        if unknown:
+            raise ValueError(
+                f"Unknown query routes {sorted(unknown)}, expected some of {ROUTES}."
+            )
+        self.__route_stats = RouteStats()
+        self.__query_context_tokens = query_context_tokens
+        self.__embedder = get_embedder(embedding_model)
+        self.__query_cache: SizedLRUCache[LoadedRecording] = SizedLRUCache(
+            query_cache_bytes
+        )
+        self.__llm = LLMClient(
+            max_concurrency=llm_max_concurrency,
+            max_streams=llm_max_streams,
+            rpm=llm_rpm,
+            tpm=llm_tpm,
+        )
+        self.__llm_cache = LLMCache(os.path.join(data_dir, "llm_cache.sqlite3"))
+        self.__corpus = CorpusIndex(
+            os.path.join(data_dir, "corpus_index"), self.__recordings
+        )
+        self.__answers = AnswerCache(
+            os.path.join(data_dir, "answer_cache.sqlite3"),
+            # hashed n-grams rate questions about other numbers or times
+            # as near duplicates, so only semantic embeddings match
+            (
+                self.__embedder
+                if isinstance(self.__embedder, SentenceTransformerEmbedder)
+                else None
+            ),
+            min_similarity=answer_similarity,
+            max_age=answer_cache_ttl,
+        )
+        self.__chat_sessions = ChatSessionStore(
+            self.__llm,
+            query_model,
+            get_tokenizer(query_model),
+            history_tokens=query_history_tokens,
+        )
+        self.__summarizer = Summarizer(
+            model=model,
+            strategy=summarize_strategy,
+            max_concurrency=max_concurrency,
+            cache=self.__llm_cache,
+            client=self.__llm,
+            registry=self.__registry,
+            extractive_ratio=extractive_ratio,
+        )
         self.__transcriber = Transcriber(
             device="cuda" if self.__check_cuda() else "cpu",
             cpu_threads=cpu_threads,
             num_workers=num_workers,
+            cache_path=os.path.join(data_dir, "transcription_cache.sqlite3"),
         )
 
         # Somehow cannot extend the Enum class,
@@ -110,15 +305,75 @@ class MinutesMaker:
     PortugueseMeetingPrompts,
         ] = None
 
-    def __call__(
+    @property
+    def recordings(self) -> RecordingStore:
+        """
+        The store of transcribed recordings.
+        """
+        return self.__recordings
+
+    @property
+    def llm(self) -> LLMClient:
+        """
+        The OpenAI client shared by summarization and queries.
+        """
+        return self.__llm
+
+    @property
+    def answers(self) -> AnswerCache:
+        """
+        The cache of answers to questions about recordings.
+        """
+        return self.__answers
+
+    @property
+    def chat_sessions(self) -> ChatSessionStore:
+        """
+        The conversations about recordings, for follow-up questions.
+        """
+        return self.__chat_sessions
+
+    @property
+    def query_model(self) -> str:
+        """
+        The OpenAI model answering questions about recordings.
+        """
+        return self.__query_model
+
+    @property
+    def query_routes(self) -> RouteStats:
+        """
+        The counts and latencies of the questions of each route.
+        """
+        return self.__route_stats
+
+    def model_for(self, route: str) -> str:
+        """
+        Choose the OpenAI model answering a question by its route.
+
+        Parameters
+        ----------
+        route : str
+            The route of the question, see `MinutesMaker.route_question`.
+
+        Returns
+        -------
+        str
+            The model of the tier of the route, or `query_model`.
+        """
+        return self.__query_model_tiers.get(route, self.__query_model)
+
+    async def __call__(
         self,
         audio_or_video_file_path: str,
-        language: Literal["ja", "en", "es", "fr", "de", "zh", "hi", "ar", "ru", "pt", "ko", "it", "tr", "bn", "ur"] = "en",
+        language: Literal["auto", "ja", "en", "es", "fr", "de", "zh", "hi", "ar", "ru", "pt", "ko", "it", "tr", "bn", "ur"] = "en",
         category: Literal["meeting", "lecture"] = "meeting",
         content: str = "",
         *,
         beam_size: int = 5,
-    ) -> tuple[str, str]:
+        use_cache: bool = True,
+        languages: Sequence[str] = (),
+    ) -> tuple[str, str, str]:
         """
         Transcribe and summarize an audio or video file.
 
@@ -126,9 +381,10 @@ class MinutesMaker:
         ----------
         audio_or_video_file_path : str
             The path to the audio or video file to be summarized.
-        language : Literal["ja", "en"], optional
+        language : Literal["auto", "ja", "en"], optional
             The language of the text to be summarized,
-            by default "ja".
+            "auto" to follow the language detected in the audio,
+            by default "en".
         category : Literal["meeting", "lecture"], optional
             The type of the audio to be summarized,
             by default "meeting"
@@ -139,135 +395,621 @@ class MinutesMaker:
         beam_size : int, optional
             The beam size to use for inference,
             by default 5.
+        use_cache : bool, optional
+            Whether to reuse cached LLM responses, by default True.
+        languages : Sequence[str], optional
+            Further summary languages, summarized from the same shortened
+            transcript and stored in the "summaries" metadata,
+            by default ().
 
         Returns
         -------
-        tuple[str, str]
-            The transcribed timeline and its summary.
-        """
-        if language == "ja":
-            if category == "meeting":
-                self.__prompts = JapaneseMeetingPrompts
-            elif category == "lecture":
-                self.__prompts = JapaneseLecturePrompts
-            else:
-                raise ValueError(
-                    f"category must be either 'meeting' or 'lecture', but got {category}."
-                )
-        elif language == "en":
-            if category == "meeting":
-                self.__prompts = EnglishMeetingPrompts
-            elif category == "lecture":
-                self.__prompts = EnglishLecturePrompts
-            else:
-                raise ValueError(
-                    f"category must be either 'meeting' or 'lecture', but got {category}."
-                )
-                
-        elif language == "es":
-            if category == "meeting":
-                self.__prompts = SpanishMeetingPrompts
-            elif category == "lecture":
-                self.__prompts = SpanishLecturePrompts
-            else:
-                raise ValueError(f"category must be either 'meeting' or 'lecture', but got {category}.")
-        elif language == "fr":
-            if category == "meeting":
-                self.__prompts = FrenchMeetingPrompts
-            elif category == "lecture":
-                self.__prompts = FrenchLecturePrompts
-            else:
-                raise ValueError(f"category must be either 'meeting' or 'lecture', but got {category}.")
-        elif language == "de":
-            if category == "meeting":
-                self.__prompts = GermanMeetingPrompts
-            elif category == "lecture":
-                self.__prompts = GermanLecturePrompts
-            else:
-                raise ValueError(f"category must be either 'meeting' or 'lecture', but got {category}.")
-        elif language == "zh":
-            if category == "meeting":
-                self.__prompts = ChineseMeetingPrompts
-            elif category == "lecture":
-                self.__prompts = ChineseLecturePrompts
-            else:
-                raise ValueError(f"category must be either 'meeting' or 'lecture', but got {category}.")
-        elif language == "hi":
-            if category == "meeting":
-                self.__prompts = HindiMeetingPrompts
-            elif category == "lecture":
-                self.__prompts = HindiLecturePrompts
-            else:
-                raise ValueError(f"category must be either 'meeting' or 'lecture', but got {category}.")
-        elif language == "ar":
-            if category == "meeting":
-                self.__prompts = ArabicMeetingPrompts
-            elif category == "lecture":
-                self.__prompts = ArabicLecturePrompts
-            else:
-                raise ValueError(f"category must be either 'meeting' or 'lecture', but got {category}.")
-        elif language == "ru":
-            if category == "meeting":
-                self.__prompts = RussianMeetingPrompts
-            elif category == "lecture":
-                self.__prompts = RussianLecturePrompts
-            else:
-                raise ValueError(f"category must be either 'meeting' or 'lecture', but got {category}.")
-        elif language == "pt":
-            if category == "meeting":
-                self.__prompts = PortugueseMeetingPrompts
-            elif category == "lecture":
-                self.__prompts = PortugueseLecturePrompts
-            else:
-                raise ValueError(f"category must be either 'meeting' or 'lecture', but got {category}.")
-        elif language == "ko":
-            if category == "meeting":
-                self.__prompts = KoreanMeetingPrompts
-            elif category == "lecture":
-                self.__prompts = KoreanLecturePrompts
-            else:
-                raise ValueError(f"category must be either 'meeting' or 'lecture', but got {category}.")
-        elif language == "it":
-            if category == "meeting":
-                self.__prompts = ItalianMeetingPrompts
-            elif category == "lecture":
-                self.__prompts = ItalianLecturePrompts
-            else:
-                raise ValueError(f"category must be either 'meeting' or 'lecture', but got {category}.")
-        elif language == "tr":
-            if category == "meeting":
-                self.__prompts = TurkishMeetingPrompts
-            elif category == "lecture":
-                self.__prompts = TurkishLecturePrompts
-            else:
-                raise ValueError(f"category must be either 'meeting' or 'lecture', but got {category}.")
-        elif language == "bn":
-            if category == "meeting":
-                self.__prompts = BengaliMeetingPrompts
-            elif category == "lecture":
-                self.__prompts = BengaliLecturePrompts
-            else:
-                raise ValueError(f"category must be either 'meeting' or 'lecture', but got {category}.")
-        elif language == "ur":
-            if category == "meeting":
-                self.__prompts = UrduMeetingPrompts
-            elif category == "lecture":
-                self.__prompts = UrduLecturePrompts
-            else:
-                raise ValueError(f"category must be either 'meeting' or 'lecture', but got {category}.")
-        else:
-            raise ValueError(f"Unsupported language: {language}")
-     
+        tuple[str, str, str]
+            The recording ID, the transcribed timeline and its summary
+            in `language`.
+
+        Raises
+        ------
+        ValueError
+            If a summary language or the category is not supported,
+            checked before the file is transcribed.
+        """
+        for lang in [language, *languages]:
+            # "auto" falls back to English if the detected language is not
+            # supported
+            self.__select_prompts("en" if lang == "auto" else lang, category)
+
+        # transcription blocks on the backend; keep the event loop free
+        recording_id = await asyncio.to_thread(
+            self.transcribe,
+            audio_or_video_file_path,
+            language=language,
+            category=category,
+            content=content,
+            beam_size=beam_size,
+        )
+        # "auto" has been resolved to the detected language by `transcribe`
+        resolved = self.__recordings.load_metadata(recording_id)["language"]
+        languages = [
+            resolved if lang == "auto" else lang for lang in [language, *languages]
+        ]
+        summaries = await self.summarize_languages(
+            recording_id, languages, category=category, use_cache=use_cache
+        )
+        return (
+            recording_id,
+            self.__recordings.load_segments(recording_id).render_timeline(),
+            summaries[resolved],
+        )
+
+    def transcribe(
+        self,
+        audio_or_video_file_path: str,
+        language: Literal["auto", "ja", "en", "es", "fr", "de", "zh", "hi", "ar", "ru", "pt", "ko", "it", "tr", "bn", "ur"] = "en",
+        category: Literal["meeting", "lecture"] = "meeting",
+        content: str = "",
+        *,
+        beam_size: int = 5,
+    ) -> str:
+        """
+        Transcribe an audio or video file and save the transcript.
+
+        The recording ID is derived from the file content, so uploading
+        the same file again overwrites the previous transcript.
+
+        Parameters
+        ----------
+        audio_or_video_file_path : str
+            The path to the audio or video file to be transcribed.
+        language : Literal["auto", "ja", "en"], optional
+            The language chosen for the summary, by default "en".
+            "auto" is replaced by the language detected in the opening
+            seconds of the audio; otherwise a confident detection only
+            decides how the audio itself is transcribed.
+        category : Literal["meeting", "lecture"], optional
+            The type of the audio, by default "meeting".
+        content : str, optional
+            The content of the audio or video file, by default "".
+        beam_size : int, optional
+            The beam size to use for inference,
+            by default 5.
+
+        Returns
+        -------
+        str
+            The ID of the saved recording.
+        """
+        recording_id = file_sha256(audio_or_video_file_path)[:16]
+
+        detected_language, confidence = None, 0.0
+        if self.__language_detection_seconds > 0:
+            detected_language, confidence = self.__transcriber.detect_language(
+                audio_or_video_file_path, seconds=self.__language_detection_seconds
+            )
+        if confidence < self.__min_language_confidence:
+            detected_language = None
+
+        if language == "auto":
+            language = (
+                detected_language
+                if (detected_language, category) in _PROMPTS
+                else "en"
+            )
+        elif detected_language is not None and detected_language != language:
+            logging.warning(
+                f"audio seems to be in {detected_language}, "
+                f"but the summary language is {language}."
+            )
+        prompts = self.__select_prompts(
+            detected_language
+            if (detected_language, category) in _PROMPTS
+            else language,
+            category,
+        )
 
         results = self.__transcriber.convert_and_transcribe(
             audio_or_video_file_path,
-            prompt=self.__prompts.TRANSCRIBE_FORMAT.value.format(content=content),
+            prompt=prompts.TRANSCRIBE_FORMAT.value.format(content=content),
             beam_size=beam_size,
-        ) 
-        return results.timeline, self.__summarizer.summarize(
-            results.transcript, prompts=self.__prompts
-        ), results.chatbot_timeline
-        
+            language=detected_language,
+        )
+        segments = results.segments
+        self.__recordings.save(
+            recording_id,
+            segments,
+            {
+                "filename": os.path.basename(audio_or_video_file_path),
+                "language": language,
+                "detected_language": detected_language,
+                "language_confidence": confidence,
+                "category": category,
+                "content": content,
+                "num_segments": len(segments),
+                "duration_ms": segments.ends[-1] if len(segments) else 0,
+                "transcribed_at": time.time(),
+            },
+        )
+        self.__build_retriever(recording_id, segments)
+        self.__corpus.add(recording_id, segments)
+        self.__query_cache.invalidate(recording_id)
+        self.__answers.invalidate(recording_id)
+        logging.info(f"saved recording {recording_id} ({len(segments)} segments).")
+
+        return recording_id
+
+    async def summarize(
+        self,
+        recording_id: str,
+        language: Literal["ja", "en", "es", "fr", "de", "zh", "hi", "ar", "ru", "pt", "ko", "it", "tr", "bn", "ur"] = "en",
+        category: Literal["meeting", "lecture"] = "meeting",
+        *,
+        use_cache: bool = True,
+    ) -> str:
+        """
+        Summarize a previously transcribed recording.
+
+        Parameters
+        ----------
+        recording_id : str
+            The ID returned by `MinutesMaker.transcribe`.
+        language : Literal["ja", "en"], optional
+            The language of the summary, by default "en".
+        category : Literal["meeting", "lecture"], optional
+            The type of the audio, by default "meeting".
+        use_cache : bool, optional
+            Whether to reuse cached LLM responses, by default True.
+
+        Returns
+        -------
+        str
+            The summary of the recording.
+        """
+        summaries = await self.summarize_languages(
+            recording_id, [language], category=category, use_cache=use_cache
+        )
+        return summaries[language]
+
+    async def summarize_languages(
+        self,
+        recording_id: str,
+        languages: Sequence[str],
+        category: Literal["meeting", "lecture"] = "meeting",
+        *,
+        use_cache: bool = True,
+    ) -> dict[str, str]:
+        """
+        Summarize a previously transcribed recording in several languages.
+
+        The transcript is shortened once, with the prompts of the first
+        language, and the final summaries are requested concurrently.
+
+        Parameters
+        ----------
+        recording_id : str
+            The ID returned by `MinutesMaker.transcribe`.
+        languages : Sequence[str]
+            The languages of the summaries, e.g. ["en", "ja"].
+        category : Literal["meeting", "lecture"], optional
+            The type of the audio, by default "meeting".
+        use_cache : bool, optional
+            Whether to reuse cached LLM responses, by default True.
+
+        Returns
+        -------
+        dict[str, str]
+            The summary in each language, in the order of `languages`.
+        """
+        languages = list(dict.fromkeys(languages))
+        if not languages:
+            raise ValueError("at least one summary language is required.")
+        prompts = [self.__select_prompts(lang, category) for lang in languages]
+        self.__prompts = prompts[0]
+        segments = self.__recordings.load_segments(recording_id)
+        trees = await self.__summarizer.summarize_trees(
+            segments.render_transcript(),
+            prompts,
+            use_cache=use_cache,
+            language=self.__spoken_language(recording_id),
+        )
+        trees_by_language = dict(zip(languages, trees))
+        self.__save_summary(recording_id, segments, trees_by_language, category)
+
+        return {lang: tree[-1].summary for lang, tree in trees_by_language.items()}
+
+    def summarize_stream(
+        self,
+        recording_id: str,
+        language: Literal["ja", "en", "es", "fr", "de", "zh", "hi", "ar", "ru", "pt", "ko", "it", "tr", "bn", "ur"] = "en",
+        category: Literal["meeting", "lecture"] = "meeting",
+        *,
+        use_cache: bool = True,
+    ) -> AsyncIterator[str]:
+        """
+        Summarize a previously transcribed recording and stream the summary.
+
+        The arguments are validated before the stream starts, so invalid
+        ones raise here instead of in the middle of a response.
+
+        Parameters
+        ----------
+        recording_id : str
+            The ID returned by `MinutesMaker.transcribe`.
+        language : Literal["ja", "en"], optional
+            The language of the summary, by default "en".
+        category : Literal["meeting", "lecture"], optional
+            The type of the audio, by default "meeting".
+        use_cache : bool, optional
+            Whether to reuse cached LLM responses, by default True.
+
+        Returns
+        -------
+        AsyncIterator[str]
+            The deltas of the summary.
+        """
+        prompts = self.__select_prompts(language, category)
+        segments = self.__recordings.load_segments(recording_id)
+
+        async def stream() -> AsyncIterator[str]:
+            tree: list[SummaryNode] = []
+            async for delta in self.__summarizer.summarize_stream(
+                segments.render_transcript(),
+                prompts,
+                use_cache=use_cache,
+                language=self.__spoken_language(recording_id),
+                tree=tree,
+            ):
+                yield delta
+
+            self.__save_summary(recording_id, segments, {language: tree}, category)
+
+        return stream()
+
+    def summary_tree(self, recording_id: str) -> dict[str, Any]:
+        """
+        Load the summary tree of the latest summary of a recording.
+
+        Parameters
+        ----------
+        recording_id : str
+            The ID returned by `MinutesMaker.transcribe`.
+
+        Returns
+        -------
+        dict[str, Any]
+            The language and category of the summary and its `nodes`,
+            ordered by level with the root last. Each node holds its
+            `id` (its index), `level`, `summary`, the `start`/`stop` segment range and
+            the `start_ms`/`end_ms` time range it covers, and the IDs
+            of its `children`.
+        """
+        return self.__recordings.load_summary_tree(recording_id)
+
+    def __save_summary(
+        self,
+        recording_id: str,
+        segments: SegmentStore,
+        trees: dict[str, list[SummaryNode]],
+        category: str,
+    ) -> None:
+        """
+        Store the summaries in the metadata of a recording, and the tree of
+        the first one with the time ranges of the nodes. The trees of the
+        other languages only differ in their roots.
+        """
+        language, tree = next(iter(trees.items()))
+        self.__recordings.update_metadata(
+            recording_id,
+            {
+                "summary": tree[-1].summary,
+                "summary_language": language,
+                "summary_category": category,
+                "summaries": {lang: nodes[-1].summary for lang, nodes in trees.items()},
+            },
+        )
+        nodes = []
+        for idx, node in enumerate(tree):
+            stop = min(node.stop, len(segments))
+            nodes.append(
+                {
+                    "id": idx,
+                    "level": node.level,
+                    "start": node.start,
+                    "stop": stop,
+                    "start_ms": segments.starts[node.start] if stop else 0,
+                    "end_ms": segments.ends[stop - 1] if stop else 0,
+                    "summary": node.summary,
+                    "children": list(node.children),
+                }
+            )
+        self.__recordings.save_summary_tree(
+            recording_id, {"language": language, "category": category, "nodes": nodes}
+        )
+        # questions are answered from the latest summary
+        self.__query_cache.invalidate(recording_id)
+        self.__answers.invalidate(recording_id)
+
+    def metrics(self) -> dict[str, Any]:
+        """
+        Report the hit rate and memory use of the caches.
+
+        Returns
+        -------
+        dict[str, Any]
+            The statistics of the cache of parsed recordings answering
+            questions, of the answer cache, of the LLM response cache, the
+            size of the corpus index and the questions of each route.
+        """
+        return {
+            "query_cache": self.__query_cache.stats(),
+            "answer_cache": self.__answers.stats,
+            "llm_cache": self.__llm_cache.stats,
+            "corpus_index": self.__corpus.stats,
+            "query_routes": self.__route_stats.stats(),
+        }
+
+    def search_recordings(self, query: str, k: int = 10) -> list[SearchHit]:
+        """
+        Search the segments of all the recordings, e.g. to find the meeting
+        a decision was made in.
+
+        Recordings transcribed before the corpus index existed are indexed
+        on the first search.
+
+        Parameters
+        ----------
+        query : str
+            The query.
+        k : int, optional
+            The maximum number of results, by default 10.
+
+        Returns
+        -------
+        list[SearchHit]
+            The matching segments, best first.
+        """
+        self.__corpus.sync()
+        return self.__corpus.search(query, k)
+
+    def route_question(
+        self, recording_id: str, question: str, *, follow_up: bool = False
+    ) -> tuple[str, Optional[str]]:
+        """
+        Classify a question about a recording and answer it locally if
+        its route allows:
+
+        - "timestamp_lookup", e.g. "What was said at 00:02:01?", with the
+          timeline lines spoken then,
+        - "keyword_find", e.g. "When did they mention the budget?", with
+          the timeline lines containing the keywords,
+        - "summary_recall", e.g. "What are the action items?", with the
+          summary or its section.
+
+        Other questions, "synthesis" ones, and questions no local answer
+        is found for need an LLM, see `MinutesMaker.model_for`.
+
+        Parameters
+        ----------
+        recording_id : str
+            The ID returned by `MinutesMaker.transcribe`.
+        question : str
+            The question.
+        follow_up : bool, optional
+            Whether the question follows earlier turns of a conversation,
+            by default False. Follow-ups such as "summarize that" refer to
+            them, so only timestamp lookups are answered locally.
+
+        Returns
+        -------
+        tuple[str, Optional[str]]
+            The route and the local answer, or None if the question needs
+            an LLM.
+        """
+        loaded = self.__loaded(recording_id)
+        duration = loaded.segments.ends[-1] if len(loaded.segments) else 0
+        route = classify_question(question, duration)
+        if route == "timestamp_lookup":
+            return route, self.answer_at_time(recording_id, question)
+        if follow_up:
+            return route, None
+
+        if route == "keyword_find":
+            indices = loaded.retriever.find(find_keywords(question))
+            if indices:
+                lines = [
+                    line
+                    for idx in indices
+                    for line in loaded.segments.iter_timeline(idx, idx + 1)
+                ]
+                return route, "Mentioned at:\n\n" + "\n\n".join(lines)
+        elif route == "summary_recall" and loaded.summary:
+            topic = summary_topic(question)
+            return route, summary_section(loaded.summary, loaded.category, topic)
+        return route, None
+
+    def answer_at_time(self, recording_id: str, question: str) -> Optional[str]:
+        """
+        Answer a question asking what was said at a point in time, e.g.
+        "What was said at 00:02:01?" or "What happened two minutes after
+        the start?", with the timeline lines spoken then.
+
+        Parameters
+        ----------
+        recording_id : str
+            The ID returned by `MinutesMaker.transcribe`.
+        question : str
+            The question.
+
+        Returns
+        -------
+        str, optional
+            The timeline lines around the point in time, or None if the
+            question needs an LLM.
+        """
+        segments = self.__loaded(recording_id).segments
+        if not len(segments):
+            return None
+        duration = segments.ends[-1]
+        ms = route_time_question(question, duration)
+        if ms is None:
+            return None
+        if ms > duration:
+            return f"The recording ends at {ms_to_srt_time(duration)}."
+
+        indices = segments_at(segments.starts, segments.ends, ms)
+        lines = segments.iter_timeline(indices.start, indices.stop)
+        return f"At {ms_to_srt_time(ms)}:\n\n" + "\n\n".join(lines)
+
+    def query_prompt(
+        self,
+        recording_id: str,
+        question: str,
+        system_prompt: str,
+        *,
+        model: Optional[str] = None,
+        history: Sequence[dict[str, str]] = (),
+        history_summary: str = "",
+        keep: Sequence[int] = (),
+    ) -> QueryPrompt:
+        """
+        Build the messages asking a question about a recording, measured
+        with the tokenizer of the model and fitted to its context window.
+
+        The prompt holds the latest summary and the whole timeline if it
+        fits in `query_context_tokens`, else the timeline segments
+        relevant to the question, else segments sampled evenly over the
+        recording. The oldest turns of the history are dropped, and the
+        summary cut, only if they overflow the context window on their own.
+
+        Parameters
+        ----------
+        recording_id : str
+            The ID returned by `MinutesMaker.transcribe`.
+        question : str
+            The question.
+        system_prompt : str
+            The system prompt, with a `{context}` field for the summary
+            and the timeline.
+        model : str, optional
+            The model answering the question, by default `query_model`.
+        history : Sequence[dict[str, str]], optional
+            The earlier turns of the conversation as chat messages,
+            by default ().
+        history_summary : str, optional
+            The summary of the compacted earlier turns, by default "".
+        keep : Sequence[int], optional
+            The segments earlier questions of the conversation were
+            answered from, reused while the budget allows, by default ().
+
+        Returns
+        -------
+        QueryPrompt
+            The messages, their segments and tokens, and how they were
+            fitted.
+
+        Raises
+        ------
+        ValueError
+            If the question alone does not fit the context window.
+        """
+        model = model or self.__query_model
+        loaded = self.__loaded(recording_id)
+        return fit_query_prompt(
+            system_prompt,
+            question,
+            loaded.retriever,
+            loaded.summary,
+            get_tokenizer(model),
+            self.__registry[model],
+            context_tokens=self.__query_context_tokens,
+            history=history,
+            history_summary=history_summary,
+            keep=keep,
+        )
+
+    def __loaded(self, recording_id: str) -> LoadedRecording:
+        """
+        Get the parsed segments, index and summary of a recording from
+        the cache, loading them on a miss.
+        """
+        return self.__query_cache.get_or_load(
+            recording_id,
+            lambda: self.__load_recording(recording_id),
+            lambda loaded: loaded.nbytes,
+        )
+
+    def __load_recording(self, recording_id: str) -> LoadedRecording:
+        """
+        Load the segments, index and summary of a recording, building the
+        index for recordings saved before indexing existed.
+        """
+        segments = self.__recordings.load_segments(recording_id)
+        directory = self.__recordings.path(recording_id, "retrieval")
+        if os.path.isdir(directory):
+            retriever = SegmentRetriever.load(directory, segments, self.__embedder)
+        else:
+            retriever = self.__build_retriever(recording_id, segments)
+        metadata = self.__recordings.load_metadata(recording_id)
+        return LoadedRecording(
+            segments,
+            retriever,
+            metadata.get("summary"),
+            metadata.get("summary_category") or metadata.get("category"),
+        )
+
+    def __build_retriever(
+        self, recording_id: str, segments: SegmentStore
+    ) -> SegmentRetriever:
+        """
+        Index the segments of a recording for questions and save the index.
+        """
+        retriever = SegmentRetriever.build(
+            segments,
+            self.__spoken_language(recording_id),
+            get_tokenizer(self.__query_model),
+            self.__embedder,
+        )
+        # the index becomes visible at once, and concurrent builds of the
+        # same index leave the first one in place
+        staging = tempfile.mkdtemp(dir=self.__recordings.path(recording_id))
+        retriever.save(staging)
+        try:
+            os.replace(staging, self.__recordings.path(recording_id, "retrieval"))
+        except OSError:
+            shutil.rmtree(staging)
+        return retriever
+
+    def __spoken_language(self, recording_id: str) -> Optional[str]:
+        """
+        The language spoken in a recording: the detected language, or
+        else the language it was transcribed for.
+        """
+        metadata = self.__recordings.load_metadata(recording_id)
+        return metadata.get("detected_language") or metadata.get("language")
+
+    def __select_prompts(self, language: str, category: str):
+        """
+        Select the prompts for the given language and category.
+
+        Parameters
+        ----------
+        language : str
+            The language code, e.g. "en".
+        category : str
+            "meeting" or "lecture".
+
+        Returns
+        -------
+        Enum
+            The prompts enum for the language and category.
+        """
+        if category not in ("meeting", "lecture"):
+            raise ValueError(
+                f"category must be either 'meeting' or 'lecture', but got {category}."
+            )
+        try:
+            return _PROMPTS[(language, category)]
+        except KeyError:
+            raise ValueError(f"Unsupported language: {language}") from None
 
     def __check_cuda(self) -> bool:
         """